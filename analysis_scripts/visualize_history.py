@@ -2,10 +2,9 @@ from __future__ import annotations
 from typing import Optional
 import typer
 from enum import Enum
-import jsonpickle
 import graphviz
-import treeswift as ts
-from math import log10
+from math import isnan, log10
+from hm01.history import HistoryTree
 
 
 class CurrentStatus(Enum):
@@ -21,77 +20,70 @@ COLORMAP = {
 }
 
 
-def traverse_preorder_skippable(tree: ts.Tree, f):
+def traverse_preorder_skippable(tree: HistoryTree, f):
     stack = []
-    stack.append(tree.root)
+    stack.append(0)
     while stack:
         n = stack.pop()
         if f(n):
-            for c in n.children:
+            for c in tree.children(n).tolist():
                 stack.append(c)
 
 
-def annotate_num_descendants(tree: ts.Tree):
-    for n in tree.traverse_postorder():
-        if n.is_leaf():
-            n.num_descendants = 1
-            n.num_not_extant = not n.extant
-        else:
-            n.num_descendants = sum([c.num_descendants for c in n.children])
-            n.num_not_extant = sum([c.num_not_extant for c in n.children])
-
-
 def main(
     input: str = typer.Option(..., "--input", "-i"),
     max_nodes : int = typer.Option(30, "--max-nodes", "-n"),
     output: str = typer.Option(..., "--output", "-o"),
 ):
-    with open(input) as f:
-        tree: ts.Tree = jsonpickle.decode(f.read())
-    annotate_num_descendants(tree)
+    tree = HistoryTree.read(input)
+    labels = tree.labels
+    num_not_extant = tree.count_in_subtrees(tree.is_leaf & ~tree.extant)
     dot = graphviz.Digraph(comment="Generated by hm01")
+    root_children = tree.children(0).tolist()
     allowlist = set()
     allowlist.update(
         sorted(
-            [n for n in tree.root.children if not n.extant],
-            key=lambda n: (n.num_not_extant + 2 * log10(n.num_nodes)),
+            [n for n in root_children if not tree.extant[n]],
+            key=lambda n: (num_not_extant[n] + 2 * log10(tree.num_nodes[n])),
             reverse=True,
         )[:max_nodes]
     )
 
-    def g(n: ts.Node):
+    def g(n: int):
         # this is the traversal function
-        if (not n.is_root()) and n.parent.is_root() and n not in allowlist:
+        parent = int(tree.parent[n])
+        if parent == 0 and n not in allowlist:
             return False
-        if (not n.is_root()) and n.parent.is_root() and n.is_leaf():
+        if parent == 0 and tree.is_leaf[n]:
             return True
         status = CurrentStatus.ANCIENT
-        if n.is_leaf():
-            status = CurrentStatus.EXTANT if n.extant else CurrentStatus.EXTINCT
+        if tree.is_leaf[n]:
+            status = CurrentStatus.EXTANT if tree.extant[n] else CurrentStatus.EXTINCT
+        threshold = tree.validity_threshold[n]
         tmpl = (
             f"""
 <TR>
     <TD>cut_size</TD>
-    <TD>{n.cut_size}</TD>
+    <TD>{tree.cut_size[n]}</TD>
   </TR>
   <TR>
     <TD>threshold</TD>
-    <TD>{round(n.validity_threshold, 2)}</TD>
+    <TD>{round(threshold, 2) if not isnan(threshold) else ""}</TD>
   </TR>
         """
-            if hasattr(n, "cut_size")
+            if tree.cut_size[n] >= 0
             else ""
         )
         dot.node(
-            n.label,
+            labels[n],
             f"""<
 <TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4">
   <TR>
-    <TD PORT="here" COLSPAN="2"><B>{n.label if n.label else "Root"}</B></TD>
+    <TD PORT="here" COLSPAN="2"><B>{labels[n] if labels[n] else "Root"}</B></TD>
   </TR>
   <TR>
     <TD>n</TD>
-    <TD>{n.num_nodes}</TD>
+    <TD>{tree.num_nodes[n]}</TD>
   </TR>
   {tmpl}
 </TABLE>>""",
@@ -99,8 +91,8 @@ def main(
             fillcolor=COLORMAP[status.name.lower()],
             shape="none",
         )
-        if n.parent:
-            dot.edge(n.parent.label, n.label)
+        if parent >= 0:
+            dot.edge(labels[parent], labels[n])
         return True
 
     traverse_preorder_skippable(tree, g)
@@ -0,0 +1,112 @@
+"""Run the benchmarks on synthetic graphs and compare them against stored baselines
+
+    python -m benchmarks -G sbm -n 10000 -n 1000000
+    python -m benchmarks -G lfr -n 100000 -b mincut -b algorithm_g --save-baseline
+"""
+from __future__ import annotations
+import json
+import os
+import sys
+import tempfile
+from typing import List
+
+import typer
+from structlog import get_logger
+
+from hm01.clusterers.ikc_wrapper import IkcEngine
+from hm01.context import context
+from hm01.mincut import MincutEngine
+
+from .generators import Generator, GraphSpec
+from .suite import BENCHMARKS, Workload, compare, run_benchmark
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main(
+    generator: Generator = typer.Option(Generator.sbm, "--generator", "-G"),
+    nodes: List[int] = typer.Option([10_000], "--nodes", "-n"),
+    degree: float = typer.Option(20.0, "--degree"),
+    mixing: float = typer.Option(0.2, "--mixing"),
+    seed: int = typer.Option(0, "--seed"),
+    benchmarks: List[str] = typer.Option(list(BENCHMARKS), "--benchmark", "-b"),
+    repeat: int = typer.Option(3, "--repeat", "-r"),
+    graphs_dir: str = typer.Option(
+        os.path.join(BENCHMARKS_DIR, "graphs"), "--graphs-dir"
+    ),
+    baselines_dir: str = typer.Option(
+        os.path.join(BENCHMARKS_DIR, "baselines"), "--baselines-dir"
+    ),
+    save_baseline: bool = typer.Option(False, "--save-baseline"),
+    tolerance: float = typer.Option(1.25, "--tolerance"),
+    memory_slack_mb: float = typer.Option(16.0, "--memory-slack-mb"),
+    mincut_engine: MincutEngine = typer.Option(MincutEngine.viecut, "--mincut-engine"),
+    ikc_engine: IkcEngine = typer.Option(IkcEngine.subprocess, "--ikc-engine"),
+    output: str = typer.Option("", "--output", "-o"),
+):
+    """Benchmark the hot paths of CM, exiting with 1 if any regressed against its baseline
+    """
+    log = get_logger()
+    unknown = [b for b in benchmarks if b not in BENCHMARKS]
+    assert (
+        not unknown
+    ), f"unknown benchmarks {unknown}, expected some of {list(BENCHMARKS)}"
+    context.with_mincut_engine(mincut_engine)
+    report = {}
+    regressions: List[str] = []
+    for n in nodes:
+        spec = GraphSpec(generator, n, degree, mixing, seed)
+        path, membership = spec.materialize(graphs_dir)
+        with tempfile.TemporaryDirectory(prefix="cm-benchmarks-") as scratch_dir:
+            workload = Workload(spec, path, membership, scratch_dir, ikc_engine)
+            results = {}
+            for name in benchmarks:
+                results[name] = run_benchmark(workload, name, repeat)
+                if "error" in results[name]:
+                    log.warning(
+                        "benchmark failed",
+                        graph=spec.name,
+                        benchmark=name,
+                        **results[name],
+                    )
+                else:
+                    log.info(
+                        "benchmarked", graph=spec.name, benchmark=name, **results[name]
+                    )
+        report[spec.name] = {
+            "nodes": workload.graph.n(),
+            "edges": workload.graph.m(),
+            "mincut_engine": mincut_engine.value,
+            "benchmarks": results,
+        }
+        baseline_path = os.path.join(baselines_dir, spec.name + ".json")
+        if save_baseline:
+            os.makedirs(baselines_dir, exist_ok=True)
+            with open(baseline_path, "w") as f:
+                json.dump(report[spec.name], f, indent=2)
+        elif os.path.exists(baseline_path):
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+            if baseline.get("mincut_engine") != mincut_engine.value:
+                log.warning(
+                    "baseline measured with another mincut engine", graph=spec.name
+                )
+            regressions.extend(
+                f"{spec.name} {r}"
+                for r in compare(
+                    results, baseline["benchmarks"], tolerance, memory_slack_mb
+                )
+            )
+        else:
+            log.warning("no baseline to compare against", graph=spec.name)
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    for regression in regressions:
+        log.error("regression", regression=regression)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,153 @@
+"""Synthetic graphs with planted communities, generated locally at any scale
+
+Graphs are written as tab-separated edgelists, the input format of `cm`, together with
+the membership of every node in its planted community. Both are kept in a directory of
+generated graphs and reused by later runs with the same parameters.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from enum import Enum
+import os
+from typing import Tuple
+
+import networkit as nk
+import numpy as np
+import pandas as pd
+
+# rows written to the edgelist at a time
+WRITE_CHUNK_ROWS = 1 << 22
+
+
+class Generator(str, Enum):
+    sbm = "sbm"
+    lfr = "lfr"
+
+
+@dataclass
+class GraphSpec:
+    """The parameters of a synthetic graph
+
+    `degree` is the expected average degree and `mixing` the expected fraction of the
+    edges of a node leaving its community.
+    """
+
+    generator: Generator
+    nodes: int
+    degree: float = 20.0
+    mixing: float = 0.2
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return (
+            f"{self.generator.value}-n{self.nodes}-d{self.degree:g}"
+            f"-mu{self.mixing:g}-s{self.seed}"
+        )
+
+    def generate(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The edges as an (m, 2) array and the community of every node"""
+        if self.generator == Generator.sbm:
+            return planted_partition(self.nodes, self.degree, self.mixing, self.seed)
+        return lfr(self.nodes, self.degree, self.mixing, self.seed)
+
+    def materialize(self, directory: str) -> Tuple[str, np.ndarray]:
+        """The path of the edgelist and the membership, generated if not there yet"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.name + ".tsv")
+        membership_path = os.path.join(directory, self.name + ".membership.npy")
+        if not (os.path.exists(path) and os.path.exists(membership_path)):
+            edges, membership = self.generate()
+            write_edgelist(path, edges)
+            np.save(membership_path, membership)
+        return path, np.load(membership_path)
+
+
+def community_sizes(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Power-law distributed community sizes between 10 and `sqrt(n) * 10`, summing to `n`
+    """
+    low, high = 10, max(11, int(np.sqrt(n) * 10))
+    sizes = []
+    total = 0
+    while total < n:
+        # inverse transform sampling of a power law with exponent -2
+        u = rng.random(1024)
+        drawn = (low * high / (high - u * (high - low))).astype(np.int64)
+        for size in drawn.tolist():
+            size = min(size, n - total)
+            sizes.append(size)
+            total += size
+            if total >= n:
+                break
+    return np.asarray(sizes, dtype=np.int64)
+
+
+def planted_partition(
+    n: int, degree: float, mixing: float, seed: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """A planted partition (stochastic block model) with power-law community sizes
+
+    Edges are sampled as uniform pairs, within a community for the internal edges and
+    over the whole graph for the rest, in time linear in the number of edges.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = community_sizes(n, rng)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    membership = np.repeat(np.arange(len(sizes), dtype=np.int64), sizes)
+    # every community gets the internal edges of its nodes, but at most a clique
+    internal = np.minimum(
+        np.round(sizes * degree * (1 - mixing) / 2).astype(np.int64),
+        sizes * (sizes - 1) // 2,
+    )
+    owner = np.repeat(np.arange(len(sizes)), internal)
+    u = starts[owner] + (rng.random(len(owner)) * sizes[owner]).astype(np.int64)
+    v = starts[owner] + (rng.random(len(owner)) * sizes[owner]).astype(np.int64)
+    external = int(round(n * degree * mixing / 2))
+    u = np.concatenate([u, rng.integers(0, n, external)])
+    v = np.concatenate([v, rng.integers(0, n, external)])
+    # node ids are shuffled, so that communities are not contiguous ranges
+    permutation = rng.permutation(n)
+    return (
+        simple_edges(permutation[u], permutation[v]),
+        membership[np.argsort(permutation)],
+    )
+
+
+def lfr(
+    n: int, degree: float, mixing: float, seed: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """An LFR benchmark graph with power-law degrees and community sizes"""
+    nk.setSeed(seed, False)
+    generator = nk.generators.LFRGenerator(n)
+    max_degree = max(int(degree * 5), 2)
+    generator.generatePowerlawDegreeSequence(int(degree), max_degree, -2)
+    generator.generatePowerlawCommunitySizeSequence(
+        max_degree, max(max_degree + 1, int(np.sqrt(n) * 10)), -1
+    )
+    generator.setMu(mixing)
+    graph = generator.generate()
+    edges = np.fromiter(
+        (u for e in graph.iterEdges() for u in e),
+        dtype=np.int64,
+        count=2 * graph.numberOfEdges(),
+    ).reshape(-1, 2)
+    membership = np.asarray(generator.getPartition().getVector(), dtype=np.int64)
+    return simple_edges(edges[:, 0], edges[:, 1]), membership
+
+
+def simple_edges(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """The distinct edges between `u` and `v` without self-loops, as an (m, 2) array"""
+    low, high = np.minimum(u, v), np.maximum(u, v)
+    distinct = low != high
+    bound = int(high.max()) + 1 if len(high) else 1
+    keys = np.unique(low[distinct] * bound + high[distinct])
+    return np.stack([keys // bound, keys % bound], axis=1)
+
+
+def write_edgelist(path: str, edges: np.ndarray):
+    # written aside and renamed, so that an interrupted run leaves no partial graph
+    with open(path + ".tmp", "w") as f:
+        for start in range(0, len(edges), WRITE_CHUNK_ROWS):
+            pd.DataFrame(edges[start : start + WRITE_CHUNK_ROWS]).to_csv(
+                f, sep="\t", header=False, index=False
+            )
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,132 @@
+"""Time the cold start of the command line tools and compare it against a stored baseline
+
+    python -m benchmarks.startup --save-baseline
+    python -m benchmarks.startup
+
+Each command runs in a fresh interpreter, so that nothing is imported beforehand. Besides
+time and peak memory, a command regresses when importing its module executes one of
+`HEAVY_MODULES`, which are only to be imported on first use (see `hm01.lazy`).
+"""
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import typer
+
+from .suite import compare
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+COMMANDS: Dict[str, str] = {
+    "cm": "hm01.cm",
+    "cm2universal": "hm01.to_universal",
+}
+
+HEAVY_MODULES = [
+    "networkit",
+    "numpy",
+    "pandas",
+    "scipy",
+    "igraph",
+    "leidenalg",
+    "jsonpickle",
+    "structlog",
+    "tomli",
+]
+
+
+def time_help(module: str) -> Dict[str, float]:
+    """Time and peak memory of `python -m module --help` in a fresh interpreter"""
+    start = time.perf_counter()
+    pid = os.posix_spawn(
+        sys.executable,
+        [sys.executable, "-m", module, "--help"],
+        os.environ,
+        file_actions=[(os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0)],
+    )
+    _, status, usage = os.wait4(pid, 0)
+    seconds = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"`{module} --help` exited with {status}")
+    return {"seconds": seconds, "peak_mb": usage.ru_maxrss / 1024}
+
+
+def eagerly_imported(module: str) -> List[str]:
+    """The `HEAVY_MODULES` executed by importing `module` in a fresh interpreter"""
+    script = (
+        "import json, sys, types\n"
+        f"import {module}\n"
+        f"heavy = {HEAVY_MODULES!r}\n"
+        # a module imported lazily is in sys.modules, but as a subclass until first use
+        "print(json.dumps([m for m in heavy if type(sys.modules.get(m)) is"
+        " types.ModuleType]))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out)
+
+
+def run(repeat: int) -> Dict[str, Dict[str, object]]:
+    results: Dict[str, Dict[str, object]] = {}
+    for name, module in COMMANDS.items():
+        measurements = [time_help(module) for _ in range(repeat)]
+        results[name] = {
+            "seconds": min(m["seconds"] for m in measurements),
+            "peak_mb": max(m["peak_mb"] for m in measurements),
+            "runs": repeat,
+            "eagerly_imported": eagerly_imported(module),
+        }
+    return results
+
+
+def main(
+    repeat: int = typer.Option(5, "--repeat", "-r"),
+    baselines_dir: str = typer.Option(
+        os.path.join(BENCHMARKS_DIR, "baselines"), "--baselines-dir"
+    ),
+    save_baseline: bool = typer.Option(False, "--save-baseline"),
+    tolerance: float = typer.Option(1.25, "--tolerance"),
+    memory_slack_mb: float = typer.Option(8.0, "--memory-slack-mb"),
+):
+    """Benchmark `cm --help` and `cm2universal --help`, exiting with 1 if either regressed
+    """
+    results = run(repeat)
+    for name, result in results.items():
+        typer.echo(
+            f"{name}: {result['seconds']:.3f}s, {result['peak_mb']:.1f}MiB"
+            + (
+                f", imports {result['eagerly_imported']}"
+                if result["eagerly_imported"]
+                else ""
+            )
+        )
+    regressions = [
+        f"{name}: imports {', '.join(result['eagerly_imported'])} at startup"
+        for name, result in results.items()
+        if result["eagerly_imported"]
+    ]
+    baseline_path = os.path.join(baselines_dir, "startup.json")
+    if save_baseline:
+        os.makedirs(baselines_dir, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+    elif os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            regressions.extend(
+                compare(results, json.load(f), tolerance, memory_slack_mb)
+            )
+    else:
+        typer.echo("no baseline to compare against", err=True)
+    for regression in regressions:
+        typer.echo(f"regression {regression}", err=True)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,260 @@
+"""The benchmarks, and measuring their time and peak memory
+
+Each benchmark prepares its inputs in the parent process, outside of the measurement,
+and is then run in a forked child. The child starts from a copy of the prepared inputs,
+so that a benchmark mutating them (such as pruning) can be repeated, and its peak
+resident memory above what it started with is the memory used by the benchmark alone.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from functools import cached_property
+import os
+import pickle as pkl
+import resource
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from hm01 import mincut
+from hm01.clusterers.ikc_wrapper import IkcClusterer, IkcEngine
+from hm01.clusterers.leiden_wrapper import LeidenClusterer
+from hm01.cm import ClusterIgnoreFilter, algorithm_g, run_and_write
+from hm01.context import context
+from hm01.graph import Graph, IntangibleSubgraph, RealizedSubgraph
+from hm01.graph_cache import load_graph
+from hm01.mincut_requirement import MincutRequirement
+from hm01.pruner import prune_graph
+from hm01 import to_universal
+
+from .generators import GraphSpec
+
+LEIDEN_RESOLUTION = 0.01
+IKC_K = 10
+THRESHOLD = "1log10"
+
+
+@dataclass
+class Workload:
+    """A generated graph and the inputs derived from it, computed on first use"""
+
+    spec: GraphSpec
+    path: str
+    membership: np.ndarray
+    scratch_dir: str
+    ikc_engine: IkcEngine = IkcEngine.subprocess
+    _runs: int = field(default=0, repr=False)
+
+    def __post_init__(self):
+        # files for external tools are written there too, instead of next to the caller
+        self.fresh_working_dir()
+
+    @cached_property
+    def graph(self) -> Graph:
+        return load_graph(self.path)
+
+    @cached_property
+    def communities(self) -> List[IntangibleSubgraph]:
+        """The planted communities of at least two nodes"""
+        order = np.argsort(self.membership, kind="stable")
+        bounds = np.flatnonzero(np.diff(self.membership[order])) + 1
+        return [
+            self.graph.intangible_subgraph(nodes.tolist(), str(i))
+            for i, nodes in enumerate(np.split(order, bounds))
+            if len(nodes) > 1
+        ]
+
+    @cached_property
+    def realized(self) -> List[RealizedSubgraph]:
+        return [c.realize(self.graph) for c in self.communities]
+
+    @cached_property
+    def leiden(self) -> LeidenClusterer:
+        return LeidenClusterer(LEIDEN_RESOLUTION)
+
+    @cached_property
+    def first_round(self) -> List[IntangibleSubgraph]:
+        return list(self.leiden.cluster_without_singletons(self.graph))
+
+    @cached_property
+    def cm_output(self) -> str:
+        """The labels of a finished run of CM, with its tree next to it"""
+        output = os.path.join(self.scratch_dir, "cm_output")
+        self.fresh_working_dir()
+        run_and_write(
+            self.graph,
+            self.first_round,
+            self.leiden,
+            MincutRequirement.try_from_str(THRESHOLD),
+            filterer=ClusterIgnoreFilter.default(),
+            workers=1,
+            output=output,
+            stream_output=False,
+        )
+        return output
+
+    def fresh_working_dir(self):
+        """Point the context to a working directory no run has used yet"""
+        self._runs += 1
+        context.with_working_dir(os.path.join(self.scratch_dir, f"work{self._runs}"))
+
+
+def bench_realize(w: Workload) -> Callable[[], None]:
+    communities, graph = w.communities, w.graph
+
+    def run():
+        for community in communities:
+            community.realize(graph)
+
+    return run
+
+
+def bench_prune(w: Workload) -> Callable[[], None]:
+    realized, leiden = w.realized, w.leiden
+    requirement = MincutRequirement.try_from_str(THRESHOLD)
+
+    def run():
+        for subgraph in realized:
+            prune_graph(subgraph, requirement, leiden)
+
+    return run
+
+
+def bench_mincut(w: Workload) -> Callable[[], None]:
+    realized = w.realized
+
+    def run():
+        for subgraph in realized:
+            mincut.find_mincut(subgraph)
+
+    return run
+
+
+def bench_leiden(w: Workload) -> Callable[[], None]:
+    graph, leiden = w.graph, w.leiden
+
+    def run():
+        list(leiden.cluster_without_singletons(graph))
+
+    return run
+
+
+def bench_ikc(w: Workload) -> Callable[[], None]:
+    graph = w.graph
+    ikc = IkcClusterer(IKC_K, w.ikc_engine)
+
+    def run():
+        list(ikc.cluster_without_singletons(graph))
+
+    return run
+
+
+def bench_algorithm_g(w: Workload) -> Callable[[], None]:
+    graph, clusters, leiden = w.graph, w.first_round, w.leiden
+    requirement = MincutRequirement.try_from_str(THRESHOLD)
+    w.fresh_working_dir()
+
+    def run():
+        algorithm_g(graph, list(clusters), leiden, requirement)
+
+    return run
+
+
+def bench_to_universal(w: Workload) -> Callable[[], None]:
+    labels = w.cm_output
+
+    def run():
+        to_universal.main(labels, "", labels, graph_cache=True)
+
+    return run
+
+
+BENCHMARKS: Dict[str, Callable[[Workload], Callable[[], None]]] = {
+    "realize": bench_realize,
+    "prune": bench_prune,
+    "mincut": bench_mincut,
+    "leiden": bench_leiden,
+    "ikc": bench_ikc,
+    "algorithm_g": bench_algorithm_g,
+    "to_universal": bench_to_universal,
+}
+
+
+@dataclass
+class Measurement:
+    seconds: float
+    peak_mb: float
+
+
+def measure(run: Callable[[], None]) -> Measurement:
+    """Run `run` in a forked child, raising `RuntimeError` with its traceback if it fails
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            start_kb = _resident_kb()
+            start = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - start
+            peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            outcome: object = Measurement(seconds, max(0, peak_kb - start_kb) / 1024)
+        except BaseException:
+            outcome = traceback.format_exc()
+        with os.fdopen(write_fd, "wb") as f:
+            pkl.dump(outcome, f)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as f:
+        payload = f.read()
+    os.waitpid(pid, 0)
+    outcome = pkl.loads(payload) if payload else "benchmark process died"
+    if not isinstance(outcome, Measurement):
+        raise RuntimeError(outcome)
+    return outcome
+
+
+def _resident_kb() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def run_benchmark(w: Workload, name: str, repeat: int) -> Dict[str, object]:
+    """The fastest time and the largest peak of `repeat` runs, or the error of the first failure
+    """
+    try:
+        measurements = [measure(BENCHMARKS[name](w)) for _ in range(repeat)]
+    except Exception as e:
+        return {"error": str(e).strip().splitlines()[-1]}
+    return {
+        "seconds": min(m.seconds for m in measurements),
+        "peak_mb": max(m.peak_mb for m in measurements),
+        "runs": repeat,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, object]],
+    baseline: Dict[str, Dict[str, object]],
+    tolerance: float,
+    memory_slack_mb: float,
+) -> List[str]:
+    """Describe the benchmarks slower or larger than `tolerance` times their baseline"""
+    regressions = []
+    for name, result in results.items():
+        base: Optional[Dict[str, object]] = baseline.get(name)
+        if base is None or "error" in base or "error" in result:
+            continue
+        seconds, base_seconds = float(result["seconds"]), float(base["seconds"])
+        if seconds > base_seconds * tolerance:
+            regressions.append(
+                f"{name}: {seconds:.3f}s against a baseline of {base_seconds:.3f}s"
+            )
+        peak, base_peak = float(result["peak_mb"]), float(base["peak_mb"])
+        if peak > base_peak * tolerance + memory_slack_mb:
+            regressions.append(
+                f"{name}: {peak:.1f}MiB against a baseline of {base_peak:.1f}MiB"
+            )
+    return regressions
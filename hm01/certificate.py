@@ -0,0 +1,115 @@
+"""Cheap proofs that a cluster is well connected, to skip the exact mincut
+
+algorithm-g only needs to know whether the edge connectivity of a cluster exceeds its
+validity threshold. The certificates below can prove that it does without finding a
+mincut; when they fail, nothing is known and the exact mincut has to run.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import math
+from typing import Optional, Union
+
+
+from .graph import Graph, RealizedSubgraph, gather_ranges
+from .lazy import lazy_import
+from .mincut import component_labels
+
+np = lazy_import("numpy")
+
+# the neighbor pairs enumerated per round of contraction, beyond which certifying is given up
+MAX_WEDGES = 1 << 23
+
+
+@dataclass
+class ConnectivityCertificate:
+    connectivity: int  # a lower bound on the edge connectivity, above the threshold
+    exact: bool  # whether `connectivity` is the edge connectivity itself
+
+
+def certify_connectivity(
+    graph: Union[Graph, RealizedSubgraph], threshold: float
+) -> Optional[ConnectivityCertificate]:
+    """Try to prove that the edge connectivity of `graph` exceeds `threshold`
+
+    A graph of minimum degree at least n/2 has the minimum degree as its edge
+    connectivity (Chartrand). Otherwise, pairs of nodes that no cut within the
+    threshold can separate are contracted until one node is left (Padberg-Rinaldi).
+    Returns `None` if neither proves anything.
+    """
+    n = graph.n()
+    target = math.floor(threshold) + 1
+    if n < 2 or graph.mcd() < target:
+        return None
+    if graph.mcd() >= n // 2:
+        return ConnectivityCertificate(graph.mcd(), True)
+    src, dst = graph.compact_edge_arrays()
+    if contracts_to_one(n, src, dst, np.ones(len(src), dtype=np.int64), target):
+        return ConnectivityCertificate(target, False)
+    return None
+
+
+def contracts_to_one(
+    n: int, src: np.ndarray, dst: np.ndarray, weights: np.ndarray, target: int
+) -> bool:
+    """Whether contracting node pairs joined by `target` edge-disjoint paths leaves one node
+
+    Nodes u, v are joined by their edges plus one path through each common neighbor z,
+    which carries min(w(u, z), w(v, z)). Every contraction only merges nodes that
+    every cut below `target` keeps on the same side, so ending with one node proves
+    that no such cut exists.
+    """
+    while n > 1:
+        lower = np.minimum(src, dst)
+        upper = np.maximum(src, dst)
+        keys, inverse = np.unique(lower * n + upper, return_inverse=True)
+        weights = np.bincount(inverse, weights=weights).astype(np.int64)
+        src, dst = keys // n, keys % n
+        if (np.bincount(src, weights, n) + np.bincount(dst, weights, n)).min() < target:
+            return False  # the edges around a node are a cut below the target
+        joined = weights + _weight_through_common_neighbors(n, src, dst, weights)
+        if joined is None:
+            return False
+        contract = joined >= target
+        if not contract.any():
+            return False
+        _, groups = np.unique(
+            component_labels(n, src[contract], dst[contract]), return_inverse=True
+        )
+        n = int(groups.max()) + 1
+        outside = groups[src] != groups[dst]
+        src, dst, weights = groups[src[outside]], groups[dst[outside]], weights[outside]
+    return True
+
+
+def _weight_through_common_neighbors(
+    n: int, src: np.ndarray, dst: np.ndarray, weights: np.ndarray
+) -> Optional[np.ndarray]:
+    """For every edge uv (given once, u < v), the sum over common neighbors z of min(w(u, z), w(v, z))
+
+    Returns `None` if there are more than `MAX_WEDGES` neighbor pairs to look at.
+    """
+    rows = np.concatenate([src, dst])
+    columns = np.concatenate([dst, src])
+    order = np.lexsort((columns, rows))
+    rows, columns, both_weights = (
+        rows[order],
+        columns[order],
+        np.tile(weights, 2)[order],
+    )
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    # every position pairs with the later positions in the same row
+    later = indptr[rows + 1] - np.arange(len(rows)) - 1
+    if int(later.sum()) > MAX_WEDGES:
+        return None
+    first = np.repeat(np.arange(len(rows)), later)
+    second = gather_ranges(np.arange(len(rows)) + 1, later)
+    # columns are sorted within a row, so every pair has its smaller node first
+    pair_keys = columns[first] * n + columns[second]
+    edge_keys = src * n + dst  # sorted, as they come from np.unique
+    positions = np.minimum(np.searchsorted(edge_keys, pair_keys), len(edge_keys) - 1)
+    found = edge_keys[positions] == pair_keys
+    through = np.minimum(both_weights[first], both_weights[second])
+    return np.bincount(positions[found], through[found], len(edge_keys)).astype(
+        np.int64
+    )
@@ -18,6 +18,12 @@ class AbstractClusterer(Protocol):
             if cluster.n() > 1:
                 yield cluster
 
+    def recluster(
+        self, side: hm01.graph.RealizedSubgraph
+    ) -> Iterator[hm01.graph.IntangibleSubgraph]:
+        """Recluster one side of a split cluster, without singletons"""
+        return self.cluster_without_singletons(side)
+
     @abstractmethod
     def from_existing_clustering(self, filepath) -> List[hm01.graph.IntangibleSubgraph]:
         raise NotImplementedError
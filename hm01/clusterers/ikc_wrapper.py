@@ -1,26 +1,54 @@
 from dataclasses import dataclass
+from enum import Enum
+from functools import cache
+import importlib.util
 from pathlib import Path
 import subprocess
+from types import ModuleType
 from typing import List, Iterator, Dict, Optional, Tuple, Union
 from collections import defaultdict
+import contextlib
 import csv
-
-import networkit as nk
+import os
 
 from hm01.clusterers.abstract_clusterer import AbstractClusterer
 
 from hm01.graph import Graph, IntangibleSubgraph, RealizedSubgraph
 from hm01.context import context
+from hm01.lazy import lazy_import
+from hm01.result_cache import cached_clustering
+
+nk = lazy_import("networkit")
+
+
+class IkcEngine(str, Enum):
+    subprocess = "subprocess"
+    native = "native"
+
+
+@cache
+def load_ikc_module() -> ModuleType:
+    """Import the IKC script (see `Context.ikc_path`) as a module"""
+    spec = importlib.util.spec_from_file_location("ikc", context.ikc_path)
+    assert spec and spec.loader, f"Cannot load IKC from {context.ikc_path}"
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
 
 @dataclass
 class IkcClusterer(AbstractClusterer):
     k: int
+    engine: IkcEngine = IkcEngine.subprocess
 
+    @cached_clustering
     def cluster(
         self, graph: Union[Graph, RealizedSubgraph]
     ) -> Iterator[IntangibleSubgraph]:
         """Returns a list of (labeled) subgraphs on the graph"""
+        if self.engine == IkcEngine.native:
+            yield from self.cluster_in_process(graph)
+            return
         cluster_id = graph.index  # the cluster id such as 5a6b2
 
         old_to_new_node_id_mapping = graph.continuous_ids
@@ -57,6 +85,40 @@ class IkcClusterer(AbstractClusterer):
             )
         # return retarr
 
+    def cluster_in_process(
+        self, graph: Union[Graph, RealizedSubgraph]
+    ) -> Iterator[IntangibleSubgraph]:
+        """Same as running the IKC script on `as_compact_edgelist_filepath`, but without
+        the script, the edgelist and the CSV files
+        """
+        ikc = load_ikc_module()
+        src, dst = graph.compact_edge_arrays()
+        # mimic the script reading the edgelist with non-continuous, directed ids,
+        # which are assigned in the order of first appearance
+        file_ids: List[int] = []
+        node_map: Dict[int, int] = {}
+        edges = []
+        for u, v in zip(src.tolist(), dst.tolist()):
+            for w in (u, v):
+                if w not in node_map:
+                    node_map[w] = len(file_ids)
+                    file_ids.append(w)
+            edges.append((node_map[u], node_map[v]))
+        read_graph = nk.Graph(len(file_ids), directed=True)
+        for u, v in edges:
+            read_graph.addEdge(u, v)
+        hydrator = graph.hydrator
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            formatted_graph, node_id_dict = ikc.format_graph(read_graph)
+            clusters = ikc.iterative_k_core_decomposition_MCS_ES(
+                formatted_graph, self.k, node_id_dict
+            )
+        for local_cluster_id, (members, _, _) in enumerate(clusters, start=1):
+            yield graph.intangible_subgraph(
+                [int(hydrator[file_ids[node]]) for node in members],
+                str(local_cluster_id),
+            )
+
     def run_ikc(
         self, edge_list_path, graph: Union[Graph, RealizedSubgraph], output_file
     ):
@@ -1,9 +1,12 @@
 from dataclasses import dataclass
-from typing import Dict, Iterator, List, Union
+from typing import Dict, Iterator, List, Optional, Sequence, Union
 from hm01.graph import Graph, IntangibleSubgraph, RealizedSubgraph
 from hm01.clusterers.abstract_clusterer import AbstractClusterer
+from hm01.lazy import lazy_import
+from hm01.result_cache import cached_clustering
 from enum import Enum
-import leidenalg as la
+
+la = lazy_import("leidenalg")
 
 
 class Quality(str, Enum):
@@ -15,21 +18,52 @@ class Quality(str, Enum):
 class LeidenClusterer(AbstractClusterer):
     resolution: float
     quality: Quality = Quality.cpm
+    seed: Optional[int] = None
+    warm_start: bool = False
 
+    @cached_clustering
     def cluster(
-        self, graph: Union[Graph, RealizedSubgraph]
+        self,
+        graph: Union[Graph, RealizedSubgraph],
+        initial_membership: Optional[Sequence[int]] = None,
     ) -> Iterator[IntangibleSubgraph]:
+        """Cluster the graph, starting from `initial_membership` (over compact ids) if given
+        """
         g = graph.to_igraph()
+        if initial_membership is not None:
+            initial_membership = list(initial_membership)
         if self.quality == Quality.cpm:
             partition = la.find_partition(
-                g, la.CPMVertexPartition, resolution_parameter=self.resolution
+                g,
+                la.CPMVertexPartition,
+                initial_membership=initial_membership,
+                resolution_parameter=self.resolution,
+                seed=self.seed,
             )
         else:
-            partition = la.find_partition(g, la.ModularityVertexPartition)
+            partition = la.find_partition(
+                g,
+                la.ModularityVertexPartition,
+                initial_membership=initial_membership,
+                seed=self.seed,
+            )
         for i in range(len(partition)):
             nodes = partition[i]
             yield graph.intangible_subgraph_from_compact(nodes, f"{i+1}")
 
+    def recluster(self, side: RealizedSubgraph) -> Iterator[IntangibleSubgraph]:
+        """Recluster one side of a split cluster, without singletons
+
+        With `warm_start`, Leiden starts from the partition the side was cut from,
+        restricted to the side. The side lies within a single cluster of that partition,
+        so it starts as one community; a side that still is a good community then
+        converges in a fraction of the iterations of a start from singletons.
+        """
+        if not self.warm_start:
+            return self.cluster_without_singletons(side)
+        clusters = self.cluster(side, initial_membership=[0] * side.n())
+        return (c for c in clusters if c.n() > 1)
+
     def from_existing_clustering(self, filepath) -> List[IntangibleSubgraph]:
         # node_id cluster_id format
         clusters: Dict[str, IntangibleSubgraph] = {}
@@ -3,26 +3,48 @@ from __future__ import annotations
 from dataclasses import dataclass
 import typer
 from enum import Enum
-from typing import List, Optional, Tuple, Union, Dict, Deque, cast
+from typing import Iterable, List, Optional, Tuple, Union, Dict, Deque, cast
 import math
+import os
+import signal
 import time
 from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+import multiprocessing
 from hm01.graph import Graph, IntangibleSubgraph, RealizedSubgraph
 from hm01.clusterers.leiden_wrapper import LeidenClusterer, Quality
 from itertools import chain
 import treeswift as ts
-import networkit as nk
-from structlog import get_logger
-import jsonpickle
 from hm01.clusterers.abstract_clusterer import AbstractClusterer
-from .clusterers.ikc_wrapper import IkcClusterer
+from .certificate import certify_connectivity
+from .clusterers.ikc_wrapper import IkcClusterer, IkcEngine
 from .context import context
+from .graph_cache import load_graph
+from .history import TREE_SUFFIX, HistoryTree
+from .journal import Journal
+from .lazy import lazy_import
+from .mincut import MincutEngine, ViecutIo
 from .mincut_requirement import MincutRequirement
+from .profiling import ProfileDelta, profiler
 from .pruner import prune_graph
+from .scheduler import ClusterScheduler, MemoryBudget, SchedulerPolicy
+from .streaming import StreamingOutput
+from .to_universal import read_labels, write_universal
 import sys
 import pickle as pkl
 
 
+structlog = lazy_import("structlog")
+
+# the checkpoint journal is compacted once it outgrows both this size and this multiple of
+# its snapshot, which keeps the total cost of snapshots linear in the size of the journal
+COMPACTION_MIN_BYTES = 64 << 20
+COMPACTION_RATIO = 1.0
+
+# the profile summary of a run is written next to its output
+PROFILE_SUFFIX = ".profile.json"
+
+
 class ClustererSpec(str, Enum):
     leiden = "leiden"
     ikc = "ikc"
@@ -45,6 +67,7 @@ def annotate_tree_node(
     node.graph_index = graph.index
     node.num_nodes = graph.n()
     node.extant = False
+    node.certified = False
 
 
 @dataclass
@@ -78,15 +101,302 @@ class ClusterTreeNode(ts.Node):
     num_nodes: int
     cut_size: Optional[int]
     validity_threshold: Optional[float]
+    certified: bool  # decided valid by a connectivity certificate instead of a mincut
+
+
+@dataclass
+class ClusterResult:
+    """The outcome of processing one popped cluster in algorithm-g
+
+    Computing a result only needs the global graph, so it can happen in any process;
+    merging it into the tree and the labels is done by `AlgorithmState.merge`.
+    """
+
+    index: str
+    filtered: bool = False
+    original_mcd: Optional[int] = None
+    pruned: Optional[IntangibleSubgraph] = None
+    cut_size: Optional[int] = None
+    validity_threshold: Optional[float] = None
+    sides: Optional[Tuple[IntangibleSubgraph, IntangibleSubgraph]] = None
+    children: Optional[Tuple[List[IntangibleSubgraph], List[IntangibleSubgraph]]] = None
+    candidate: Optional[IntangibleSubgraph] = None
+    extant: bool = False
+    certified: bool = False
+
+
+def process_cluster(
+    intangible_subgraph: IntangibleSubgraph,
+    global_graph: Graph,
+    clusterer: Union[IkcClusterer, LeidenClusterer],
+    requirement: MincutRequirement,
+    filterer: ClusterIgnoreFilter,
+) -> ClusterResult:
+    """Prune, mincut and (if needed) split and recluster a single cluster
+
+    The files handed to external tools on the way are removed before returning.
+    """
+    with context.scoped_artifacts():
+        return _process_cluster(
+            intangible_subgraph, global_graph, clusterer, requirement, filterer
+        )
+
+
+def _process_cluster(
+    intangible_subgraph: IntangibleSubgraph,
+    global_graph: Graph,
+    clusterer: Union[IkcClusterer, LeidenClusterer],
+    requirement: MincutRequirement,
+    filterer: ClusterIgnoreFilter,
+) -> ClusterResult:
+    log = structlog.get_logger()
+    result = ClusterResult(intangible_subgraph.index)
+    size = intangible_subgraph.n()
+    profiler.count("clusters")
+    with profiler.stage("filter", size):
+        filtered = filterer(intangible_subgraph, global_graph)
+    if filtered:
+        log.debug("filtered graph", graph_index=intangible_subgraph.index)
+        profiler.count("filtered")
+        result.filtered = True
+        return result
+    with profiler.stage("realize", size):
+        subgraph = intangible_subgraph.realize(global_graph)
+    log = log.bind(
+        g_id=subgraph.index,
+        g_n=subgraph.n(),
+        g_m=subgraph.m(),
+        g_mcd=subgraph.mcd(),
+    )
+    original_mcd = subgraph.mcd()
+    with profiler.stage("prune", size):
+        num_pruned = prune_graph(subgraph, requirement, clusterer)
+    if num_pruned > 0:
+        profiler.count("pruned_nodes", num_pruned)
+        result.original_mcd = original_mcd
+        log = log.bind(
+            g_id=subgraph.index,
+            g_n=subgraph.n(),
+            g_m=subgraph.m(),
+            g_mcd=subgraph.mcd(),
+        )
+        log.info("pruned graph", num_pruned=num_pruned)
+        subgraph.index = f"{subgraph.index}δ"
+        result.pruned = subgraph.to_intangible(global_graph)
+    # is a cluster "cut-valid" -- having good connectivity?
+    valid_threshold = requirement.validity_threshold(clusterer, subgraph)
+    log.debug("calculated validity threshold", validity_threshold=valid_threshold)
+    result.validity_threshold = valid_threshold
+    certificate = None
+    if context.connectivity_certificate:
+        with profiler.stage("certificate", subgraph.n()):
+            certificate = certify_connectivity(subgraph, valid_threshold)
+    if certificate is not None:
+        log.debug(
+            "connectivity certified",
+            connectivity=certificate.connectivity,
+            exact=certificate.exact,
+        )
+        # the certificate only bounds the mincut, unless it is exact
+        result.cut_size = certificate.connectivity if certificate.exact else None
+        result.certified = True
+        profiler.count("certified")
+        mincut_res = None
+    else:
+        with profiler.stage("mincut", subgraph.n()):
+            mincut_res = subgraph.find_mincut()
+        log.debug(
+            "mincut computed",
+            a_side_size=len(mincut_res.light_partition),
+            b_side_size=len(mincut_res.heavy_partition),
+            cut_size=mincut_res.cut_size,
+        )
+        result.cut_size = mincut_res.cut_size
+    # a disconnected cluster is cut between its components with a cut of size 0
+    if (
+        mincut_res is not None
+        and mincut_res.light_partition
+        and mincut_res.heavy_partition
+        and mincut_res.cut_size <= valid_threshold
+    ):
+        p1, p2 = subgraph.cut_by_mincut(mincut_res)
+        with profiler.stage("recluster", p1.n()):
+            subp1 = list(clusterer.recluster(p1))
+        with profiler.stage("recluster", p2.n()):
+            subp2 = list(clusterer.recluster(p2))
+        profiler.count("split")
+        result.sides = (p1.to_intangible(global_graph), p2.to_intangible(global_graph))
+        result.children = (subp1, subp2)
+        log.info(
+            "cluster split",
+            num_a_side=len(subp1),
+            num_b_side=len(subp2),
+            summary_a_side=summarize_graphs(subp1),
+            summary_b_side=summarize_graphs(subp2),
+        )
+    else:
+        candidate = subgraph.to_intangible(global_graph)
+        with profiler.stage("modularity", candidate.n()):
+            mod = global_graph.modularity_of(candidate)
+        result.candidate = candidate
+        # TODO: stop ad-hoc checks of the clusterer being IkcClusterer and
+        # and thus need to use the modularity of the candidate
+        if not isinstance(clusterer, IkcClusterer) or mod > 0:
+            result.extant = True
+            profiler.count("extant")
+            log.info("cut valid, not splitting anymore")
+        else:
+            log.info(
+                "cut valid, but modularity non-positive, thrown away",
+                modularity=mod,
+            )
+    return result
+
+
+@dataclass
+class AlgorithmState:
+    """The mutable state of algorithm-g: the history tree, the labels and the pending clusters
+
+    With a `StreamingOutput`, finished tree nodes and final labels are written out as
+    they come and dropped from the state, and the tree only links nodes to their parents.
+    """
+
+    tree: ts.Tree
+    node2cids: Dict[int, str]
+    node_mapping: Dict[str, ClusterTreeNode]
+    stack: ClusterScheduler
+    ans: List[IntangibleSubgraph]
+    output: Optional[StreamingOutput] = None
+
+    @staticmethod
+    def initial(
+        global_graph: Graph,
+        graphs: List[IntangibleSubgraph],
+        output: Optional[StreamingOutput] = None,
+        policy: SchedulerPolicy = SchedulerPolicy.lifo,
+    ) -> AlgorithmState:
+        tree = ts.Tree()
+        tree.root = ClusterTreeNode()
+        annotate_tree_node(tree.root, global_graph)
+        state = AlgorithmState(
+            tree, {}, {}, ClusterScheduler(policy, graphs), [], output
+        )
+        if output is not None:
+            output.write_tree_node(tree.root)
+        for g in graphs:
+            n = ClusterTreeNode()
+            annotate_tree_node(n, g)
+            state.add_child(tree.root, n)
+            state.node_mapping[g.index] = n
+        return state
+
+    def add_child(self, parent: ClusterTreeNode, child: ClusterTreeNode):
+        if self.output is None:
+            parent.add_child(child)
+        else:
+            # a finished parent is freed once none of its children are pending
+            child.parent = parent
+            self.output.write_tree_node(child)
+
+    def finish_tree_node(self, node: ClusterTreeNode):
+        if self.output is not None:
+            self.output.write_tree_node(node)
+
+    def finish_labels(self, nodes: Iterable[int]):
+        """Write out the labels of `nodes`, which no cluster left on the stack contains
+        """
+        if self.output is not None:
+            self.output.write_labels((u, self.node2cids.pop(u)) for u in nodes)
+
+    def answer(self, intangible_subgraph: IntangibleSubgraph):
+        if self.output is None:
+            self.ans.append(intangible_subgraph)
+
+    def pop(self) -> Optional[IntangibleSubgraph]:
+        """Pop the next cluster to process, returning `None` if it needs no processing
+        """
+        intangible_subgraph = self.stack.pop()
+        update_cid_membership(intangible_subgraph, self.node2cids)
+        if intangible_subgraph.n() <= 1:
+            self.node_mapping.pop(intangible_subgraph.index, None)
+            self.finish_labels(intangible_subgraph.nodes())
+            return None
+        return intangible_subgraph
+
+    def replay(self, index: str, result: ClusterResult):
+        """Redo the merge of a journaled result, including the pops that came before it
+        """
+        intangible_subgraph = self.pop()
+        while intangible_subgraph is None:
+            intangible_subgraph = self.pop()
+        assert (
+            intangible_subgraph.index == index
+        ), f"journal expected {index}, but the stack has {intangible_subgraph.index}"
+        self.merge(intangible_subgraph, result)
+
+    def merge(self, intangible_subgraph: IntangibleSubgraph, result: ClusterResult):
+        """Record the result of processing a popped cluster"""
+        tree_node = self.node_mapping.pop(result.index)
+        if result.filtered:
+            self.answer(intangible_subgraph)
+            self.finish_labels(intangible_subgraph.nodes())
+            return
+        if result.pruned is not None:
+            tree_node.cut_size = result.original_mcd
+            self.finish_tree_node(tree_node)
+            new_child = ClusterTreeNode()
+            annotate_tree_node(new_child, result.pruned)
+            self.add_child(tree_node, new_child)
+            tree_node = new_child
+            update_cid_membership(result.pruned, self.node2cids)
+        tree_node.cut_size = result.cut_size
+        tree_node.validity_threshold = result.validity_threshold
+        if result.sides is not None and result.children is not None:
+            self.finish_tree_node(tree_node)
+            subp1, subp2 = result.children
+            for side, subp in zip(result.sides, result.children):
+                side_node = ClusterTreeNode()
+                annotate_tree_node(side_node, side)
+                self.add_child(tree_node, side_node)
+                for sg in subp:
+                    n = ClusterTreeNode()
+                    annotate_tree_node(n, sg)
+                    self.node_mapping[sg.index] = n
+                    self.add_child(side_node, n)
+            self.stack.extend(subp1)
+            self.stack.extend(subp2)
+            if self.output is not None:
+                pending = set(
+                    chain.from_iterable(g.subset for g in chain(subp1, subp2))
+                )
+                self.finish_labels(
+                    u for u in intangible_subgraph.nodes() if u not in pending
+                )
+        else:
+            assert result.candidate is not None
+            if result.extant:
+                self.answer(result.candidate)
+            tree_node.extant = result.extant
+            tree_node.certified = result.certified
+            self.finish_tree_node(tree_node)
+            self.finish_labels(intangible_subgraph.nodes())
 
 
 @dataclass
 class Checkpoint:
+    """A snapshot of the state of algorithm-g
+
+    The results merged after the snapshot was taken are kept in a journal next to it
+    (see `CheckpointJournal`), and are replayed when the checkpoint is loaded.
+    """
+
     tree: ts.Tree
     node2cids: Dict[int, str]
     node_mapping: Dict[str, ClusterTreeNode]
-    stack: List[IntangibleSubgraph]
+    stack: ClusterScheduler
     ans: List[IntangibleSubgraph]
+    path: Optional[str] = None
+    output: Optional[StreamingOutput] = None
 
     @staticmethod
     def load() -> Optional[Checkpoint]:
@@ -95,15 +405,277 @@ class Checkpoint:
             return None
         try:
             with open(latest_checkpoint_path, "rb") as f:
-                return pkl.load(f)
+                checkpoint: Checkpoint = pkl.load(f)
         except FileNotFoundError:
             return None
+        state = checkpoint.to_state()
+        records = Journal.recover(Checkpoint.journal_path(latest_checkpoint_path))
+        for index, result in records:
+            state.replay(index, result)
+        structlog.get_logger().info(
+            "replayed checkpoint journal",
+            checkpoint=latest_checkpoint_path,
+            num_records=len(records),
+        )
+        return Checkpoint.from_state(state, latest_checkpoint_path)
+
+    @staticmethod
+    def from_state(state: AlgorithmState, path: Optional[str] = None) -> Checkpoint:
+        return Checkpoint(
+            state.tree,
+            state.node2cids,
+            state.node_mapping,
+            state.stack,
+            state.ans,
+            path,
+            state.output,
+        )
 
-    def save(self):
-        with open(
-            context.request_subpath(f"checkpoint.{int(time.time())}.pkl"), "wb"
-        ) as f:
+    def to_state(self) -> AlgorithmState:
+        if isinstance(self.stack, list):
+            # checkpointed by a version before the scheduler, which kept a stack
+            self.stack = ClusterScheduler(SchedulerPolicy.lifo, self.stack)
+        return AlgorithmState(
+            self.tree,
+            self.node2cids,
+            self.node_mapping,
+            self.stack,
+            self.ans,
+            self.output,
+        )
+
+    def save(self) -> str:
+        """Save the snapshot to a new file in the working directory, returning its path
+        """
+        path = context.request_subpath(f"checkpoint.{time.time_ns()}.pkl")
+        # written aside and renamed, so that a crash never leaves a partial snapshot
+        with open(path + ".tmp", "wb") as f:
             pkl.dump(self, f)
+        os.replace(path + ".tmp", path)
+        self.path = path
+        return path
+
+    @staticmethod
+    def journal_path(checkpoint_path: str) -> str:
+        return checkpoint_path.removesuffix(".pkl") + ".journal"
+
+    @staticmethod
+    def discard_latest():
+        """Remove the checkpoint of a finished run once its outputs are written"""
+        latest_checkpoint_path = context.find_latest_checkpoint()
+        if not latest_checkpoint_path:
+            return
+        journal_path = Checkpoint.journal_path(latest_checkpoint_path)
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+        os.remove(latest_checkpoint_path)
+
+
+class CheckpointJournal:
+    """Checkpoints algorithm-g after every merged cluster
+
+    Each merged result is appended to the journal of the latest snapshot. Once the
+    journal grows too large, it is compacted: a new snapshot is taken, and the previous
+    snapshot and its journal are removed.
+    """
+
+    def __init__(self, state: AlgorithmState, checkpoint: Optional[Checkpoint] = None):
+        self.snapshot_path: Optional[str] = None
+        self.journal: Optional[Journal] = None
+        if checkpoint is not None and checkpoint.path is not None:
+            self._open(checkpoint.path)
+        else:
+            self.compact(state)
+
+    def _open(self, snapshot_path: str):
+        self.snapshot_path = snapshot_path
+        self.snapshot_size = os.path.getsize(snapshot_path)
+        self.journal = Journal(Checkpoint.journal_path(snapshot_path))
+
+    def record(
+        self,
+        intangible_subgraph: IntangibleSubgraph,
+        result: ClusterResult,
+        state: AlgorithmState,
+    ):
+        """Journal a result just merged into `state`"""
+        assert self.journal is not None
+        self.journal.append((intangible_subgraph.index, result))
+        if self.journal.size() > max(
+            COMPACTION_RATIO * self.snapshot_size, COMPACTION_MIN_BYTES
+        ):
+            self.compact(state)
+
+    def compact(self, state: AlgorithmState):
+        log = structlog.get_logger()
+        # compacting removes the previous snapshot, which a worker that took over a
+        # shared working directory may be resuming from
+        context.check_working_dir_lock(verify=True)
+        log.info("checkpointing")
+        previous_snapshot, previous_journal = self.snapshot_path, self.journal
+        self._open(Checkpoint.from_state(state).save())
+        if previous_journal is not None:
+            previous_journal.close()
+            os.remove(previous_journal.path)
+        if previous_snapshot is not None:
+            os.remove(previous_snapshot)
+        log.info("checkpoint saved", checkpoint=self.snapshot_path)
+
+    def size(self) -> int:
+        """The bytes taken by the snapshot and its journal"""
+        assert self.journal is not None
+        return self.snapshot_size + self.journal.size()
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+    def discard(self):
+        """Remove the checkpoint of a finished run, which has nothing left to resume"""
+        self.close()
+        if self.journal is not None:
+            os.remove(self.journal.path)
+        if self.snapshot_path is not None:
+            os.remove(self.snapshot_path)
+
+
+def _exit_on_sigterm(signum, frame):
+    # unwinds through the `finally` of algorithm-g, which flushes the journal
+    raise SystemExit(128 + signum)
+
+
+# arguments of `process_cluster` shared by all workers, set once per worker process
+_worker_args: Optional[
+    Tuple[Graph, AbstractClusterer, MincutRequirement, ClusterIgnoreFilter]
+] = None
+
+
+def _init_worker(
+    global_graph: Graph,
+    clusterer: AbstractClusterer,
+    requirement: MincutRequirement,
+    filterer: ClusterIgnoreFilter,
+):
+    global _worker_args
+    _worker_args = (global_graph, clusterer, requirement, filterer)
+    profiler.forked()
+    # the handler of the main process is inherited through fork; only the main process checkpoints
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _process_cluster_in_worker(
+    intangible_subgraph: IntangibleSubgraph,
+) -> Tuple[ClusterResult, Optional[ProfileDelta]]:
+    """Process a cluster, returning also the profile accumulated by the worker meanwhile
+    """
+    assert _worker_args is not None, "worker not initialized"
+    global_graph, clusterer, requirement, filterer = _worker_args
+    result = process_cluster(
+        intangible_subgraph,
+        global_graph,
+        cast(Union[IkcClusterer, LeidenClusterer], clusterer),
+        requirement,
+        filterer,
+    )
+    return result, profiler.take()
+
+
+class ClusterPool:
+    """Computes `ClusterResult`s ahead of time in a pool of worker processes
+
+    Clusters about to be popped are handed to the workers speculatively, the next one
+    first and then the heaviest, and only while their estimated footprint fits the
+    memory budget; since each result only depends on its own cluster, the main process
+    can still merge the results in the exact order a serial run would.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        global_graph: Graph,
+        clusterer: AbstractClusterer,
+        requirement: MincutRequirement,
+        filterer: ClusterIgnoreFilter,
+        memory_budget: int = 0,
+    ):
+        # the working directory must exist before the workers are forked
+        context.working_dir
+        self.budget = MemoryBudget(global_graph, memory_budget)
+        # computed before the workers are forked, to be shared with them
+        global_graph.degrees
+        self.lookahead = workers * 4
+        self.futures: Dict[
+            str, Future[Tuple[ClusterResult, Optional[ProfileDelta]]]
+        ] = {}
+        self.executor = ProcessPoolExecutor(
+            workers,
+            # fork so that the global graph is shared copy-on-write with the workers
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(global_graph, clusterer, requirement, filterer),
+        )
+
+    def prefetch(self, stack: ClusterScheduler):
+        """Submit the clusters that will be popped next: the very next one first, since
+        it is waited on, then the others heaviest first, so that a giant cluster does not
+        start last
+        """
+        if len(self.futures) >= self.lookahead:
+            return
+        following = (g for g in stack.upcoming() if g.n() > 1)
+        head = next(following, None)
+        if head is None:
+            return
+        if head.index not in self.futures:
+            if not self.budget.admit(head):
+                return  # nothing may overtake the next cluster while it waits to fit
+            self.futures[head.index] = self.executor.submit(
+                _process_cluster_in_worker, head
+            )
+        upcoming = []
+        for g in following:
+            if len(self.futures) + len(upcoming) >= self.lookahead:
+                break
+            if g.index not in self.futures:
+                upcoming.append(g)
+        upcoming.sort(key=self.budget.estimate, reverse=True)
+        for g in upcoming:
+            # lighter clusters may still fit when a heavier one did not
+            if self.budget.admit(g):
+                self.futures[g.index] = self.executor.submit(
+                    _process_cluster_in_worker, g
+                )
+
+    def _wait_to_fit(self, intangible_subgraph: IntangibleSubgraph):
+        """Wait until the clusters in flight leave room for `intangible_subgraph`"""
+        while not self.budget.admit(intangible_subgraph):
+            running = [
+                future
+                for index, future in self.futures.items()
+                if index in self.budget.in_flight
+            ]
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            # a finished cluster only holds its result until it is popped
+            for index, future in self.futures.items():
+                if future in done:
+                    self.budget.release_index(index)
+
+    def result(self, intangible_subgraph: IntangibleSubgraph) -> ClusterResult:
+        future = self.futures.pop(intangible_subgraph.index, None)
+        if future is None:
+            self._wait_to_fit(intangible_subgraph)
+            future = self.executor.submit(
+                _process_cluster_in_worker, intangible_subgraph
+            )
+        try:
+            result, profile = future.result()
+        finally:
+            self.budget.release(intangible_subgraph)
+        profiler.merge(profile)
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 
 def algorithm_g(
@@ -113,133 +685,85 @@ def algorithm_g(
     requirement: MincutRequirement,
     checkpoint: Optional[Checkpoint] = None,
     filterer: ClusterIgnoreFilter = ClusterIgnoreFilter.default(),
+    workers: int = 1,
+    output: Optional[StreamingOutput] = None,
+    scheduler: SchedulerPolicy = SchedulerPolicy.lifo,
+    memory_budget: int = 0,
+    keep_checkpoint: bool = False,
 ) -> Tuple[List[IntangibleSubgraph], Dict[int, str], ts.Tree]:
-    log = get_logger()
+    """Run algorithm-g on the clusters `graphs`, returning the valid clusters, the labels and the tree
+
+    With `output`, the labels and the tree are written to it as the run goes, and only
+    what is still pending is returned. A run resumed from `checkpoint` writes to the
+    output of the checkpointed run, and pops its clusters in the order of its scheduler.
+    With `workers`, the clusters processed at once are limited to `memory_budget` bytes
+    by their estimated footprint, unless it is 0. With `keep_checkpoint`, the checkpoint
+    of the finished run is left for the caller to discard (see `Checkpoint.discard_latest`).
+    """
+    log = structlog.get_logger()
     if not checkpoint:
-        tree = ts.Tree()
-        tree.root = ClusterTreeNode()
-        annotate_tree_node(tree.root, global_graph)
-        node_mapping: Dict[str, ClusterTreeNode] = {}
-        for g in graphs:
-            n = ClusterTreeNode()
-            annotate_tree_node(n, g)
-            tree.root.add_child(n)
-            node_mapping[g.index] = n
-        stack: List[IntangibleSubgraph] = list(graphs)
-        ans: List[IntangibleSubgraph] = []
-        node2cids: Dict[int, str] = {}
+        state = AlgorithmState.initial(global_graph, graphs, output, scheduler)
     else:
-        tree = checkpoint.tree
-        node_mapping = checkpoint.node_mapping
-        stack = checkpoint.stack
-        ans = checkpoint.ans
-        node2cids = checkpoint.node2cids
+        state = checkpoint.to_state()
         log.info("loaded checkpoint")
-    log.info("starting algorithm-g", queue_size=len(stack))
-    last_checkpoint_time = time.time()
-    while stack:
-        log = get_logger()
-        log.debug("entered next iteration of loop", queue_size=len(stack))
-        intangible_subgraph = stack.pop()
-        log.debug(
-            "popped graph",
-            graph_n=intangible_subgraph.n(),
-            graph_index=intangible_subgraph.index,
-        )
-        update_cid_membership(intangible_subgraph, node2cids)
-        if intangible_subgraph.n() <= 1:
-            continue
-        if filterer(intangible_subgraph, global_graph):
-            log.debug("filtered graph", graph_index=intangible_subgraph.index)
-            ans.append(intangible_subgraph)
-            continue
-        subgraph = intangible_subgraph.realize(global_graph)
-        tree_node = node_mapping[subgraph.index]
-        log = log.bind(
-            g_id=subgraph.index,
-            g_n=subgraph.n(),
-            g_m=subgraph.m(),
-            g_mcd=subgraph.mcd(),
-        )
-        original_mcd = subgraph.mcd()
-        num_pruned = prune_graph(subgraph, requirement, clusterer)
-        if num_pruned > 0:
-            tree_node.cut_size = original_mcd
-            log = log.bind(
-                g_id=subgraph.index,
-                g_n=subgraph.n(),
-                g_m=subgraph.m(),
-                g_mcd=subgraph.mcd(),
+        if state.stack.policy != scheduler:
+            log.warning(
+                "resuming with the scheduler of the checkpoint",
+                scheduler=state.stack.policy,
             )
-            log.info("pruned graph", num_pruned=num_pruned)
-            new_child = ClusterTreeNode()
-            subgraph.index = f"{subgraph.index}δ"
-            annotate_tree_node(new_child, subgraph)
-            tree_node.add_child(new_child)
-            node_mapping[subgraph.index] = new_child
-            tree_node = new_child
-            update_cid_membership(subgraph, node2cids)
-        mincut_res = subgraph.find_mincut()
-        # is a cluster "cut-valid" -- having good connectivity?
-        valid_threshold = requirement.validity_threshold(clusterer, subgraph)
-        log.debug("calculated validity threshold", validity_threshold=valid_threshold)
-        log.debug(
-            "mincut computed",
-            a_side_size=len(mincut_res.light_partition),
-            b_side_size=len(mincut_res.heavy_partition),
-            cut_size=mincut_res.cut_size,
+    log.info(
+        "starting algorithm-g",
+        queue_size=len(state.stack),
+        workers=workers,
+        scheduler=state.stack.policy,
+    )
+    checkpoints = CheckpointJournal(state, checkpoint)
+    pool = (
+        ClusterPool(
+            workers, global_graph, clusterer, requirement, filterer, memory_budget
         )
-        tree_node.cut_size = mincut_res.cut_size
-        tree_node.validity_threshold = valid_threshold
-        if mincut_res.cut_size <= valid_threshold and mincut_res.cut_size > 0:
-            p1, p2 = subgraph.cut_by_mincut(mincut_res)
-            node_a = ClusterTreeNode()
-            node_b = ClusterTreeNode()
-            annotate_tree_node(node_a, p1)
-            annotate_tree_node(node_b, p2)
-            tree_node.add_child(node_a)
-            tree_node.add_child(node_b)
-            node_mapping[p1.index] = node_a
-            node_mapping[p2.index] = node_b
-            subp1 = list(clusterer.cluster_without_singletons(p1))
-            subp2 = list(clusterer.cluster_without_singletons(p2))
-            for p, np in [(subp1, node_a), (subp2, node_b)]:
-                for sg in p:
-                    n = ClusterTreeNode()
-                    annotate_tree_node(n, sg)
-                    node_mapping[sg.index] = n
-                    np.add_child(n)
-            stack.extend(subp1)
-            stack.extend(subp2)
-            log.info(
-                "cluster split",
-                num_a_side=len(subp1),
-                num_b_side=len(subp2),
-                summary_a_side=summarize_graphs(subp1),
-                summary_b_side=summarize_graphs(subp2),
+        if workers > 1
+        else None
+    )
+    previous_sigterm_handler = signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    try:
+        while state.stack:
+            log = structlog.get_logger()
+            log.debug("entered next iteration of loop", queue_size=len(state.stack))
+            if pool:
+                pool.prefetch(state.stack)
+            intangible_subgraph = state.pop()
+            if intangible_subgraph is None:
+                continue
+            log.debug(
+                "popped graph",
+                graph_n=intangible_subgraph.n(),
+                graph_index=intangible_subgraph.index,
             )
-        else:
-            candidate = subgraph.to_intangible(global_graph)
-            mod = global_graph.modularity_of(candidate)
-            # TODO: stop ad-hoc checks of the clusterer being IkcClusterer and
-            # and thus need to use the modularity of the candidate
-            if not isinstance(clusterer, IkcClusterer) or mod > 0:
-                ans.append(candidate)
-                node_mapping[subgraph.index].extant = True
-                log.info("cut valid, not splitting anymore")
+            if pool:
+                result = pool.result(intangible_subgraph)
             else:
-                node_mapping[subgraph.index].extant = False
-                log.info(
-                    "cut valid, but modularity non-positive, thrown away",
-                    modularity=mod,
+                result = process_cluster(
+                    intangible_subgraph, global_graph, clusterer, requirement, filterer
                 )
-        if time.time() - last_checkpoint_time > 3600 * 2:
-            last_checkpoint_time = time.time()
-            log.info("checkpointing")
-            checkpoint = Checkpoint(tree, node2cids, node_mapping, ans, stack)
-            checkpoint.save()
-            log.info("checkpoint saved")
-    return ans, node2cids, tree
+            context.check_working_dir_lock()
+            state.merge(intangible_subgraph, result)
+            with profiler.stage("checkpoint", intangible_subgraph.n()):
+                if state.output is not None:
+                    state.output.flush()
+                checkpoints.record(intangible_subgraph, result, state)
+                context.enforce_workdir_budget(checkpoints.size())
+            profiler.maybe_write()
+        if state.output is not None:
+            state.output.close()
+        if not keep_checkpoint:
+            checkpoints.discard()
+    finally:
+        signal.signal(signal.SIGTERM, previous_sigterm_handler)
+        checkpoints.close()
+        if pool:
+            pool.shutdown()
+    return state.ans, state.node2cids, state.tree
 
 
 # FIXME: many of the below arguments should be of type "pathlib.Path"
@@ -256,46 +780,106 @@ def main(
     output: str = typer.Option("", "--output", "-o"),
     ignore_trees: bool = typer.Option(False, "--ignore-trees", "-x"),
     ignore_smaller_than: int = typer.Option(0, "--ignore-smaller-than", "-s"),
+    workers: int = typer.Option(1, "--workers", "-w"),
+    mincut_engine: MincutEngine = typer.Option(MincutEngine.viecut, "--mincut-engine"),
+    ikc_engine: IkcEngine = typer.Option(IkcEngine.subprocess, "--ikc-engine"),
+    graph_cache: bool = typer.Option(True, "--graph-cache/--no-graph-cache"),
+    stream_output: bool = typer.Option(False, "--stream-output"),
+    emit_universal: bool = typer.Option(False, "--emit-universal"),
+    connectivity_certificate: bool = typer.Option(
+        False, "--connectivity-certificate/--exact-connectivity"
+    ),
+    result_cache_mb: int = typer.Option(0, "--result-cache-mb"),
+    leiden_warm_start: bool = typer.Option(False, "--leiden-warm-start"),
+    viecut_io: ViecutIo = typer.Option(ViecutIo.file, "--viecut-io"),
+    max_workdir_bytes: int = typer.Option(0, "--max-workdir-bytes"),
+    profile: bool = typer.Option(False, "--profile"),
+    profile_python: bool = typer.Option(False, "--profile-python"),
+    scheduler: SchedulerPolicy = typer.Option(SchedulerPolicy.lifo, "--scheduler"),
+    memory_budget_mb: int = typer.Option(0, "--memory-budget"),
 ):
     """Connectivity-Modifier (CM). Take a network and cluster it ensuring cut validity
     """
+    # pickling the tree into checkpoints recurses along the depth of the tree
     sys.setrecursionlimit(1231231234)
-    if clusterer_spec == ClustererSpec.leiden:
-        assert resolution != -1, "Leiden requires resolution"
-        clusterer: Union[LeidenClusterer, IkcClusterer] = LeidenClusterer(resolution)
-    elif clusterer_spec == ClustererSpec.leiden_mod:
-        assert resolution == -1, "Leiden with modularity does not support resolution"
-        clusterer = LeidenClusterer(resolution, quality=Quality.modularity)
-    else:
-        assert k != -1, "IKC requires k"
-        clusterer = IkcClusterer(k)
-    log = get_logger()
+    clusterer = make_clusterer(
+        clusterer_spec, k, resolution, ikc_engine, leiden_warm_start
+    )
+    log = structlog.get_logger()
     context.with_working_dir(input + "_working_dir" if not working_dir else working_dir)
+    context.with_mincut_engine(mincut_engine)
+    context.with_viecut_io(viecut_io)
+    context.with_max_workdir_bytes(max_workdir_bytes)
+    context.with_connectivity_certificate(connectivity_certificate)
+    context.with_result_cache(result_cache_mb << 20)
     log.info(
         f"starting hm01",
         input=input,
         working_dir=context.working_dir,
         clusterer=clusterer,
+        mincut_engine=mincut_engine,
     )
+    assert workers >= 1, "Number of workers must be positive"
     requirement = MincutRequirement.try_from_str(threshold)
     log.info(f"parsed connectivity requirement", requirement=requirement)
     filterer = ClusterIgnoreFilter(ignore_trees, ignore_smaller_than)
     log.info(f"parsed cluster filter", filterer=filterer)
-    time1 = time.time()
-    edgelist_reader = nk.graphio.EdgeListReader("\t", 0)
-    nk_graph = edgelist_reader.read(input)
-    log.info(
-        f"loaded graph",
-        n=nk_graph.numberOfNodes(),
-        m=nk_graph.numberOfEdges(),
-        elapsed=time.time() - time1,
-    )
-    root_graph = Graph(nk_graph, "")
+    if profile or profile_python:
+        profiler.enable(output + PROFILE_SUFFIX, profile_python)
+    try:
+        with profiler.stage("load_graph"):
+            root_graph = load_graph(input, graph_cache)
+        clusters = first_round(root_graph, clusterer, existing_clustering)
+        run_and_write(
+            root_graph,
+            clusters,
+            clusterer,
+            requirement,
+            filterer,
+            workers,
+            output,
+            stream_output,
+            scheduler,
+            memory_budget_mb << 20,
+            emit_universal,
+        )
+    finally:
+        profiler.finish()
+
+
+def make_clusterer(
+    clusterer_spec: ClustererSpec,
+    k: int,
+    resolution: float,
+    ikc_engine: IkcEngine,
+    leiden_warm_start: bool = False,
+) -> Union[LeidenClusterer, IkcClusterer]:
+    if clusterer_spec == ClustererSpec.leiden:
+        assert resolution != -1, "Leiden requires resolution"
+        return LeidenClusterer(resolution, warm_start=leiden_warm_start)
+    elif clusterer_spec == ClustererSpec.leiden_mod:
+        assert resolution == -1, "Leiden with modularity does not support resolution"
+        return LeidenClusterer(
+            resolution, quality=Quality.modularity, warm_start=leiden_warm_start
+        )
+    else:
+        assert k != -1, "IKC requires k"
+        return IkcClusterer(k, ikc_engine)
+
+
+def first_round(
+    root_graph: Graph,
+    clusterer: Union[LeidenClusterer, IkcClusterer],
+    existing_clustering: Optional[str],
+) -> List[IntangibleSubgraph]:
+    """The clusters algorithm-g starts from, either computed or loaded from a file"""
+    log = structlog.get_logger()
     if not existing_clustering:
         log.info(
             f"running first round of clustering before algorithm-g", clusterer=clusterer
         )
-        clusters = list(clusterer.cluster_without_singletons(root_graph))
+        with context.scoped_artifacts(), profiler.stage("first_round", root_graph.n()):
+            clusters = list(clusterer.cluster_without_singletons(root_graph))
     else:
         log.info(f"loading existing clustering before algorithm-g", clusterer=clusterer)
         clusters = clusterer.from_existing_clustering(existing_clustering)
@@ -304,14 +888,83 @@ def main(
         num_clusters=len(clusters),
         summary=summarize_graphs(clusters),
     )
+    return clusters
+
+
+def run_and_write(
+    root_graph: Graph,
+    clusters: List[IntangibleSubgraph],
+    clusterer: Union[LeidenClusterer, IkcClusterer],
+    requirement: MincutRequirement,
+    filterer: ClusterIgnoreFilter,
+    workers: int,
+    output: str,
+    stream_output: bool,
+    scheduler: SchedulerPolicy = SchedulerPolicy.lifo,
+    memory_budget: int = 0,
+    emit_universal: bool = False,
+    keep_checkpoint: bool = False,
+):
+    """Run algorithm-g, resuming from the checkpoint in the working directory if any,
+    and write the labels to `output` and the tree next to it
+
+    With `emit_universal`, the clusters before and after are also written as by
+    `cm2universal`, from the labels and the tree still in memory. The checkpoint is
+    only discarded once everything is written and synced to disk, or not at all with
+    `keep_checkpoint`.
+    """
+    checkpoint = Checkpoint.load()
+    if checkpoint is not None and checkpoint.output is not None:
+        stream_output = True  # a streaming run resumes writing to its own output
+    streaming_output = (
+        StreamingOutput(output, output + ".tree.ndjson")
+        if stream_output and checkpoint is None
+        else None
+    )
     new_clusters, labels, tree = algorithm_g(
-        root_graph, clusters, clusterer, requirement, Checkpoint.load(), filterer
+        root_graph,
+        list(clusters),
+        clusterer,
+        requirement,
+        checkpoint,
+        filterer,
+        workers,
+        streaming_output,
+        scheduler,
+        memory_budget,
+        keep_checkpoint=True,
     )
-    with open(output, "w+") as f:
-        for n, cid in labels.items():
-            f.write(f"{n} {cid}\n")
-    with open(output + ".tree.json", "w+") as f:
-        f.write(cast(str, jsonpickle.encode(tree)))
+    context.check_working_dir_lock(verify=True)
+    if stream_output:
+        sync_file(output)
+        sync_file(output + ".tree.ndjson")
+        if emit_universal:
+            # the labels and the tree of a streaming run are only on disk
+            with profiler.stage("universal"):
+                write_universal(
+                    HistoryTree.load_for_output(output), *read_labels(output), output
+                )
+    else:
+        with open(output, "w+") as f:
+            for n, cid in labels.items():
+                f.write(f"{n} {cid}\n")
+        sync_file(output)
+        history = HistoryTree.from_tree(tree)
+        history.save(output + TREE_SUFFIX)
+        sync_file(output + TREE_SUFFIX)
+        if emit_universal:
+            with profiler.stage("universal"):
+                write_universal(
+                    history, list(labels.keys()), list(labels.values()), output
+                )
+    if not keep_checkpoint:
+        Checkpoint.discard_latest()
+
+
+def sync_file(path: str):
+    """Flush a written file to disk, so that it outlives a crash"""
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
 
 
 def entry_point():
@@ -0,0 +1,232 @@
+"""Compare the clusters changed by CM with the clusters they were split from
+
+A cluster of the final clustering changed when its label is not in the initial
+clustering. CM labels the clusters split from cluster `12` as `12a`, `12b`, ... so the
+label of the original cluster is whatever comes before the first letter.
+
+The metrics of all changed clusters and of their originals are computed in batches over
+the CSR arrays of the global graph (see `Graph.cluster_metrics`), so that they are linear
+in the size of the clusters, and written as one JSON object per cluster.
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from enum import Enum
+from itertools import chain
+import json
+import multiprocessing
+import re
+from typing import Dict, List, Optional, Tuple
+
+import typer
+
+from .graph import ClusterMetrics, Graph
+from .graph_cache import load_graph
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+structlog = lazy_import("structlog")
+
+# the first letter (or underscore) of a label ends the label of the cluster it was split from
+SPLIT_SUFFIX = re.compile(r"[^\W\d]")
+
+
+class ColumnOrder(str, Enum):
+    node_cluster = "node_cluster"
+    cluster_node = "cluster_node"
+
+
+@dataclass
+class ClusterComparison:
+    label: str
+    original: Optional[
+        str
+    ]  # the cluster it was split from, None for the original clusters
+    num_nodes: int
+    num_edges: int
+    modularity: float
+    mcd: int
+    conductance: Optional[float]  # None if neither side of the cut has any edge
+    marker_nodes: Optional[int]  # None without a marker nodes file
+
+
+def read_clustering(path: str, order: ColumnOrder) -> Dict[str, List[int]]:
+    """The nodes of each cluster of a clustering file, clusters in order of first appearance
+    """
+    with open(path, "r") as f:
+        tokens = f.read().split()
+    nodes, labels = tokens[0::2], tokens[1::2]
+    if order == ColumnOrder.cluster_node:
+        nodes, labels = labels, nodes
+    clusters: Dict[str, List[int]] = {}
+    for node, label in zip(nodes, labels):
+        clusters.setdefault(label, []).append(int(node))
+    return clusters
+
+
+def read_marker_nodes(path: str) -> np.ndarray:
+    """The node ids in the second column of a `doi,integer_id,pub_id` CSV with a header
+    """
+    return np.loadtxt(
+        path, delimiter=",", skiprows=1, usecols=1, dtype=np.int64, ndmin=1
+    )
+
+
+def changed_clusters(
+    initial: Dict[str, List[int]], final: Dict[str, List[int]]
+) -> Dict[str, str]:
+    """The label of the original cluster of every cluster of `final` not in `initial`"""
+    originals = {}
+    for label in final:
+        if label in initial:
+            continue
+        match = SPLIT_SUFFIX.search(label)
+        original = label[: match.start()] if match else label
+        assert (
+            original in initial
+        ), f"cluster {label} is not split from an initial cluster"
+        originals[label] = original
+    return originals
+
+
+# the graph and the clusters measured by the workers, inherited through fork
+_worker_args: Optional[Tuple[Graph, List[List[int]]]] = None
+
+
+def _init_worker(graph: Graph, clusters: List[List[int]]):
+    global _worker_args
+    _worker_args = (graph, clusters)
+
+
+def _cluster_metrics_in_worker(bounds: Tuple[int, int]) -> ClusterMetrics:
+    assert _worker_args is not None, "worker not initialized"
+    graph, clusters = _worker_args
+    return graph.cluster_metrics(clusters[bounds[0] : bounds[1]])
+
+
+def cluster_metrics(
+    graph: Graph, clusters: List[List[int]], workers: int = 1
+) -> ClusterMetrics:
+    """`graph.cluster_metrics(clusters)`, computed by `workers` forked processes"""
+    if workers <= 1 or len(clusters) <= 1:
+        return graph.cluster_metrics(clusters)
+    # computed before the workers are forked, to be shared with them
+    graph.degrees
+    # a few chunks per worker of about the same number of nodes, so that a giant
+    # cluster does not leave the other workers idle
+    ends = np.cumsum([len(c) for c in clusters])
+    cuts = np.searchsorted(ends, np.linspace(0, ends[-1], workers * 4 + 1)[1:-1])
+    bounds = np.unique(np.concatenate([[0], cuts + 1, [len(clusters)]])).tolist()
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker,
+        initargs=(graph, clusters),
+    ) as executor:
+        return ClusterMetrics.concatenate(
+            list(executor.map(_cluster_metrics_in_worker, zip(bounds, bounds[1:])))
+        )
+
+
+def compare_clusters(
+    graph: Graph,
+    labels: List[str],
+    clusters: List[List[int]],
+    originals: List[Optional[str]],
+    markers: Optional[np.ndarray] = None,
+    workers: int = 1,
+) -> List[ClusterComparison]:
+    """Measure the `clusters`, which must not overlap, in the global `graph`"""
+    metrics = cluster_metrics(graph, clusters, workers)
+    total_edges = graph.m()
+    volume = metrics.total_degree
+    boundary = volume - 2 * metrics.num_edges
+    denominator = np.minimum(volume, 2 * total_edges - volume)
+    conductance = boundary / np.maximum(denominator, 1)
+    marker_counts: List[Optional[int]] = [None] * len(clusters)
+    if markers is not None:
+        is_marker = np.zeros(len(graph.degrees), dtype=bool)
+        is_marker[markers[(markers >= 0) & (markers < len(is_marker))]] = True
+        nodes = np.fromiter(
+            chain.from_iterable(clusters),
+            dtype=np.int64,
+            count=int(metrics.num_nodes.sum()),
+        )
+        owners = np.repeat(np.arange(len(clusters)), metrics.num_nodes)
+        marker_counts = np.bincount(
+            owners[is_marker[nodes]], minlength=len(clusters)
+        ).tolist()
+    return [
+        ClusterComparison(label, original, n, m, q, mcd, c if d > 0 else None, k)
+        for label, original, n, m, q, mcd, c, d, k in zip(
+            labels,
+            originals,
+            metrics.num_nodes.tolist(),
+            metrics.num_edges.tolist(),
+            metrics.modularity(total_edges).tolist(),
+            metrics.mcd.tolist(),
+            conductance.tolist(),
+            denominator.tolist(),
+            marker_counts,
+        )
+    ]
+
+
+def main(
+    initial_clustering: str = typer.Option(..., "--initial-clustering"),
+    final_clustering: str = typer.Option(..., "--final-clustering"),
+    input_network: str = typer.Option(..., "--input-network"),
+    output_file: str = typer.Option(..., "--output-file", "-o"),
+    marker_nodes_file: str = typer.Option("", "--marker-nodes-file"),
+    initial_order: ColumnOrder = typer.Option(
+        ColumnOrder.cluster_node, "--initial-order"
+    ),
+    final_order: ColumnOrder = typer.Option(ColumnOrder.node_cluster, "--final-order"),
+    workers: int = typer.Option(1, "--workers", "-w"),
+    graph_cache: bool = typer.Option(True, "--graph-cache/--no-graph-cache"),
+):
+    """Compare the clusters changed by CM with the clusters they were split from,
+    writing one JSON object per cluster to OUTPUT_FILE, the original clusters first
+    """
+    log = structlog.get_logger()
+    assert workers >= 1, "Number of workers must be positive"
+    graph = load_graph(input_network, graph_cache)
+    initial = read_clustering(initial_clustering, initial_order)
+    final = read_clustering(final_clustering, final_order)
+    changed = changed_clusters(initial, final)
+    markers = read_marker_nodes(marker_nodes_file) if marker_nodes_file else None
+    log.info(
+        "loaded clusterings",
+        initial=len(initial),
+        final=len(final),
+        changed=len(changed),
+    )
+    # the originals overlap the clusters split from them, so they are measured apart
+    originals = list(dict.fromkeys(changed.values()))
+    rows = compare_clusters(
+        graph,
+        originals,
+        [initial[label] for label in originals],
+        [None] * len(originals),
+        markers,
+        workers,
+    ) + compare_clusters(
+        graph,
+        list(changed),
+        [final[label] for label in changed],
+        list(changed.values()),
+        markers,
+        workers,
+    )
+    with open(output_file, "w") as f:
+        for row in rows:
+            f.write(json.dumps(asdict(row)) + "\n")
+    log.info("compared clusters", output=output_file, clusters=len(rows))
+
+
+def entry_point():
+    typer.run(main)
+
+
+if __name__ == "__main__":
+    entry_point()
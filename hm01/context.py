@@ -1,24 +1,83 @@
+from contextlib import contextmanager
 from functools import cached_property
 import glob
-from typing import Optional
-from tomli import load
+import math
+from typing import Iterator, List, Optional
 import os
 import atexit
 import shutil
 import hashlib
+import time
+
+from .lazy import lazy_import
+
+tomli = lazy_import("tomli")
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the working directory is measured against its budget at most this often
+WORKDIR_CHECK_INTERVAL_SECONDS = 10.0
+
+
+class WorkdirBudgetExceeded(Exception):
+    """The working directory outgrew `--max-workdir-bytes`, even after shrinking the caches
+    """
+
+
+class WorkingDirLockLost(Exception):
+    """The lock on a shared working directory was taken over by another worker"""
 
 
 class Context:
     def __init__(self):
         self._working_dir = "hm01_working_dir"
         self.transient = False
+        self.mincut_engine = "viecut"
+        self.connectivity_certificate = False
+        self.result_cache_bytes = 0
+        self.viecut_io = "file"
+        self.max_workdir_bytes = 0
+        self._workdir_checked = -math.inf
+        self.working_dir_lock = None
+        # the artifacts requested in each open `scoped_artifacts`, innermost last
+        self._artifact_scopes: List[List[str]] = []
 
     def with_working_dir(self, working_dir):
+        if working_dir != self._working_dir:
+            # the next use creates the new working directory
+            self.__dict__.pop("working_dir", None)
         self._working_dir = working_dir
         return self
 
+    def with_mincut_engine(self, mincut_engine):
+        self.mincut_engine = mincut_engine
+        return self
+
+    def with_viecut_io(self, viecut_io):
+        self.viecut_io = viecut_io
+        return self
+
+    def with_connectivity_certificate(self, connectivity_certificate):
+        self.connectivity_certificate = connectivity_certificate
+        return self
+
+    def with_result_cache(self, max_bytes):
+        """Cache results in the working directory up to `max_bytes`, or not at all if 0
+        """
+        self.result_cache_bytes = max_bytes
+        self.__dict__.pop("result_cache", None)
+        return self
+
+    def with_max_workdir_bytes(self, max_workdir_bytes):
+        self.max_workdir_bytes = max_workdir_bytes
+        # a new budget is checked right away
+        self._workdir_checked = -math.inf
+        return self
+
+    def with_working_dir_lock(self, lock):
+        """Stop writing to the working directory once `lock` (a `ShardLock`) is lost"""
+        self.working_dir_lock = lock
+        return self
+
     def as_transient(self):
         self.transient = True
         return self
@@ -45,12 +104,22 @@ class Context:
         for path in lookup_paths:
             if os.path.exists(path):
                 with open(path, "rb") as f:
-                    return load(f)
+                    return tomli.load(f)
         raise FileNotFoundError(
             "Config file not found in any of the following paths: "
             + ", ".join(lookup_paths)
         )
 
+    @cached_property
+    def result_cache(self):
+        if self.result_cache_bytes <= 0:
+            return None
+        from .result_cache import CACHE_FILENAME, ResultCache
+
+        return ResultCache(
+            self.request_subpath(CACHE_FILENAME), self.result_cache_bytes
+        )
+
     @cached_property
     def working_dir(self):
         if not os.path.exists(self._working_dir):
@@ -58,15 +127,73 @@ class Context:
         else:
             if self.transient:
                 raise Exception("Working directory already exists under transient mode")
+        working_dir = self._working_dir
         if self.transient:
-            atexit.register(lambda: shutil.rmtree(self._working_dir))
-        return self._working_dir
+            atexit.register(lambda: shutil.rmtree(working_dir))
+        return working_dir
 
     def request_graph_related_path(self, graph, suffix):
-        return os.path.join(
+        """A path for an artifact of `graph`, removed at the end of the enclosing `scoped_artifacts`
+        """
+        path = os.path.join(
             self.working_dir,
-            hashlib.sha256(graph.index.encode("utf-8")).hexdigest()[:10] + "." + suffix,
+            hashlib.sha256(graph.index.encode("utf-8")).hexdigest() + "." + suffix,
         )
+        if self._artifact_scopes:
+            self._artifact_scopes[-1].append(path)
+        return path
+
+    @contextmanager
+    def scoped_artifacts(self) -> Iterator[None]:
+        """Remove the graph related files requested inside the block when it is left"""
+        self._artifact_scopes.append([])
+        try:
+            yield
+        finally:
+            for path in set(self._artifact_scopes.pop()):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def enforce_workdir_budget(self, checkpoint_bytes: int):
+        """Shrink the result cache if the working directory exceeds its budget, and
+        raise `WorkdirBudgetExceeded` if that is not enough
+
+        The working directory is not listed: what grows in it are the checkpoint, whose
+        size `checkpoint_bytes` the caller tracks, and the result cache. Checked at most
+        every `WORKDIR_CHECK_INTERVAL_SECONDS`.
+        """
+        if self.max_workdir_bytes <= 0:
+            return
+        now = time.monotonic()
+        if now - self._workdir_checked < WORKDIR_CHECK_INTERVAL_SECONDS:
+            return
+        self._workdir_checked = now
+        cache = self.result_cache
+        used = checkpoint_bytes + (cache.file_bytes() if cache is not None else 0)
+        if used <= self.max_workdir_bytes:
+            return
+        if cache is not None:
+            cache.shrink(cache.stored_bytes() - (used - self.max_workdir_bytes))
+            used = checkpoint_bytes + cache.file_bytes()
+        if used > self.max_workdir_bytes:
+            raise WorkdirBudgetExceeded(
+                f"{self.working_dir} holds {used} bytes, over the budget of"
+                f" {self.max_workdir_bytes} bytes"
+            )
+
+    def check_working_dir_lock(self, verify: bool = False):
+        """Raise `WorkingDirLockLost` if the lock of the working directory was taken over
+
+        Cheap unless `verify`, which reads the lock file instead of relying on its
+        heartbeat having noticed; meant for checks before overwriting shared files.
+        """
+        lock = self.working_dir_lock
+        if lock is None:
+            return
+        if lock.lost.is_set() or (verify and not lock.owned()):
+            raise WorkingDirLockLost(f"lost {lock.path} on {self.working_dir}")
 
     def request_subpath(self, suffix) -> str:
         return os.path.join(self.working_dir, suffix)
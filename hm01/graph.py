@@ -1,24 +1,26 @@
 from __future__ import annotations
 from abc import abstractmethod
 from dataclasses import dataclass
-from typing_extensions import Self
-import networkit as nk
 from collections import defaultdict
-from typing import Dict, Iterator, List, Sequence, Tuple, Union
+from itertools import chain
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 from hm01.clusterers.abstract_clusterer import AbstractClusterer
 from . import mincut
 from .context import context
-from structlog import get_logger
+from .lazy import lazy_import
+from .result_cache import subgraph_key
 from functools import cache, cached_property
 from typing import Protocol
 
-log = get_logger()
+nk = lazy_import("networkit")
+np = lazy_import("numpy")
+structlog = lazy_import("structlog")
 
 # TODO: AbstractGraph type should incorporate all duplicate code of all the Graph classes
 # Also, AbstractGraph should replace most of the Union[RealizedSubgraph, Graph] types
 class AbstractGraph:
-    hydrator: List[int]
+    hydrator: Sequence[int]
     index: str
 
     def intangible_subgraph(self, nodes: List[int], suffix: str) -> IntangibleSubgraph:
@@ -50,13 +52,13 @@ class AbstractGraph:
     def intangible_subgraph_from_compact(self, ids: List[int], suffix: str):
         """Create an intangible subgraph from a list of ids that represent nodes in the compacted (i.e., made continuous) graph
         """
-        return self.intangible_subgraph([self.hydrator[i] for i in ids], suffix)
+        return self.intangible_subgraph([int(self.hydrator[i]) for i in ids], suffix)
 
     def find_clusters(
         self, clusterer: AbstractClusterer, with_singletons: bool = True
     ) -> Iterator[IntangibleSubgraph]:
         """Find clusters using the given clusterer"""
-        log.info(
+        structlog.get_logger().info(
             f"Finding clusters using clusterer",
             id=self.index,
             n=self.n(),
@@ -72,11 +74,14 @@ class AbstractGraph:
 class Graph(AbstractGraph):
     """Wrapped graph over a networkit graph with an ID label"""
 
-    def __init__(self, data, index):
+    def __init__(self, data, index, hydrator: Optional[Sequence[int]] = None):
         self._data = data  # nk graph
         self._data.removeSelfLoops()
         self.index = index
-        self.construct_hydrator()
+        if hydrator is None:
+            self.construct_hydrator()
+        else:
+            self.hydrator = hydrator
 
     def to_realized_subgraph(self):
         return RealizedSubgraph(
@@ -115,14 +120,65 @@ class Graph(AbstractGraph):
         return min(self._data.degree(n) for n in self._data.iterNodes())
 
     def find_mincut(self) -> mincut.MincutResult:
-        """Find a mincut wrapped over Viecut"""
-        return mincut.viecut(self)
+        """Find a mincut with the configured engine (Viecut by default)"""
+        return mincut.find_mincut(self)
 
     def neighbors(self, u):
         yield from self._data.iterNeighbors(u)
 
     def remove_node(self, u):
         self._data.removeNode(u)
+        self.mcd.cache_clear()
+        for derived in ["csr", "has_multi_edges", "degrees"]:
+            self.__dict__.pop(derived, None)
+
+    @cached_property
+    def csr(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The adjacency as CSR arrays (indptr, indices) over the node ids, rows sorted
+        """
+        num_edges = self.m()
+        endpoints = np.fromiter(
+            (u for e in self._data.iterEdges() for u in e),
+            dtype=np.int64,
+            count=2 * num_edges,
+        )
+        first, second = endpoints[0::2], endpoints[1::2]
+        # a self-loop is a single neighbor, as in networkit
+        distinct = first != second
+        src = np.concatenate([first, second[distinct]])
+        dst = np.concatenate([second, first[distinct]])
+        order = np.lexsort((dst, src))
+        bound = self._data.upperNodeIdBound()
+        indptr = np.zeros(bound + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=bound), out=indptr[1:])
+        index_dtype = np.int32 if bound <= np.iinfo(np.int32).max else np.int64
+        return indptr, dst[order].astype(index_dtype)
+
+    def compact_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The adjacency as CSR arrays over compact ids, with the node id of every row
+        """
+        indptr, indices = self.csr
+        nodes = np.fromiter(self.nodes(), dtype=np.int64, count=self.n())
+        if len(nodes) == len(indptr) - 1:
+            return nodes, indptr, indices
+        # removed nodes have empty rows, so the rows of the remaining nodes stay contiguous
+        new_ids = np.full(len(indptr) - 1, -1, dtype=indices.dtype)
+        new_ids[nodes] = np.arange(len(nodes))
+        return nodes, np.append(indptr[nodes], len(indices)), new_ids[indices]
+
+    def remove_nodes(self, nodes: List[int]):
+        for u in nodes:
+            self.remove_node(u)
+
+    @cached_property
+    def has_multi_edges(self) -> bool:
+        indptr, indices = self.csr
+        repeated = indices[1:] == indices[:-1]
+        # equal neighbors across a row boundary are not parallel edges
+        boundaries = indptr[1:-1]
+        boundaries = boundaries[(boundaries > 0) & (boundaries < len(indices))]
+        repeated[boundaries - 1] = False
+        return bool(repeated.any())
 
     def cut_by_mincut(
         self, mincut_res: mincut.MincutResult
@@ -153,7 +209,26 @@ class Graph(AbstractGraph):
         return Graph(data, index)
 
     def induced_subgraph_from_compact(self, ids: List[int], suffix: str):
-        return self.induced_subgraph([self.hydrator[i] for i in ids], suffix)
+        return self.induced_subgraph([int(self.hydrator[i]) for i in ids], suffix)
+
+    def compact_edge_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The edges in compact ids (see `hydrator`) as two endpoint arrays
+
+        The edges are in the same order as in `as_compact_edgelist_filepath`.
+        """
+        compact_graph = nk.graphtools.getCompactedGraph(self._data, self.continuous_ids)
+        endpoints = np.fromiter(
+            (
+                w
+                for u in compact_graph.iterNodes()
+                for v in compact_graph.iterNeighbors(u)
+                if v < u
+                for w in (u, v)
+            ),
+            dtype=np.int64,
+            count=2 * compact_graph.numberOfEdges(),
+        )
+        return endpoints[0::2], endpoints[1::2]
 
     def as_compact_edgelist_filepath(self):
         """Get a filepath to the graph as a compact/continuous edgelist file"""
@@ -165,6 +240,11 @@ class Graph(AbstractGraph):
     def degree(self, u):
         return self._data.degree(u)
 
+    def write_metis(self, f: BinaryIO):
+        """Write the graph in (continuous) METIS format to the binary file `f`"""
+        _, indptr, indices = self.compact_csr()
+        write_metis(f, indptr, indices)
+
     def as_metis_filepath(self):
         """Get a filepath to the graph to a (continuous) METIS file"""
         p = context.request_graph_related_path(self, "metis")
@@ -177,10 +257,75 @@ class Graph(AbstractGraph):
 
     def modularity_of(self, g: IntangibleSubgraph) -> float:
         """calculate the modularity of the subset `g` with respect to `self`"""
-        ls = g.count_edges(self)
-        big_l = self.m()
-        ds = sum(self._data.degree(n) for n in g.subset)
-        return (ls / big_l) - (ds / (2 * big_l)) ** 2
+        return float(self.cluster_metrics([g.subset]).modularity(self.m())[0])
+
+    @cached_property
+    def degrees(self) -> np.ndarray:
+        """The degrees over the node ids"""
+        return np.diff(self.csr[0])
+
+    @cached_property
+    def _scratch_labels(self) -> np.ndarray:
+        # cluster labels over the node ids for the kernels below, all -1 between uses
+        return np.full(len(self.csr[0]) - 1, -1, dtype=np.int64)
+
+    def cluster_metrics(self, clusters: Sequence[Sequence[int]]) -> ClusterMetrics:
+        """Compute the metrics of a batch of clusters (lists of node ids) at once"""
+        sizes = np.fromiter(
+            (len(c) for c in clusters), dtype=np.int64, count=len(clusters)
+        )
+        nodes = np.fromiter(
+            chain.from_iterable(clusters), dtype=np.int64, count=int(sizes.sum())
+        )
+        owners = np.repeat(np.arange(len(clusters)), sizes)
+        labels = self._scratch_labels
+        labels[nodes] = owners
+        if not np.array_equal(labels[nodes], owners):
+            # overlapping clusters cannot share the labels, so take them one at a time
+            labels[nodes] = -1
+            return ClusterMetrics.concatenate(
+                [self.cluster_metrics([c]) for c in clusters]
+            )
+        try:
+            indptr, indices = self.csr
+            counts = self.degrees[nodes]
+            neighbors = indices[gather_ranges(indptr[nodes], counts)]
+            inside = labels[neighbors] == np.repeat(owners, counts)
+            internal = np.bincount(
+                np.repeat(np.arange(len(nodes)), counts)[inside], minlength=len(nodes)
+            )
+        finally:
+            labels[nodes] = -1
+        mcd = np.zeros(len(clusters), dtype=np.int64)
+        nonempty = sizes > 0
+        if nonempty.any():
+            offsets = np.cumsum(sizes) - sizes
+            mcd[nonempty] = np.minimum.reduceat(internal, offsets[nonempty])
+        return ClusterMetrics(
+            num_nodes=sizes,
+            num_edges=np.bincount(owners, internal, len(clusters)).astype(np.int64)
+            // 2,
+            total_degree=np.bincount(owners, counts, len(clusters)).astype(np.int64),
+            mcd=mcd,
+        )
+
+    def internal_degrees(
+        self, cluster: Sequence[int], nodes: Sequence[int]
+    ) -> np.ndarray:
+        """The number of neighbors in `cluster` of each of `nodes`"""
+        members = np.asarray(cluster, dtype=np.int64)
+        nodes = np.asarray(nodes, dtype=np.int64)
+        labels = self._scratch_labels
+        labels[members] = 0
+        try:
+            indptr, indices = self.csr
+            counts = self.degrees[nodes]
+            inside = labels[indices[gather_ranges(indptr[nodes], counts)]] == 0
+            return np.bincount(
+                np.repeat(np.arange(len(nodes)), counts)[inside], minlength=len(nodes)
+            )
+        finally:
+            labels[members] = -1
 
     @staticmethod
     def from_space_edgelist(filepath: str, index=""):
@@ -213,82 +358,225 @@ class Graph(AbstractGraph):
         return IntangibleSubgraph(list(self.nodes()), self.index)
 
     def to_igraph(self):
-        import igraph as ig
+        _, indptr, indices = self.compact_csr()
+        return edges_to_igraph(self.n(), upper_edge_array(indptr, indices))
+
+
+@dataclass
+class ClusterMetrics:
+    """Metrics of a batch of clusters, each an array with an entry per cluster
+
+    The degrees are in the whole graph, while `num_edges` and `mcd` only count the
+    edges inside the cluster.
+    """
+
+    num_nodes: np.ndarray
+    num_edges: np.ndarray
+    total_degree: np.ndarray
+    mcd: np.ndarray
+
+    def modularity(self, total_edges: int) -> np.ndarray:
+        return (self.num_edges / total_edges) - (
+            self.total_degree / (2 * total_edges)
+        ) ** 2
+
+    def is_tree_like(self) -> np.ndarray:
+        return self.num_edges == self.num_nodes - 1
+
+    @staticmethod
+    def concatenate(batches: List[ClusterMetrics]) -> ClusterMetrics:
+        return ClusterMetrics(
+            *(
+                np.concatenate(
+                    [getattr(b, f) for b in batches] or [np.zeros(0, np.int64)]
+                )
+                for f in ["num_nodes", "num_edges", "total_degree", "mcd"]
+            )
+        )
+
+
+# rows of the CSR arrays turned into edges at a time, bounding the temporary arrays
+EDGE_ARRAY_CHUNK_ROWS = 1 << 16
+
+
+def upper_edge_array(indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """The edges u < v of symmetric CSR arrays without self-loops as an (m, 2) int64 array
+
+    The edges are in row order. The array is filled a chunk of rows at a time, so that
+    besides the result only the arrays of one chunk are allocated.
+    """
+    n = len(indptr) - 1
+    edges = np.empty((len(indices) // 2, 2), dtype=np.int64)
+    offset = 0
+    for start in range(0, n, EDGE_ARRAY_CHUNK_ROWS):
+        stop = min(start + EDGE_ARRAY_CHUNK_ROWS, n)
+        rows = np.repeat(np.arange(start, stop), np.diff(indptr[start : stop + 1]))
+        columns = indices[indptr[start] : indptr[stop]]
+        upper = rows < columns
+        end = offset + int(upper.sum())
+        edges[offset:end, 0] = rows[upper]
+        edges[offset:end, 1] = columns[upper]
+        offset = end
+    assert offset == len(edges), "the CSR arrays are not symmetric"
+    return edges
+
+
+def edges_to_igraph(n: int, edges: np.ndarray):
+    """An igraph graph on `n` nodes with the edges of an (m, 2) int64 array
+
+    igraph reads the array as a buffer, without a Python object per edge. `add_edges`
+    converts it with less memory and time than passing it to the constructor.
+    """
+    import igraph as ig
+
+    graph = ig.Graph(n)
+    graph.add_edges(edges)
+    return graph
+
+
+def write_metis(f: BinaryIO, indptr: np.ndarray, indices: np.ndarray):
+    """Write symmetric CSR arrays without self-loops as a METIS graph, one line per row
+    """
+    f.write(f"{len(indptr) - 1} {len(indices) // 2}\n".encode())
+    for u in range(len(indptr) - 1):
+        neighbors = indices[indptr[u] : indptr[u + 1]] + 1
+        f.write((" ".join(map(str, neighbors.tolist())) + "\n").encode())
 
-        cont_ids = nk.graphtools.getContinuousNodeIds(self._data)
-        compact_graph = nk.graphtools.getCompactedGraph(self._data, cont_ids)
-        edges = [(u, v) for u, v in compact_graph.iterEdges()]
-        return ig.Graph(self.n(), edges)
+
+def gather_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Positions of the concatenated ranges [start, start + count)"""
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
 
 
 class RealizedSubgraph(AbstractGraph):
-    hydrator: List[int]  # mapping from compact id to original id
-    inv: Dict[int, int]  # mapping from original id to compact id
-    compacted: List[List[int]]
+    """A subgraph of a `Graph` materialized as CSR arrays over local ids
+
+    Local ids index the sorted original ids in `_nodes`. Removed nodes are only
+    masked out; `recompact` drops them so that local ids become compact ids.
+    """
+
+    _nodes: np.ndarray  # mapping from local id to original id, sorted
+    _indptr: np.ndarray
+    _indices: np.ndarray  # int32 local ids
+    _removed: np.ndarray  # mask over local ids
+    _degrees: np.ndarray  # degrees over local ids, zero for removed nodes
     _dirty: bool
     _graph: Graph
 
     def __init__(self, intangible: IntangibleSubgraph, graph: Graph):
         self.index = intangible.index
-        self.nodeset = intangible.nodeset
-        self.adj: Dict[int, set[int]] = {}
         self._graph = graph
-        for n in self.nodeset:
-            if n not in self.adj:
-                self.adj[n] = set()
-            for m in graph.neighbors(n):
-                if m not in self.nodeset:
-                    continue
-                if m not in self.adj:
-                    self.adj[m] = set()
-                self.adj[n].add(m)
-        self._n = len(self.nodeset)
-        self._m = sum(len(self.adj[n]) for n in self.nodeset) // 2
-        self._dirty = True
-        # self.recompact()
+        nodes = np.unique(np.asarray(intangible.subset, dtype=np.int64))
+        indptr, indices = graph.csr
+        starts = indptr[nodes]
+        counts = indptr[nodes + 1] - starts
+        neighbors = indices[gather_ranges(starts, counts)]
+        positions = np.searchsorted(nodes, neighbors)
+        positions[positions == len(nodes)] = 0
+        inside = nodes[positions] == neighbors
+        rows = np.repeat(np.arange(len(nodes)), counts)[inside]
+        columns = positions[inside]
+        if graph.has_multi_edges:
+            # rows are sorted, so parallel edges are adjacent
+            distinct = np.ones(len(rows), dtype=bool)
+            distinct[1:] = (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])
+            rows = rows[distinct]
+            columns = columns[distinct]
+        self._set_csr(nodes, rows, columns.astype(np.int32))
+
+    def _set_csr(self, nodes: np.ndarray, rows: np.ndarray, columns: np.ndarray):
+        degrees = np.bincount(rows, minlength=len(nodes)).astype(np.int32)
+        self._nodes = nodes
+        self._indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=self._indptr[1:])
+        self._indices = columns
+        self._removed = np.zeros(len(nodes), dtype=bool)
+        self._degrees = degrees
+        self._n = len(nodes)
+        self._m = len(columns) // 2
+        self._dirty = False
 
     def recompact(self) -> None:
-        unallocated = 0
-        hydrator: List[int] = []
-        inv: Dict[int, int] = {}
-        compacted: List[List[int]] = []
-        for n in self.nodeset:
-            if n not in inv:
-                hydrator.append(n)
-                inv[n] = unallocated
-                compacted.append([])
-                unallocated += 1
-            for m in self.adj[n]:
-                if m not in inv:
-                    hydrator.append(m)
-                    inv[m] = unallocated
-                    compacted.append([])
-                    unallocated += 1
-                compacted[inv[n]].append(inv[m])
-        assert len(hydrator) == len(inv)
-        self.hydrator = hydrator
-        self.inv = inv
-        self.compacted = compacted
-        self._dirty = False
+        """Drop the removed nodes from the CSR arrays"""
+        live = ~self._removed
+        new_ids = np.cumsum(live) - 1
+        rows = np.repeat(np.arange(len(self._nodes)), np.diff(self._indptr))
+        kept = live[rows] & live[self._indices]
+        self._set_csr(
+            self._nodes[live],
+            new_ids[rows[kept]],
+            new_ids[self._indices[kept]].astype(np.int32),
+        )
+
+    @property
+    def hydrator(self) -> np.ndarray:  # type: ignore[override]
+        """Mapping from compact id to original id"""
+        if self._dirty:
+            self.recompact()
+        return self._nodes
+
+    @property
+    def inv(self) -> Dict[int, int]:
+        """Mapping from original id to compact id"""
+        return dict(zip(self.hydrator.tolist(), range(self._n)))
+
+    def _local_id(self, u: int) -> int:
+        i = int(np.searchsorted(self._nodes, u))
+        assert (
+            i < len(self._nodes) and self._nodes[i] == u and not self._removed[i]
+        ), f"{u} is not a node of {self.index}"
+        return i
+
+    def _live_neighbors(self, i: int) -> np.ndarray:
+        neighbors = self._indices[self._indptr[i] : self._indptr[i + 1]]
+        return neighbors[~self._removed[neighbors]]
 
     def degree(self, u) -> int:
-        return len(self.adj[u])
+        return int(self._degrees[self._local_id(u)])
 
     def neighbors(self, u) -> Iterator[int]:
-        yield from self.adj[u]
+        yield from self._nodes[self._live_neighbors(self._local_id(u))].tolist()
 
     def to_intangible(self, graph):
-        return IntangibleSubgraph(list(self.nodeset), self.index)
+        return IntangibleSubgraph(list(self.nodes()), self.index)
+
+    def intangible_subgraph_from_compact(self, ids: List[int], suffix: str):
+        return self.intangible_subgraph(self.hydrator[ids].tolist(), suffix)
 
     def remove_node(self, u: int) -> None:
+        i = self._local_id(u)
+        self._degrees[self._live_neighbors(i)] -= 1
         self._n -= 1
-        self._m -= len(self.adj[u])
-        for v in self.adj[u]:
-            self.adj[v].remove(u)
-        del self.adj[u]
-        self.nodeset.remove(u)
+        self._m -= int(self._degrees[i])
+        self._degrees[i] = 0
+        self._removed[i] = True
+        self._dirty = True
+
+    def remove_nodes(self, nodes: List[int]) -> None:
+        """Remove all of `nodes` at once, equivalent to removing them one by one"""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        ids = np.minimum(np.searchsorted(self._nodes, nodes), len(self._nodes) - 1)
+        assert (
+            np.array_equal(self._nodes[ids], nodes) and not self._removed[ids].any()
+        ), f"{nodes} are not all nodes of {self.index}"
+        self._removed[ids] = True
+        rows = np.repeat(np.arange(len(self._nodes)), np.diff(self._indptr))
+        kept = ~self._removed[rows] & ~self._removed[self._indices]
+        self._degrees = np.bincount(rows[kept], minlength=len(self._nodes)).astype(
+            np.int32
+        )
+        self._n -= len(ids)
+        self._m = int(kept.sum()) // 2
         self._dirty = True
 
+    def compact_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The adjacency as CSR arrays over compact ids, with the original id of every row
+        """
+        if self._dirty:
+            self.recompact()
+        return self._nodes, self._indptr, self._indices
+
     def n(self) -> int:
         return self._n
 
@@ -296,50 +584,61 @@ class RealizedSubgraph(AbstractGraph):
         return self._m
 
     def nodes(self) -> Iterator[int]:
-        yield from self.nodeset
+        yield from self._nodes[~self._removed].tolist()
 
-    @cache
     def mcd(self) -> int:
         if self.n() == 0:
             return 0
-        return min(self.degree(n) for n in self.nodes())
+        return int(self._degrees[~self._removed].min())
 
-    def to_igraph(self):
+    def compact_edge_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The edges in compact ids (see `hydrator`) as two endpoint arrays"""
         if self._dirty:
             self.recompact()
-        import igraph as ig
+        rows = np.repeat(np.arange(self._n), np.diff(self._indptr))
+        upper = rows < self._indices
+        return rows[upper], self._indices[upper].astype(np.int64)
+
+    def to_igraph(self):
+        _, indptr, indices = self.compact_csr()
+        return edges_to_igraph(self.n(), upper_edge_array(indptr, indices))
 
-        edges = []
-        for u in self.nodes():
-            for v in self.adj[u]:
-                if u > v:
-                    continue
-                edges.append((self.inv[u], self.inv[v]))
-        return ig.Graph(self.n(), edges)
+    def write_metis(self, f: BinaryIO):
+        """Write the graph in METIS format over compact ids to the binary file `f`"""
+        _, indptr, indices = self.compact_csr()
+        write_metis(f, indptr, indices)
 
     def as_metis_filepath(self) -> str:
-        if self._dirty:
-            self.recompact()
         p = context.request_graph_related_path(self, "metis")
-        with open(p, "w+") as f:
-            f.write(f"{self.n()} {self.m()}\n")
-            for u in self.compacted:
-                f.write(" ".join([str(v + 1) for v in u]) + "\n")
+        with open(p, "wb") as f:
+            self.write_metis(f)
         return p
 
     def as_compact_edgelist_filepath(self) -> str:
-        if self._dirty:
-            self.recompact()
         p = context.request_graph_related_path(self, "edgelist")
+        src, dst = self.compact_edge_arrays()
         with open(p, "w+") as f:
-            for u, adj in enumerate(self.compacted):
-                for v in adj:
-                    if u < v:
-                        f.write(f"{u}\t{v}\n")
+            for u, v in zip(src.tolist(), dst.tolist()):
+                f.write(f"{u}\t{v}\n")
         return p
 
     def find_mincut(self) -> mincut.MincutResult:
-        return mincut.viecut(self)
+        """Find a mincut, cutting between connected components in-process if disconnected
+
+        Mincuts are looked up in the result cache of the context first, if there is one.
+        """
+        cut = mincut.components_cut(self)
+        if cut is not None:
+            return cut
+        cache = context.result_cache
+        if cache is None:
+            return mincut.find_mincut(self)
+        key = subgraph_key(self, "mincut", mincut.MincutEngine(context.mincut_engine))
+        cut = cache.get(key)
+        if cut is None:
+            cut = mincut.find_mincut(self)
+            cache.put(key, cut)
+        return cut
 
     def cut_by_mincut(
         self, mincut_res: mincut.MincutResult
@@ -357,8 +656,6 @@ class RealizedSubgraph(AbstractGraph):
 
     @property
     def continuous_ids(self):
-        if self._dirty:
-            self.recompact()
         return self.inv
 
 
@@ -407,17 +704,13 @@ class IntangibleSubgraph:
         return iter(self.subset)
 
     def count_edges(self, global_graph: Graph):
-        return sum(1 for _ in self.edges(global_graph)) // 2
+        return int(global_graph.cluster_metrics([self.subset]).num_edges[0])
 
     def internal_degree(self, u, graph: Graph) -> int:
-        return sum(1 for v in graph._data.iterNeighbors(u) if v in self.nodeset)
+        return int(graph.internal_degrees(self.subset, [u])[0])
 
     def count_mcd(self, graph: Graph) -> int:
-        if self.n() == 0:
-            return 0
-        return min(self.internal_degree(u, graph) for u in self.subset)
+        return int(graph.cluster_metrics([self.subset]).mcd[0])
 
     def is_tree_like(self, global_graph: Graph) -> bool:
-        m = self.count_edges(global_graph)
-        n = self.n()
-        return m == n - 1
+        return bool(global_graph.cluster_metrics([self.subset]).is_tree_like()[0])
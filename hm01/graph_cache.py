@@ -0,0 +1,123 @@
+"""Binary sidecars of parsed input graphs, so that repeated runs skip parsing the edgelist
+
+The sidecar of `graph.tsv` is the directory `graph.tsv.cmcache` holding the graph in
+networkit's binary format, the hydrator and the CSR arrays (the latter two memory-mapped
+on load). It is keyed on the size, the modification time and a hash of the edgelist.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Optional
+
+
+from .graph import Graph
+from .lazy import lazy_import
+
+nk = lazy_import("networkit")
+np = lazy_import("numpy")
+structlog = lazy_import("structlog")
+
+SIDECAR_SUFFIX = ".cmcache"
+SIDECAR_VERSION = 1
+# the hash covers this many bytes at the start, the middle and the end of the file
+HASHED_BLOCK_SIZE = 1 << 20
+
+
+def sidecar_path(path: str) -> str:
+    return path + SIDECAR_SUFFIX
+
+
+def fingerprint(path: str) -> Dict[str, Any]:
+    """Identify the contents of the file at `path` without reading all of it"""
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for offset in [0, stat.st_size // 2, max(stat.st_size - HASHED_BLOCK_SIZE, 0)]:
+            f.seek(offset)
+            digest.update(f.read(HASHED_BLOCK_SIZE))
+    return {
+        "version": SIDECAR_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": digest.hexdigest(),
+    }
+
+
+def parse_edgelist(path: str) -> Graph:
+    """Parse a tab-separated edgelist, with the adjacency sorted like in the sidecar"""
+    edgelist_reader = nk.graphio.EdgeListReader("\t", 0)
+    nk_graph = edgelist_reader.read(path)
+    nk_graph.sortEdges()
+    return Graph(nk_graph, "")
+
+
+def load_sidecar(path: str) -> Optional[Graph]:
+    """Load the graph from the sidecar of `path` if it is up to date"""
+    sidecar = sidecar_path(path)
+    try:
+        with open(os.path.join(sidecar, "meta.json")) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if meta != fingerprint(path):
+        return None
+    nk_graph = nk.graphio.readGraph(
+        os.path.join(sidecar, "graph.nkbg"), nk.Format.NetworkitBinary
+    )
+    hydrator = np.load(os.path.join(sidecar, "hydrator.npy"), mmap_mode="r")
+    graph = Graph(nk_graph, "", hydrator=hydrator)
+    graph.__dict__["csr"] = (
+        np.load(os.path.join(sidecar, "indptr.npy"), mmap_mode="r"),
+        np.load(os.path.join(sidecar, "indices.npy"), mmap_mode="r"),
+    )
+    return graph
+
+
+def write_sidecar(path: str, graph: Graph):
+    """Write the sidecar of `path`, replacing any stale one"""
+    sidecar = sidecar_path(path)
+    # written next to the final location and renamed, so readers never see a partial sidecar
+    staging = f"{sidecar}.{os.getpid()}.tmp"
+    os.makedirs(staging)
+    try:
+        nk.graphio.writeGraph(
+            graph._data, os.path.join(staging, "graph.nkbg"), nk.Format.NetworkitBinary
+        )
+        np.save(os.path.join(staging, "hydrator.npy"), np.asarray(graph.hydrator))
+        indptr, indices = graph.csr
+        np.save(os.path.join(staging, "indptr.npy"), indptr)
+        np.save(os.path.join(staging, "indices.npy"), indices)
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(fingerprint(path), f)
+        if os.path.exists(sidecar):
+            shutil.rmtree(sidecar)
+        os.rename(staging, sidecar)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def load_graph(path: str, use_cache: bool = True) -> Graph:
+    """Load the edgelist at `path`, through its sidecar if `use_cache`"""
+    log = structlog.get_logger()
+    time1 = time.time()
+    graph = load_sidecar(path) if use_cache else None
+    if graph is not None:
+        log.info("loaded graph from sidecar", sidecar=sidecar_path(path))
+    else:
+        graph = parse_edgelist(path)
+        if use_cache:
+            try:
+                write_sidecar(path, graph)
+                log.info("wrote graph sidecar", sidecar=sidecar_path(path))
+            except OSError as e:
+                log.warning("could not write graph sidecar", error=str(e))
+    log.info(
+        "loaded graph",
+        n=graph.n(),
+        m=graph.m(),
+        elapsed=time.time() - time1,
+    )
+    return graph
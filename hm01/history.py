@@ -0,0 +1,283 @@
+"""The history tree of a run of algorithm-g stored as parallel arrays
+
+Tree nodes are laid out in preorder, so a parent always comes before its children and
+every subtree is a contiguous range. Missing cut sizes are stored as -1 and missing
+validity thresholds as NaN. Encoding, decoding and the tree computations below are all
+iterative, so that deep chains of splits need no raised recursion limit.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import cached_property
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+import treeswift as ts
+import typer
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+TREE_SUFFIX = ".tree.npz"
+
+
+@dataclass
+class HistoryTree:
+    parent: np.ndarray  # int64, -1 for the root
+    label_data: np.ndarray  # utf-8 encoded labels, concatenated
+    label_offsets: np.ndarray  # int64, the label of node i is label_data[offsets[i]:offsets[i+1]]
+    num_nodes: np.ndarray  # int64
+    cut_size: np.ndarray  # int64, -1 if missing
+    validity_threshold: np.ndarray  # float64, NaN if missing
+    extant: np.ndarray  # bool
+    certified: np.ndarray  # bool, decided by a connectivity certificate instead of a mincut
+
+    def __len__(self):
+        return len(self.parent)
+
+    @staticmethod
+    def from_records(
+        labels: List[str],
+        parents: List[int],
+        num_nodes: List[int],
+        cut_sizes: List[Optional[int]],
+        validity_thresholds: List[Optional[float]],
+        extant: List[bool],
+        certified: List[bool],
+    ) -> HistoryTree:
+        """Build from per-node lists, which must already be in preorder"""
+        encoded = [label.encode() for label in labels]
+        label_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=label_offsets[1:])
+        return HistoryTree(
+            np.asarray(parents, dtype=np.int64),
+            np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            label_offsets,
+            np.asarray(num_nodes, dtype=np.int64),
+            np.asarray([-1 if c is None else c for c in cut_sizes], dtype=np.int64),
+            np.asarray(
+                [np.nan if t is None else t for t in validity_thresholds],
+                dtype=np.float64,
+            ),
+            np.asarray(extant, dtype=bool),
+            np.asarray(certified, dtype=bool),
+        )
+
+    @staticmethod
+    def from_tree(tree: ts.Tree) -> HistoryTree:
+        """Convert a tree of `ClusterTreeNode`s"""
+        labels: List[str] = []
+        parents: List[int] = []
+        num_nodes: List[int] = []
+        cut_sizes: List[Optional[int]] = []
+        validity_thresholds: List[Optional[float]] = []
+        extant: List[bool] = []
+        certified: List[bool] = []
+        stack = [(tree.root, -1)]
+        while stack:
+            node, parent = stack.pop()
+            parents.append(parent)
+            labels.append(node.label or "")
+            num_nodes.append(node.num_nodes)
+            cut_sizes.append(getattr(node, "cut_size", None))
+            validity_thresholds.append(getattr(node, "validity_threshold", None))
+            extant.append(bool(getattr(node, "extant", False)))
+            certified.append(bool(getattr(node, "certified", False)))
+            i = len(parents) - 1
+            stack.extend((c, i) for c in reversed(node.children))
+        return HistoryTree.from_records(
+            labels,
+            parents,
+            num_nodes,
+            cut_sizes,
+            validity_thresholds,
+            extant,
+            certified,
+        )
+
+    @staticmethod
+    def from_ndjson(path: str) -> HistoryTree:
+        """Convert the NDJSON tree written by `cm --stream-output`"""
+        records: Dict[str, dict] = {}
+        children: Dict[Optional[str], List[str]] = {}
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                label = record["label"]
+                if label not in records:
+                    children.setdefault(record["parent"], []).append(label)
+                    records[label] = record
+                else:
+                    records[label].update(
+                        (k, v) for k, v in record.items() if v is not None
+                    )
+        labels: List[str] = []
+        parents: List[int] = []
+        stack = [(label, -1) for label in reversed(children.get(None, []))]
+        while stack:
+            label, parent = stack.pop()
+            parents.append(parent)
+            labels.append(label)
+            i = len(parents) - 1
+            stack.extend((c, i) for c in reversed(children.get(label, [])))
+        return HistoryTree.from_records(
+            labels,
+            parents,
+            [records[label]["num_nodes"] for label in labels],
+            [records[label]["cut_size"] for label in labels],
+            [records[label]["validity_threshold"] for label in labels],
+            [records[label]["extant"] for label in labels],
+            [records[label].get("certified", False) for label in labels],
+        )
+
+    @staticmethod
+    def from_jsonpickle(path: str) -> HistoryTree:
+        """Convert a `.tree.json` written by earlier versions of cm"""
+        import jsonpickle
+
+        # decoding jsonpickle is recursive in the depth of the tree
+        sys.setrecursionlimit(1231231234)
+        with open(path) as f:
+            return HistoryTree.from_tree(jsonpickle.decode(f.read()))
+
+    @staticmethod
+    def join(
+        trees: List[HistoryTree], order: Optional[List[str]] = None
+    ) -> HistoryTree:
+        """Join the trees of runs on disjoint clusters of the same graph under one root
+
+        The subtrees below the roots are laid out in the `order` of their labels if
+        given, and else in the order of the trees.
+        """
+        pieces = [(t, c) for t in trees for c in t.children(0).tolist()]
+        if order is not None:
+            position = {label: i for i, label in enumerate(order)}
+            pieces.sort(key=lambda piece: position[piece[0].labels[piece[1]]])
+        root = trees[0]
+        ranges = [(root, 0, 1)] + [(t, c, int(t.subtree_end[c])) for t, c in pieces]
+        parents, label_data, label_offsets = [], [], [np.zeros(1, dtype=np.int64)]
+        start = data_start = 0
+        for t, lo, hi in ranges:
+            # the subtree roots hang from the new root, the rest keep their relative parent
+            parent = t.parent[lo:hi] - lo + start
+            parent[0] = 0 if start else -1
+            parents.append(parent)
+            data_lo, data_hi = t.label_offsets[lo], t.label_offsets[hi]
+            label_data.append(t.label_data[data_lo:data_hi])
+            label_offsets.append(
+                t.label_offsets[lo + 1 : hi + 1] - data_lo + data_start
+            )
+            start += hi - lo
+            data_start += data_hi - data_lo
+
+        def column(name: str) -> np.ndarray:
+            return np.concatenate([getattr(t, name)[lo:hi] for t, lo, hi in ranges])
+
+        return HistoryTree(
+            np.concatenate(parents),
+            np.concatenate(label_data),
+            np.concatenate(label_offsets),
+            column("num_nodes"),
+            column("cut_size"),
+            column("validity_threshold"),
+            column("extant"),
+            column("certified"),
+        )
+
+    @staticmethod
+    def load(path: str) -> HistoryTree:
+        with np.load(path) as data:
+            columns = {k: data[k] for k in data.files}
+        # trees saved before certificates existed have every node decided by a mincut
+        columns.setdefault("certified", np.zeros(len(columns["parent"]), dtype=bool))
+        return HistoryTree(**columns)
+
+    @staticmethod
+    def read(path: str) -> HistoryTree:
+        """Read a tree in any of the formats, told apart by the extension"""
+        if path.endswith(".npz"):
+            return HistoryTree.load(path)
+        if path.endswith(".ndjson"):
+            return HistoryTree.from_ndjson(path)
+        return HistoryTree.from_jsonpickle(path)
+
+    @staticmethod
+    def load_for_output(prefix: str) -> HistoryTree:
+        """Load the tree written along the labels file `prefix`, in any of the formats
+        """
+        for suffix in [TREE_SUFFIX, ".tree.ndjson", ".tree.json"]:
+            if os.path.exists(prefix + suffix):
+                return HistoryTree.read(prefix + suffix)
+        raise FileNotFoundError(f"no history tree found for {prefix}")
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                parent=self.parent,
+                label_data=self.label_data,
+                label_offsets=self.label_offsets,
+                num_nodes=self.num_nodes,
+                cut_size=self.cut_size,
+                validity_threshold=self.validity_threshold,
+                extant=self.extant,
+                certified=self.certified,
+            )
+
+    @cached_property
+    def labels(self) -> List[str]:
+        data = self.label_data.tobytes()
+        offsets = self.label_offsets.tolist()
+        return [data[offsets[i] : offsets[i + 1]].decode() for i in range(len(self))]
+
+    @cached_property
+    def index_of(self) -> Dict[str, int]:
+        return {label: i for i, label in enumerate(self.labels)}
+
+    @cached_property
+    def subtree_end(self) -> np.ndarray:
+        """The subtree of node i spans the nodes i to subtree_end[i] - 1"""
+        sizes = [1] * len(self)
+        parent = self.parent.tolist()
+        # children come after their parents, so a reverse sweep sees every subtree complete
+        for i in range(len(self) - 1, 0, -1):
+            sizes[parent[i]] += sizes[i]
+        return np.arange(len(self)) + np.asarray(sizes, dtype=np.int64)
+
+    @cached_property
+    def is_leaf(self) -> np.ndarray:
+        has_children = np.zeros(len(self), dtype=bool)
+        has_children[self.parent[self.parent >= 0]] = True
+        return ~has_children
+
+    def children(self, i: int) -> np.ndarray:
+        return np.flatnonzero(self.parent[i + 1 : self.subtree_end[i]] == i) + i + 1
+
+    def count_in_subtrees(self, mask: np.ndarray) -> np.ndarray:
+        """For every node, how many nodes of its subtree (itself included) are in `mask`
+        """
+        prefix = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(mask, out=prefix[1:])
+        return prefix[self.subtree_end] - prefix[: len(self)]
+
+
+def main(
+    input: str = typer.Option(..., "--input", "-i"),
+    output: str = typer.Option("", "--output", "-o"),
+):
+    """Convert a history tree (`.tree.json` or `.tree.ndjson`) to the columnar `.tree.npz`
+    """
+    tree = HistoryTree.read(input)
+    if not output:
+        output = input.removesuffix(".ndjson").removesuffix(".json") + ".npz"
+    tree.save(output)
+
+
+def entry_point():
+    typer.run(main)
+
+
+if __name__ == "__main__":
+    entry_point()
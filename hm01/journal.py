@@ -0,0 +1,71 @@
+"""An append-only log of pickled records, so that progress survives a crash record by record"""
+from __future__ import annotations
+import os
+import pickle as pkl
+import struct
+import zlib
+from typing import Any, List, Tuple
+
+# every record is prefixed by its length and the crc32 of its payload
+RECORD_HEADER = struct.Struct("<II")
+
+
+class Journal:
+    """Appends records to the file at `path`, keeping the records already in it"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "ab")
+
+    def append(self, record: Any):
+        payload = pkl.dumps(record, protocol=pkl.HIGHEST_PROTOCOL)
+        self._file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        # hand the record to the OS right away; a crash of the process then loses nothing
+        self._file.flush()
+
+    def sync(self):
+        """Make the appended records durable, also against a crash of the machine"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def size(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    @staticmethod
+    def scan(path: str) -> Tuple[List[Any], int]:
+        """Read the intact records of the journal and the length of the intact prefix
+
+        Reading stops at the first torn or corrupted record, such as one being written
+        when the process died.
+        """
+        records = []
+        end = 0
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return records, end
+        while end + RECORD_HEADER.size <= len(data):
+            length, checksum = RECORD_HEADER.unpack_from(data, end)
+            start = end + RECORD_HEADER.size
+            payload = data[start : start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            records.append(pkl.loads(payload))
+            end = start + length
+        return records, end
+
+    @staticmethod
+    def recover(path: str) -> List[Any]:
+        """Read the intact records and cut off anything after them, so that appending can resume
+        """
+        records, end = Journal.scan(path)
+        if os.path.exists(path) and os.path.getsize(path) > end:
+            os.truncate(path, end)
+        return records
@@ -0,0 +1,24 @@
+"""Heavy dependencies imported on first use, so that `cm --help` does not pay for them
+
+`nk = lazy_import("networkit")` binds a module whose code only runs when one of its
+attributes is first accessed. Modules using one must not touch it at import time.
+"""
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """The module `name`, executed on first attribute access unless already imported"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -1,13 +1,21 @@
+from __future__ import annotations
+from contextlib import contextmanager
 from dataclasses import dataclass
-import coloredlogs, logging
-from typing import List, Tuple, Union
+from enum import Enum
+import logging
+from typing import IO, Iterator, List, Optional, Tuple, Union
 
 # from hm01.graph import Graph, RealizedSubgraph
 
 from .context import context
+from .lazy import lazy_import
 import subprocess
 import re
 import os
+import tempfile
+
+np = lazy_import("numpy")
+nk = lazy_import("networkit")
 
 logger = logging.getLogger(__name__)
 
@@ -20,21 +28,76 @@ class MincutResult:
     cut_size: int
 
 
+class MincutEngine(str, Enum):
+    viecut = "viecut"
+    native = "native"
+
+
+class ViecutIo(str, Enum):
+    file = "file"  # METIS and cut files in the working directory
+    # anonymous in-memory files, nothing written to the working directory
+    memfd = "memfd"
+
+
+# graphs larger than this are always handed to viecut, as the native engine works on dense matrices
+NATIVE_MAX_NODES = 2048
+
+
+def find_mincut(graph) -> MincutResult:
+    """Find a mincut of the graph with the engine configured in the context"""
+    if context.mincut_engine == MincutEngine.native and graph.n() <= NATIVE_MAX_NODES:
+        return native(graph)
+    return viecut(graph)
+
+
 def viecut(graph):
     if graph.n() == 2 and graph.m() == 1:
         nodes = list(graph.nodes())
         return MincutResult([nodes[0]], [nodes[1]], 1)
+    if context.viecut_io == ViecutIo.memfd:
+        with memory_file("metis") as (metis_file, metis), memory_file("cut") as (
+            cut_file,
+            cut_path,
+        ):
+            graph.write_metis(metis_file)
+            metis_file.flush()
+            return run_viecut_command(
+                metis,
+                cut_path,
+                hydrator=graph.hydrator,
+                pass_fds=(metis_file.fileno(), cut_file.fileno()),
+            )
     metis = graph.as_metis_filepath()
-    cut_path = metis + ".cut"
+    cut_path = context.request_graph_related_path(graph, "metis.cut")
     cut_result = run_viecut_command(metis, cut_path, hydrator=graph.hydrator)
     return cut_result
 
 
-def run_viecut_command(metis_path, output_path, hydrator=None):
+@contextmanager
+def memory_file(name: str) -> Iterator[Tuple[IO[bytes], str]]:
+    """An anonymous file in memory and a path under which a child process can open it
+
+    A memfd is shared with the child as an inherited descriptor, opened through
+    /proc/self/fd. Where memfds are not available, a file in /dev/shm (or the
+    temporary directory) is used and removed afterwards.
+    """
+    if hasattr(os, "memfd_create"):
+        f = os.fdopen(os.memfd_create(name), "w+b")
+        try:
+            yield f, f"/proc/self/fd/{f.fileno()}"
+        finally:
+            f.close()
+    else:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        with tempfile.NamedTemporaryFile(prefix=f"{name}.", dir=directory) as f:
+            yield f, f.name
+
+
+def run_viecut_command(metis_path, output_path, hydrator=None, pass_fds=()):
     """Run the viecut command and return the output path"""
     cmd = [context.viecut_path, "-b", "-s", "-o", output_path, metis_path, "cactus"]
     logger.debug(f"Running viecut command: {' '.join(cmd)}")
-    res = subprocess.run(cmd, capture_output=True)
+    res = subprocess.run(cmd, capture_output=True, pass_fds=pass_fds)
     if "has multiple connected components" in res.stdout.decode("utf-8"):
         return MincutResult([], [], 0)
     labels = []
@@ -43,6 +106,8 @@ def run_viecut_command(metis_path, output_path, hydrator=None):
     with open(output_path, "r") as f:
         for l in f:
             labels.append(int(l))
+    if not labels:
+        return MincutResult([], [], 0)
     light_partition = []
     heavy_partition = []
     for i, l in enumerate(labels):
@@ -54,9 +119,155 @@ def run_viecut_command(metis_path, output_path, hydrator=None):
     r_res = re.search(r"cut=(\d+)", lastline.decode("utf-8"))
     assert r_res, f"Could not find cut size in {lastline}"
     cut_size = int(r_res.group(1), 10)
-    if hydrator:
-        hydrated_light = [hydrator[i] for i in light_partition]
-        hydrated_heavy = [hydrator[i] for i in heavy_partition]
+    if hydrator is not None:
+        hydrated_light = [int(hydrator[i]) for i in light_partition]
+        hydrated_heavy = [int(hydrator[i]) for i in heavy_partition]
         return MincutResult(hydrated_light, hydrated_heavy, cut_size)
     else:
         return MincutResult(light_partition, heavy_partition, cut_size)
+
+
+def native(graph) -> MincutResult:
+    """Find a global mincut in-process, with the same conventions as `viecut`"""
+    n = graph.n()
+    if n < 2:
+        return MincutResult([], [], 0)
+    src, dst = graph.compact_edge_arrays()
+    if len(component_sizes(n, src, dst)) > 1:
+        # viecut refuses to cut disconnected graphs
+        return MincutResult([], [], 0)
+    weights = np.zeros((n, n), dtype=np.int32)
+    np.add.at(weights, (src, dst), 1)
+    np.add.at(weights, (dst, src), 1)
+    cut_size, side = minimum_cut(weights)
+    hydrator = graph.hydrator
+    light = [int(hydrator[i]) for i in np.flatnonzero(side)]
+    heavy = [int(hydrator[i]) for i in np.flatnonzero(~side)]
+    return MincutResult(light, heavy, cut_size)
+
+
+def component_labels(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Label the connected components of an edge list by the lowest node in each"""
+    graph = nk.Graph(n)
+    graph.addEdges((src.astype(np.uint64), dst.astype(np.uint64)))
+    components = nk.components.ConnectedComponents(graph)
+    components.run()
+    ids = np.asarray(components.getPartition().getVector(), dtype=np.int64)
+    lowest = np.full(components.numberOfComponents(), n, dtype=np.int64)
+    np.minimum.at(lowest, ids, np.arange(n))
+    return lowest[ids]
+
+
+def components_cut(graph) -> Optional[MincutResult]:
+    """Cut off the smallest connected component of the graph, if it has more than one"""
+    n = graph.n()
+    if n < 2:
+        return None
+    src, dst = graph.compact_edge_arrays()
+    _, components, sizes = np.unique(
+        component_labels(n, src, dst), return_inverse=True, return_counts=True
+    )
+    if len(sizes) == 1:
+        return None
+    side = components == np.argmin(sizes)
+    hydrator = np.asarray(graph.hydrator)
+    return MincutResult(hydrator[side].tolist(), hydrator[~side].tolist(), 0)
+
+
+def component_sizes(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    _, sizes = np.unique(component_labels(n, src, dst), return_counts=True)
+    return sizes
+
+
+def minimum_cut(weights: np.ndarray) -> Tuple[int, np.ndarray]:
+    """Global minimum cut of a connected graph given as a dense symmetric weight matrix
+
+    Edges that provably do not cross any cut lighter than the lightest vertex
+    (Padberg-Rinaldi) are contracted first, then Stoer-Wagner runs on what is left.
+    Among equally light cuts the most balanced one seen is kept.
+
+    Returns the cut size and a boolean mask of one side of the cut.
+    """
+    n = weights.shape[0]
+    degrees = weights.sum(axis=1)
+    lightest = int(np.argmin(degrees))
+    best_size = int(degrees[lightest])
+    best_side = np.zeros(n, dtype=bool)
+    best_side[lightest] = True
+    # an edge uv is crossed by a cut only together with one of uz, vz for each
+    # common neighbor z, so a cut separating u and v is at least this heavy
+    adjacent = (weights > 0).astype(np.float32)
+    separation = weights + adjacent @ adjacent
+    src, dst = np.nonzero(np.triu((weights > 0) & (separation >= best_size), 1))
+    _, groups = np.unique(component_labels(n, src, dst), return_inverse=True)
+    num_groups = int(groups.max()) + 1
+    if num_groups == 1:
+        return best_size, best_side
+    src, dst = np.nonzero(np.triu(weights, 1))
+    contracted = np.zeros((num_groups, num_groups), dtype=np.int64)
+    np.add.at(contracted, (groups[src], groups[dst]), weights[src, dst])
+    contracted += contracted.T
+    np.fill_diagonal(contracted, 0)
+    cut = _stoer_wagner(contracted, best_size, np.bincount(groups))
+    if cut is not None:
+        best_size, group_side = cut
+        best_side = group_side[groups]
+    return best_size, best_side
+
+
+def _stoer_wagner(
+    weights: np.ndarray, upper_bound: int, sizes: np.ndarray
+) -> Optional[Tuple[int, np.ndarray]]:
+    """Stoer-Wagner on dense weights, only reporting cuts no heavier than `upper_bound`
+
+    `sizes` holds the number of original vertices behind each vertex, used to
+    prefer balanced cuts over a single vertex (of size 1) cut off at `upper_bound`.
+    `weights` is modified in place; contracted vertices are swapped out of the
+    leading block of the matrix so that every phase only scans active vertices.
+    """
+    sentinel = np.iinfo(np.int64).min // 2
+    k = weights.shape[0]
+    members: List[List[int]] = [[i] for i in range(k)]
+    sizes = sizes.copy()
+    total_size = int(sizes.sum())
+    best: Optional[Tuple[int, List[int]]] = None
+    best_imbalance = total_size - 2
+    while k > 1:
+        active = weights[:k, :k]
+        key = active[0].copy()
+        key[0] = sentinel
+        s = t = 0
+        for _ in range(k - 1):
+            s = t
+            t = int(np.argmax(key))
+            cut_of_phase = int(key[t])
+            key += active[t]
+            key[t] = sentinel
+        side = members[t]
+        imbalance = abs(total_size - 2 * int(sizes[t]))
+        if cut_of_phase < upper_bound or (
+            cut_of_phase == upper_bound and imbalance < best_imbalance
+        ):
+            upper_bound = cut_of_phase
+            best_imbalance = imbalance
+            best = (cut_of_phase, list(side))
+        # contract t into s, then move the last active vertex into the slot of t
+        active[s] += active[t]
+        active[:, s] += active[:, t]
+        active[s, s] = 0
+        members[s] = members[s] + members[t]
+        sizes[s] += sizes[t]
+        last = k - 1
+        if t != last:
+            active[t] = active[last]
+            active[:, t] = active[:, last]
+            members[t] = members[last]
+            sizes[t] = sizes[last]
+        members.pop()
+        k -= 1
+    if best is None:
+        return None
+    cut_size, vertices = best
+    mask = np.zeros(weights.shape[0], dtype=bool)
+    mask[vertices] = True
+    return cut_size, mask
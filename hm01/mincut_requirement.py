@@ -5,6 +5,12 @@ from hm01.clusterers.abstract_clusterer import AbstractClusterer
 from .clusterers.leiden_wrapper import LeidenClusterer
 from .clusterers.ikc_wrapper import IkcClusterer
 from typing import List, Optional, Tuple, Union, Dict, Deque
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1 << 16)
+def cached_log10(n: int) -> float:
+    return math.log10(n) if n > 0 else 0
 
 
 @dataclass
@@ -29,10 +35,15 @@ class MincutRequirement:
         self, clusterer: AbstractClusterer, cluster, mcd_override: Optional[int] = None
     ) -> float:
         # TODO: mcd_override is kind of a hack
-        log10 = math.log10(cluster.n()) if cluster.n() > 0 else 0
         mcd = cluster.mcd() if mcd_override is None else mcd_override
+        return self.threshold(clusterer, cluster.n(), mcd)
+
+    def threshold(self, clusterer: AbstractClusterer, n: int, mcd: int) -> float:
+        """The validity threshold of a cluster of `n` nodes with minimum degree `mcd`"""
         k = clusterer.k if isinstance(clusterer, IkcClusterer) else 0
-        return self.log10 * log10 + self.mcd * mcd + self.k * k + self.constant
+        return (
+            self.log10 * cached_log10(n) + self.mcd * mcd + self.k * k + self.constant
+        )
 
     @staticmethod
     def most_stringent() -> MincutRequirement:
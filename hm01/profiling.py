@@ -0,0 +1,172 @@
+"""Per-stage timers and counters of a run, summarized as JSON with `--profile`
+
+The time spent in each stage of algorithm-g is accumulated by the size of the cluster
+it worked on, bucketed by powers of two, so that a few huge clusters stand out from
+the many small ones. Workers accumulate their own stages, which the main process
+merges in with every result (see `Profiler.take`).
+"""
+from __future__ import annotations
+import cProfile
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+# the summary is rewritten at most this often while running
+WRITE_INTERVAL_SECONDS = 60.0
+
+# stages and counters accumulated in one process, to be merged into another
+ProfileDelta = Tuple[Dict[Tuple[str, str], "StageStats"], Dict[str, int]]
+
+
+def size_bucket(n: int) -> str:
+    """The power-of-two bucket of a cluster size, e.g., `1024-2047` for 1500"""
+    if n <= 0:
+        return "0"
+    low = 1 << (n.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+@dataclass
+class StageStats:
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def merge(self, other: StageStats):
+        self.count += other.count
+        self.seconds += other.seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+
+
+class Profiler:
+    """Timers and counters, disabled (and close to free) until `enable` is called"""
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[str] = None
+        self.stages: Dict[Tuple[str, str], StageStats] = defaultdict(StageStats)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._started = time.time()
+        self._last_write = 0.0
+        self._python_profile: Optional[cProfile.Profile] = None
+
+    def enable(self, path: str, python_profile: bool = False):
+        """Collect timings, summarized to `path`; with `python_profile`, also run cProfile
+        in this process and dump its stats next to it
+        """
+        self.enabled = True
+        self.path = path
+        self._started = time.time()
+        if python_profile:
+            self._python_profile = cProfile.Profile()
+            self._python_profile.enable()
+        return self
+
+    @contextmanager
+    def stage(self, name: str, size: int = 0) -> Iterator[None]:
+        """Time the block as stage `name` on a cluster of `size` nodes"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name, size_bucket(size)].add(time.perf_counter() - start)
+
+    def forked(self):
+        """Start over in a forked worker, which reports its stages through `take`"""
+        self.take()
+        if self._python_profile is not None:
+            self._python_profile.disable()
+            self._python_profile = None
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            self.counters[name] += amount
+
+    def take(self) -> Optional[ProfileDelta]:
+        """The stages and counters accumulated since the last call, for merging elsewhere
+        """
+        if not self.enabled or (not self.stages and not self.counters):
+            return None
+        taken = (dict(self.stages), dict(self.counters))
+        self.stages = defaultdict(StageStats)
+        self.counters = defaultdict(int)
+        return taken
+
+    def merge(self, taken: Optional[ProfileDelta]):
+        if taken is None:
+            return
+        stages, counters = taken
+        for key, stats in stages.items():
+            self.stages[key].merge(stats)
+        for name, amount in counters.items():
+            self.counters[name] += amount
+
+    def summary(self) -> dict:
+        stages: Dict[str, dict] = {}
+        for (name, bucket), stats in sorted(
+            self.stages.items(),
+            key=lambda item: (item[0][0], _bucket_order(item[0][1])),
+        ):
+            stage = stages.setdefault(
+                name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "by_size": {}}
+            )
+            stage["count"] += stats.count
+            stage["seconds"] += stats.seconds
+            stage["max_seconds"] = max(stage["max_seconds"], stats.max_seconds)
+            stage["by_size"][bucket] = {
+                "count": stats.count,
+                "seconds": stats.seconds,
+                "max_seconds": stats.max_seconds,
+            }
+        return {
+            "wall_seconds": time.time() - self._started,
+            "stages": stages,
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def write(self):
+        """Write the summary, replacing the previous one atomically"""
+        if not self.enabled or self.path is None:
+            return
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+        self._last_write = time.monotonic()
+
+    def maybe_write(self):
+        """Write the summary if the last one is older than `WRITE_INTERVAL_SECONDS`"""
+        if (
+            self.enabled
+            and time.monotonic() - self._last_write >= WRITE_INTERVAL_SECONDS
+        ):
+            self.write()
+
+    def finish(self):
+        """Write the final summary, and the cProfile stats if collected"""
+        if not self.enabled:
+            return
+        self.write()
+        if self._python_profile is not None and self.path is not None:
+            self._python_profile.disable()
+            self._python_profile.dump_stats(self.path.removesuffix(".json") + ".pstats")
+            self._python_profile = None
+
+
+def _bucket_order(bucket: str) -> int:
+    return int(bucket.split("-")[0])
+
+
+# we export the profiler as a singleton, as the context
+profiler = Profiler()
@@ -1,36 +1,84 @@
 from __future__ import annotations
-from hm01.graph import RealizedSubgraph
+import math
+from typing import List, Union
+
+from hm01.graph import Graph, RealizedSubgraph
 
 from hm01.mincut_requirement import MincutRequirement
 from hm01.clusterers.abstract_clusterer import AbstractClusterer
-from heapdict import heapdict
+from hm01.lazy import lazy_import
+
+np = lazy_import("numpy")
 
 
 def prune_graph(
-    graph: RealizedSubgraph,
+    graph: Union[Graph, RealizedSubgraph],
     connectivity_requirement: MincutRequirement,
     clusterer: AbstractClusterer,
 ) -> int:
+    """Repeatedly remove a node of minimum degree while its degree is within the validity threshold
+
+    Returns the number of removed nodes.
+    """
     mcd = graph.mcd()
     if mcd > connectivity_requirement.validity_threshold(clusterer, graph):
         return 0
-    deleted_nodes = 0
-    degrees = heapdict()
-    for node in graph.nodes():
-        degrees[node] = graph.degree(node)
-    while degrees:
-        node, degree = degrees.popitem()
-        if degree > connectivity_requirement.validity_threshold(
-            clusterer, graph, mcd_override=degree
+    nodes, indptr, indices = graph.compact_csr()
+    degrees = np.diff(indptr)
+    if connectivity_requirement.mcd == 0:
+        # the threshold only shrinks with the cluster, so nodes whose degree exceeds the
+        # threshold of the whole cluster can never be removed and need not be queued.
+        # The peel itself stays sequential: removing a whole degree level at once (as a
+        # k-core does) checks it against a threshold the sequential peel has already
+        # lowered, and keeps or removes other nodes
+        cap = math.floor(connectivity_requirement.threshold(clusterer, len(nodes), 0))
+    else:
+        cap = int(degrees.max())
+    removed = peel(indptr, indices, degrees, cap, connectivity_requirement, clusterer)
+    if removed:
+        graph.remove_nodes(nodes[removed].tolist())
+    return len(removed)
+
+
+def peel(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    degrees: np.ndarray,
+    cap: int,
+    connectivity_requirement: MincutRequirement,
+    clusterer: AbstractClusterer,
+) -> List[int]:
+    """Peel off nodes of minimum degree with a bucket queue over the degrees up to `cap`
+
+    Only nodes of degree at most `cap` are queued. Returns the peeled rows in order.
+    """
+    n = len(degrees)
+    degrees = degrees.tolist()
+    alive = bytearray(b"\x01") * n
+    # buckets are stacks, so the most recently decremented node is popped first among equals
+    buckets: List[List[int]] = [[] for _ in range(cap + 1)]
+    for u in np.flatnonzero(np.asarray(degrees) <= cap).tolist():
+        buckets[degrees[u]].append(u)
+    removed: List[int] = []
+    current = 0
+    while current <= cap:
+        bucket = buckets[current]
+        if not bucket:
+            current += 1
+            continue
+        u = bucket.pop()
+        if not alive[u] or degrees[u] != current:
+            continue  # a stale entry, the node has since moved to a lower bucket
+        if current > connectivity_requirement.threshold(
+            clusterer, n - len(removed), current
         ):
             break
-        for neighbor in graph.neighbors(node):
-            if neighbor in degrees:
-                degrees[neighbor] -= 1
-            else:
-                # TODO: this else case should be not needed, but still kept here for defensive programming
-                degrees[neighbor] = graph.degree(neighbor) - 1
-        graph.remove_node(node)
-        deleted_nodes += 1
-    graph.mcd.cache_clear()
-    return deleted_nodes
+        alive[u] = 0
+        removed.append(u)
+        for v in indices[indptr[u] : indptr[u + 1]].tolist():
+            if alive[v]:
+                degrees[v] -= 1
+                if degrees[v] <= cap:
+                    buckets[degrees[v]].append(v)
+                    current = min(current, degrees[v])
+    return removed
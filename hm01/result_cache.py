@@ -0,0 +1,200 @@
+"""A persistent cache of mincuts and clusterings, shared by runs on the same working directory
+
+Results are keyed on a hash of the subgraph they were computed on (its node ids and
+its edges) together with the engine or the clusterer computing them, so that a run with
+another threshold, or a run restarted without a checkpoint, reuses every result whose
+subgraph reappears. The cache is a SQLite database evicting the least recently used
+results beyond a size cap. It is off unless a run is given a cap, and the database must
+be on a local filesystem, since SQLite locking is unreliable on network filesystems.
+"""
+from __future__ import annotations
+import functools
+import hashlib
+import os
+import pickle as pkl
+import sqlite3
+import time
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+
+from .context import context
+from .lazy import lazy_import
+from .profiling import profiler
+
+np = lazy_import("numpy")
+
+CACHE_FILENAME = "results.sqlite"
+# bump when the stored results change meaning, which invalidates every older entry
+CACHE_VERSION = 1
+# a hit only records its use when the last one recorded is older than this, so that
+# hits are plain reads and do not contend for the write lock of the database
+LAST_USED_INTERVAL_NS = 60 * 10**9
+
+
+def subgraph_key(graph, *parameters: Any) -> str:
+    """A hash identifying `graph` (a `Graph` or `RealizedSubgraph`) and the computation on it
+    """
+    nodes, indptr, indices = graph.compact_csr()
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr((CACHE_VERSION,) + parameters).encode())
+    for array in (nodes, indptr, indices):
+        digest.update(np.ascontiguousarray(array, dtype=np.int64).tobytes())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Pickled results in SQLite, evicted least recently used first beyond `max_bytes`
+
+    Every process opens its own connection, so that workers forked from a process
+    that already used the cache do not share its connection. The recency of a result
+    is only as precise as `last_used_interval_ns`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        last_used_interval_ns: int = LAST_USED_INTERVAL_NS,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.last_used_interval_ns = last_used_interval_ns
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = -1
+        self._total_bytes = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB"
+                " NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_by_use ON results (last_used)"
+            )
+            self._pid = os.getpid()
+            self._total_bytes = self._sum_sizes()
+        return self._connection
+
+    def _sum_sizes(self) -> int:
+        assert self._connection is not None
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self.connection.execute(
+            "SELECT value, last_used FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            profiler.count("result_cache_misses")
+            return None
+        profiler.count("result_cache_hits")
+        now = time.time_ns()
+        if now - row[1] >= self.last_used_interval_ns:
+            with self.connection as connection:
+                connection.execute(
+                    "UPDATE results SET last_used = ? WHERE key = ?", (now, key)
+                )
+        return pkl.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        payload = pkl.dumps(value, protocol=pkl.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        with self.connection as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time_ns()),
+            )
+        # other processes add to the cache too, so the running total is only an
+        # estimate until it is recounted when evicting
+        self._total_bytes += len(payload)
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used results until the cache is within its cap"""
+        with self.connection as connection:
+            connection.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM (SELECT key,"
+                " SUM(size) OVER (ORDER BY last_used DESC, key) AS kept FROM results)"
+                " WHERE kept > ?)",
+                (self.max_bytes,),
+            )
+        self._total_bytes = self._sum_sizes()
+
+    def shrink(self, max_bytes: int):
+        """Lower the cap to `max_bytes` and give the space freed back to the filesystem
+        """
+        self.max_bytes = max(max_bytes, 0)
+        self.evict()
+        # deleted rows only free pages inside the database file, and vacuuming
+        # rewrites the database through the write-ahead log
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.connection.execute("VACUUM")
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def stored_bytes(self) -> int:
+        """The size of the results stored, without the overhead of the database"""
+        self.connection
+        return self._sum_sizes()
+
+    def file_bytes(self) -> int:
+        """The size of the database on disk, with its write-ahead log"""
+        total = 0
+        for suffix in ["", "-wal", "-shm"]:
+            try:
+                total += os.path.getsize(self.path + suffix)
+            except FileNotFoundError:
+                pass
+        return total
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __getstate__(self):
+        # connections cannot be pickled, the unpickled cache opens its own
+        return {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "last_used_interval_ns": self.last_used_interval_ns,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def cached_clustering(cluster: Callable) -> Callable:
+    """Consult the result cache of the context in the `cluster` method of a clusterer
+
+    The cached clusters are stored by the suffix of their index, and renamed after the
+    graph they are found in again.
+    """
+
+    @functools.wraps(cluster)
+    def cached_cluster(self, graph, **kwargs) -> Iterator:
+        cache = context.result_cache
+        if cache is None:
+            yield from cluster(self, graph, **kwargs)
+            return
+        # keyword arguments such as a starting partition are part of the key
+        arguments = sorted(
+            (k, hashlib.blake2b(np.asarray(v).tobytes()).hexdigest())
+            for k, v in kwargs.items()
+            if v is not None
+        )
+        key = subgraph_key(graph, "cluster", repr(self), arguments)
+        found: Optional[List[Tuple[str, List[int]]]] = cache.get(key)
+        if found is None:
+            clusters = list(cluster(self, graph, **kwargs))
+            found = [(c.index[len(graph.index) :], list(c.subset)) for c in clusters]
+            cache.put(key, found)
+        for suffix, nodes in found:
+            yield graph.intangible_subgraph(nodes, suffix)
+
+    return cached_cluster
@@ -0,0 +1,156 @@
+"""The order in which algorithm-g processes its pending clusters, and how many at once
+
+`ClusterScheduler` replaces the plain stack of pending clusters. The order is a pure
+function of what was pushed, so a run resumed from a checkpoint (which pickles the
+scheduler) pops its clusters in the order the journal recorded them.
+"""
+from __future__ import annotations
+from enum import Enum
+import heapq
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+from .graph import Graph, IntangibleSubgraph
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# rough footprint of realizing and processing a cluster: realizing gathers the global
+# adjacency of its nodes, and the clusterers and mincuts copy the graph a few times more
+BYTES_PER_NODE = 256
+BYTES_PER_ENDPOINT = 64
+
+
+class SchedulerPolicy(str, Enum):
+    lifo = "lifo"
+    largest_first = "largest_first"
+    smallest_first = "smallest_first"
+
+
+class ClusterScheduler:
+    """The pending clusters of algorithm-g, popped in the order of `policy`
+
+    `lifo` pops the cluster pushed last, as the stack it replaces. The others pop the
+    largest (or smallest) cluster first, the one pushed last among equal sizes.
+    """
+
+    def __init__(
+        self,
+        policy: SchedulerPolicy = SchedulerPolicy.lifo,
+        clusters: Iterable[IntangibleSubgraph] = (),
+    ):
+        self.policy = policy
+        # `lifo` keeps a stack; the sized policies a heap keyed on the size (negated
+        # for `largest_first`) and then on the push count, negated as well
+        self._clusters: List[IntangibleSubgraph] = []
+        self._heap: List[Tuple[int, int, IntangibleSubgraph]] = []
+        self._pushed = 0
+        self.extend(clusters)
+
+    def push(self, cluster: IntangibleSubgraph):
+        self._pushed += 1
+        if self.policy == SchedulerPolicy.lifo:
+            self._clusters.append(cluster)
+            return
+        size = cluster.n()
+        if self.policy == SchedulerPolicy.largest_first:
+            size = -size
+        heapq.heappush(self._heap, (size, -self._pushed, cluster))
+
+    def extend(self, clusters: Iterable[IntangibleSubgraph]):
+        for cluster in clusters:
+            self.push(cluster)
+
+    def pop(self) -> IntangibleSubgraph:
+        if self.policy == SchedulerPolicy.lifo:
+            return self._clusters.pop()
+        return heapq.heappop(self._heap)[-1]
+
+    def upcoming(self) -> Iterator[IntangibleSubgraph]:
+        """The pending clusters in the order they will be popped, unless more are pushed
+
+        Lazy, so that taking the next few clusters does not sort all of them.
+        """
+        if self.policy == SchedulerPolicy.lifo:
+            return reversed(self._clusters)
+        return self._heap_in_order()
+
+    def _heap_in_order(self) -> Iterator[IntangibleSubgraph]:
+        # walks the heap from its root, always expanding the smallest entry reached
+        heap = self._heap
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            entry, i = heapq.heappop(frontier)
+            yield entry[-1]
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def __len__(self) -> int:
+        return len(self._clusters) + len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._clusters) or bool(self._heap)
+
+    def __setstate__(self, state):
+        if "_keys" in state:
+            # checkpointed when the sized policies kept a sorted list of (size, push
+            # count) keys, popped from the end; negating them gives the heap keys
+            keys = state.pop("_keys")
+            state["_heap"] = [
+                (-size, -pushed, cluster)
+                for (size, pushed), cluster in zip(keys, state["_clusters"])
+            ]
+            heapq.heapify(state["_heap"])
+            if keys:
+                state["_clusters"] = []
+        self.__dict__.update(state)
+
+
+def estimated_bytes(cluster: IntangibleSubgraph, global_graph: Graph) -> int:
+    """An estimate of the memory taken by processing `cluster`, from its global degrees
+    """
+    nodes = np.asarray(cluster.subset, dtype=np.int64)
+    endpoints = int(global_graph.degrees[nodes].sum()) if len(nodes) else 0
+    return BYTES_PER_NODE * len(nodes) + BYTES_PER_ENDPOINT * endpoints
+
+
+class MemoryBudget:
+    """Admits clusters to be processed concurrently while their estimated footprint fits
+
+    A budget of 0 admits everything. A cluster is always admitted when nothing else is
+    in flight, so one cluster larger than the budget is still processed, alone.
+    """
+
+    def __init__(self, global_graph: Graph, budget_bytes: int = 0):
+        self.global_graph = global_graph
+        self.budget_bytes = budget_bytes
+        self.in_flight: Dict[str, int] = {}
+        self._estimates: Dict[str, int] = {}
+
+    def estimate(self, cluster: IntangibleSubgraph) -> int:
+        estimate = self._estimates.get(cluster.index)
+        if estimate is None:
+            estimate = estimated_bytes(cluster, self.global_graph)
+            self._estimates[cluster.index] = estimate
+        return estimate
+
+    def admit(self, cluster: IntangibleSubgraph) -> bool:
+        """Reserve the footprint of `cluster` if it fits, returning whether it did"""
+        estimate = self.estimate(cluster)
+        used = sum(self.in_flight.values())
+        if (
+            self.budget_bytes > 0
+            and self.in_flight
+            and used + estimate > self.budget_bytes
+        ):
+            return False
+        self.in_flight[cluster.index] = estimate
+        return True
+
+    def release(self, cluster: IntangibleSubgraph):
+        self.release_index(cluster.index)
+
+    def release_index(self, index: str):
+        self.in_flight.pop(index, None)
+        self._estimates.pop(index, None)
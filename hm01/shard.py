@@ -0,0 +1,392 @@
+"""Run CM on several hosts over a work queue in a shared directory
+
+`cmshard plan` computes (or loads) the first-round clusters and writes them as shards
+to the shared directory, along with the parameters of the run. Any number of
+`cmshard work` processes, on any hosts that see the directory, then claim shards with
+lock files and run algorithm-g on them, each against its own copy of the graph. Finally
+`cmshard merge` stitches the labels and the trees of the shards into the outputs of a
+single run of `cm`.
+
+A claimed shard is locked by an exclusively created `shard-N.lock`, whose modification
+time its worker refreshes while working. A lock left stale by a worker that died is
+taken over by another worker, which resumes the shard from its checkpoint in the shared
+directory.
+"""
+from __future__ import annotations
+from dataclasses import asdict, dataclass
+import heapq
+import json
+import os
+import pickle as pkl
+import socket
+import sys
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import typer
+
+from .clusterers.ikc_wrapper import IkcEngine
+from .cm import (
+    Checkpoint,
+    ClusterIgnoreFilter,
+    ClustererSpec,
+    first_round,
+    make_clusterer,
+    run_and_write,
+)
+from .context import WorkingDirLockLost, context
+from .graph import IntangibleSubgraph
+from .graph_cache import load_graph
+from .history import TREE_SUFFIX, HistoryTree
+from .lazy import lazy_import
+from .mincut import MincutEngine, ViecutIo
+from .mincut_requirement import MincutRequirement
+from .scheduler import SchedulerPolicy
+
+structlog = lazy_import("structlog")
+
+PLAN_FILENAME = "plan.json"
+
+app = typer.Typer()
+
+
+@dataclass
+class ShardPlan:
+    """The parameters shared by all workers of a sharded run"""
+
+    input: str
+    clusterer_spec: ClustererSpec
+    k: int
+    resolution: float
+    threshold: str
+    ignore_trees: bool
+    ignore_smaller_than: int
+    ikc_engine: IkcEngine
+    mincut_engine: MincutEngine
+    connectivity_certificate: bool
+    leiden_warm_start: bool
+    scheduler: SchedulerPolicy
+    num_shards: int
+    # the labels of the first-round clusters, in the order of a single run
+    clusters: List[str]
+
+    def save(self, shared_dir: str):
+        path = os.path.join(shared_dir, PLAN_FILENAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump(asdict(self), f)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(shared_dir: str) -> ShardPlan:
+        with open(os.path.join(shared_dir, PLAN_FILENAME)) as f:
+            fields = json.load(f)
+        plan = ShardPlan(**fields)
+        plan.clusterer_spec = ClustererSpec(plan.clusterer_spec)
+        plan.ikc_engine = IkcEngine(plan.ikc_engine)
+        plan.mincut_engine = MincutEngine(plan.mincut_engine)
+        plan.scheduler = SchedulerPolicy(plan.scheduler)
+        return plan
+
+
+def shard_path(shared_dir: str, i: int, suffix: str) -> str:
+    return os.path.join(shared_dir, "shards", f"shard-{i:05d}{suffix}")
+
+
+def partition(clusters: List[IntangibleSubgraph], num_shards: int) -> List[List[int]]:
+    """Positions of the clusters in each shard, balancing the total size of the shards
+    """
+    shards: List[List[int]] = [[] for _ in range(min(num_shards, len(clusters)))]
+    loads = [(0, i) for i in range(len(shards))]
+    by_size = sorted(range(len(clusters)), key=lambda i: -clusters[i].n())
+    for i in by_size:
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(i)
+        heapq.heappush(loads, (load + clusters[i].n(), shard))
+    # within a shard, the clusters keep their relative order of a single run
+    return [sorted(shard) for shard in shards]
+
+
+@app.command()
+def plan(
+    input: str = typer.Option(..., "--input", "-i"),
+    shared_dir: str = typer.Option(..., "--shared-dir", "-d"),
+    clusterer_spec: ClustererSpec = typer.Option(..., "--clusterer", "-c"),
+    existing_clustering: Optional[str] = typer.Option(
+        "", "--existing-clustering", "-e"
+    ),
+    k: int = typer.Option(-1, "--k", "-k"),
+    resolution: float = typer.Option(-1, "--resolution", "-g"),
+    threshold: str = typer.Option("", "--threshold", "-t"),
+    shards: int = typer.Option(64, "--shards", "-n"),
+    ignore_trees: bool = typer.Option(False, "--ignore-trees", "-x"),
+    ignore_smaller_than: int = typer.Option(0, "--ignore-smaller-than", "-s"),
+    mincut_engine: MincutEngine = typer.Option(MincutEngine.viecut, "--mincut-engine"),
+    ikc_engine: IkcEngine = typer.Option(IkcEngine.subprocess, "--ikc-engine"),
+    graph_cache: bool = typer.Option(True, "--graph-cache/--no-graph-cache"),
+    connectivity_certificate: bool = typer.Option(
+        False, "--connectivity-certificate/--exact-connectivity"
+    ),
+    leiden_warm_start: bool = typer.Option(False, "--leiden-warm-start"),
+    scheduler: SchedulerPolicy = typer.Option(SchedulerPolicy.lifo, "--scheduler"),
+):
+    """Write the first-round clusters of INPUT as shards to SHARED_DIR"""
+    log = structlog.get_logger()
+    assert shards >= 1, "Number of shards must be positive"
+    MincutRequirement.try_from_str(threshold)
+    clusterer = make_clusterer(
+        clusterer_spec, k, resolution, ikc_engine, leiden_warm_start
+    )
+    os.makedirs(os.path.join(shared_dir, "shards"), exist_ok=True)
+    context.with_working_dir(os.path.join(shared_dir, "plan_working_dir"))
+    context.with_mincut_engine(mincut_engine)
+    root_graph = load_graph(input, graph_cache)
+    clusters = first_round(root_graph, clusterer, existing_clustering)
+    positions = partition(clusters, shards)
+    for i, shard in enumerate(positions):
+        path = shard_path(shared_dir, i, ".pkl")
+        with open(path + ".tmp", "wb") as f:
+            pkl.dump([clusters[j] for j in shard], f)
+        os.replace(path + ".tmp", path)
+    # written last, so that workers only start on a complete plan
+    ShardPlan(
+        os.path.abspath(input),
+        clusterer_spec,
+        k,
+        resolution,
+        threshold,
+        ignore_trees,
+        ignore_smaller_than,
+        ikc_engine,
+        mincut_engine,
+        connectivity_certificate,
+        leiden_warm_start,
+        scheduler,
+        len(positions),
+        [c.index for c in clusters],
+    ).save(shared_dir)
+    log.info("planned shards", shared_dir=shared_dir, num_shards=len(positions))
+
+
+def read_lock(path: str) -> Optional[Tuple[str, float]]:
+    """The token and the modification time of a lock file, None if there is none"""
+    try:
+        with open(path) as f:
+            return f.read(), os.fstat(f.fileno()).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+class ShardLock:
+    """An exclusively created lock file, kept fresh by a heartbeat thread
+
+    The lock holds a token unique to its holder, so that a holder whose lock was taken
+    over (after it stalled for longer than `stale_seconds`) leaves the new lock alone.
+    """
+
+    def __init__(self, path: str, stale_seconds: float):
+        assert stale_seconds > 0, "stale_seconds must be positive"
+        self.path = path
+        self.stale_seconds = stale_seconds
+        self.token = f"{socket.gethostname()} {os.getpid()} {os.urandom(8).hex()}\n"
+        self._stopped = threading.Event()
+        # set by the heartbeat once the lock turns out to be taken over
+        self.lost = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def acquire(self) -> bool:
+        # the lock is linked into place with its token, so that it is never seen empty
+        candidate = f"{self.path}.{self.token.split()[-1]}"
+        with open(candidate, "w") as f:
+            f.write(self.token)
+        try:
+            while True:
+                try:
+                    os.link(candidate, self.path)
+                    break
+                except FileExistsError:
+                    if not self._take_over_stale():
+                        return False
+        finally:
+            os.remove(candidate)
+        self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def owned(self) -> bool:
+        lock = read_lock(self.path)
+        return lock is not None and lock[0] == self.token
+
+    def _take_over_stale(self) -> bool:
+        """Remove the lock if it is stale, True if it is gone and can be acquired anew
+        """
+        seen = read_lock(self.path)
+        if seen is None:
+            return True
+        if time.time() - seen[1] < self.stale_seconds:
+            return False
+        return self._take_over(seen)
+
+    def _take_over(self, seen: Tuple[str, float]) -> bool:
+        """Remove the lock `seen` stale, unless it was replaced since"""
+        taken = f"{self.path}.stale-{self.token.split()[-1]}"
+        try:
+            os.rename(self.path, taken)
+        except FileNotFoundError:
+            return True
+        if read_lock(taken) != seen:
+            # another worker took the stale lock over between our check and the rename,
+            # so what was renamed away is its fresh lock: put it back
+            try:
+                os.link(taken, self.path)
+            except FileExistsError:
+                structlog.get_logger().warning(
+                    "could not restore a lock taken over meanwhile", lock=self.path
+                )
+            os.remove(taken)
+            return False
+        os.remove(taken)
+        structlog.get_logger().warning(
+            "took over stale lock", lock=self.path, holder=seen[0].strip()
+        )
+        return True
+
+    def _beat(self):
+        while not self._stopped.wait(self.stale_seconds / 4):
+            if not self.owned():
+                structlog.get_logger().warning("lock was taken over", lock=self.path)
+                self.lost.set()
+                return
+            os.utime(self.path)
+
+    def release(self):
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        if self.owned():
+            os.remove(self.path)
+
+
+def claimed_shards(
+    shared_dir: str, num_shards: int, stale_seconds: float
+) -> Iterator[Tuple[int, ShardLock]]:
+    """Claim the shards that are neither done nor locked, holding each lock until the
+    next one is asked for
+    """
+    for i in range(num_shards):
+        if os.path.exists(shard_path(shared_dir, i, ".done")):
+            continue
+        lock = ShardLock(shard_path(shared_dir, i, ".lock"), stale_seconds)
+        if not lock.acquire():
+            continue
+        try:
+            # done by another worker between the check and the lock
+            if not os.path.exists(shard_path(shared_dir, i, ".done")):
+                yield i, lock
+        finally:
+            lock.release()
+
+
+@app.command()
+def work(
+    shared_dir: str = typer.Option(..., "--shared-dir", "-d"),
+    workers: int = typer.Option(1, "--workers", "-w"),
+    graph_cache: bool = typer.Option(True, "--graph-cache/--no-graph-cache"),
+    result_cache_mb: int = typer.Option(0, "--result-cache-mb"),
+    viecut_io: ViecutIo = typer.Option(ViecutIo.file, "--viecut-io"),
+    memory_budget_mb: int = typer.Option(0, "--memory-budget"),
+    stale_seconds: float = typer.Option(600, "--stale-seconds"),
+):
+    """Process the shards of SHARED_DIR until none is left to claim"""
+    # pickling the tree into checkpoints recurses along the depth of the tree
+    sys.setrecursionlimit(1231231234)
+    log = structlog.get_logger()
+    assert stale_seconds > 0, "Staleness must be positive"
+    plan = ShardPlan.load(shared_dir)
+    clusterer = make_clusterer(
+        plan.clusterer_spec,
+        plan.k,
+        plan.resolution,
+        plan.ikc_engine,
+        plan.leiden_warm_start,
+    )
+    requirement = MincutRequirement.try_from_str(plan.threshold)
+    filterer = ClusterIgnoreFilter(plan.ignore_trees, plan.ignore_smaller_than)
+    context.with_mincut_engine(plan.mincut_engine)
+    context.with_viecut_io(viecut_io)
+    context.with_connectivity_certificate(plan.connectivity_certificate)
+    os.makedirs(os.path.join(shared_dir, "work"), exist_ok=True)
+    root_graph = None
+    for i, lock in claimed_shards(shared_dir, plan.num_shards, stale_seconds):
+        if root_graph is None:
+            # loaded once there is work, each worker its own copy
+            root_graph = load_graph(plan.input, graph_cache)
+        log.info("processing shard", shard=i, host=socket.gethostname())
+        with open(shard_path(shared_dir, i, ".pkl"), "rb") as f:
+            clusters: List[IntangibleSubgraph] = pkl.load(f)
+        # the checkpoints of a shard are shared, so that a worker taking it over resumes it
+        context.with_working_dir(os.path.join(shared_dir, "work", f"shard-{i:05d}"))
+        context.with_result_cache(result_cache_mb << 20)
+        # a worker that stalled and had its shard taken over stops writing to it
+        context.with_working_dir_lock(lock)
+        try:
+            run_and_write(
+                root_graph,
+                clusters,
+                clusterer,
+                requirement,
+                filterer,
+                workers,
+                shard_path(shared_dir, i, ".labels"),
+                False,
+                plan.scheduler,
+                memory_budget_mb << 20,
+                keep_checkpoint=True,
+            )
+            context.check_working_dir_lock(verify=True)
+        except WorkingDirLockLost:
+            log.warning("abandoned shard taken over by another worker", shard=i)
+            continue
+        finally:
+            context.with_working_dir_lock(None)
+        with open(shard_path(shared_dir, i, ".done"), "w"):
+            pass
+        # kept until the shard is marked done, for a worker taking over a crashed run
+        Checkpoint.discard_latest()
+        log.info("finished shard", shard=i)
+
+
+@app.command()
+def merge(
+    shared_dir: str = typer.Option(..., "--shared-dir", "-d"),
+    output: str = typer.Option(..., "--output", "-o"),
+):
+    """Stitch the outputs of all shards of SHARED_DIR into OUTPUT and its tree"""
+    plan = ShardPlan.load(shared_dir)
+    missing = [
+        i
+        for i in range(plan.num_shards)
+        if not os.path.exists(shard_path(shared_dir, i, ".done"))
+    ]
+    assert not missing, f"shards {missing} are not done yet"
+    with open(output, "w") as f:
+        for i in range(plan.num_shards):
+            with open(shard_path(shared_dir, i, ".labels")) as shard_labels:
+                for line in shard_labels:
+                    f.write(line)
+    trees = [
+        HistoryTree.load(shard_path(shared_dir, i, ".labels" + TREE_SUFFIX))
+        for i in range(plan.num_shards)
+    ]
+    HistoryTree.join(trees, plan.clusters).save(output + TREE_SUFFIX)
+    structlog.get_logger().info(
+        "merged shards", output=output, num_shards=plan.num_shards
+    )
+
+
+def entry_point():
+    app()
+
+
+if __name__ == "__main__":
+    entry_point()
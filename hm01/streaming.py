@@ -0,0 +1,99 @@
+"""Output of algorithm-g written while it runs, instead of all at once at the end
+
+The labels file gets a `node cluster` line as soon as the label of a node is final,
+and the history tree is written as NDJSON, one line per tree node. A tree node can
+appear more than once, since it is written when created and again when its cluster
+is processed; the later line supersedes the earlier one.
+"""
+from __future__ import annotations
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import treeswift as ts
+
+TREE_NODE_ATTRIBUTES = [
+    "num_nodes",
+    "cut_size",
+    "validity_threshold",
+    "extant",
+    "certified",
+]
+
+
+class StreamingOutput:
+    """Append-only writers for the labels and the history tree of a run"""
+
+    def __init__(self, labels_path: str, tree_path: str):
+        self.labels_path = labels_path
+        self.tree_path = tree_path
+        self._labels = open(labels_path, "wb")
+        self._tree = open(tree_path, "wb")
+
+    def write_labels(self, labels: Iterable[Tuple[int, str]]):
+        self._labels.write("".join(f"{n} {cid}\n" for n, cid in labels).encode())
+
+    def write_tree_node(self, node: ts.Node):
+        record: Dict[str, Any] = {
+            "label": node.label,
+            "parent": node.parent.label if node.parent is not None else None,
+        }
+        for attribute in TREE_NODE_ATTRIBUTES:
+            record[attribute] = getattr(node, attribute, None)
+        self._tree.write((json.dumps(record) + "\n").encode())
+
+    def flush(self):
+        """Make everything written so far visible to readers of the files"""
+        self._labels.flush()
+        self._tree.flush()
+
+    def close(self):
+        self._labels.close()
+        self._tree.close()
+
+    def __getstate__(self):
+        # pickled into checkpoints as the paths and how much of them was written
+        self.flush()
+        return {
+            "labels_path": self.labels_path,
+            "tree_path": self.tree_path,
+            "labels_offset": self._labels.tell(),
+            "tree_offset": self._tree.tell(),
+        }
+
+    def __setstate__(self, state):
+        # resuming from a checkpoint drops what was written after it, to be written again
+        self.labels_path = state["labels_path"]
+        self.tree_path = state["tree_path"]
+        self._labels = _open_truncated(self.labels_path, state["labels_offset"])
+        self._tree = _open_truncated(self.tree_path, state["tree_offset"])
+
+
+def _open_truncated(path: str, offset: int):
+    f = open(path, "r+b")
+    f.truncate(offset)
+    f.seek(offset)
+    return f
+
+
+def read_tree_ndjson(path: str) -> ts.Tree:
+    """Rebuild the history tree from its NDJSON stream"""
+    tree = ts.Tree()
+    nodes: Dict[str, ts.Node] = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            label = record.pop("label")
+            parent: Optional[str] = record.pop("parent")
+            node = nodes.get(label)
+            if node is None:
+                node = ts.Node(label=label)
+                node.graph_index = label
+                nodes[label] = node
+                if parent is None:
+                    tree.root = node
+                else:
+                    nodes[parent].add_child(node)
+            for attribute, value in record.items():
+                if value is not None:
+                    setattr(node, attribute, value)
+    return tree
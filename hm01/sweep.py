@@ -0,0 +1,160 @@
+"""Run CM over a grid of thresholds and clusterer parameters in one process
+
+The graph is loaded once and every first-round clustering is computed once, however
+many thresholds it is combined with. All combinations share the result cache of the
+working directory when it is given a size, so mincuts and reclusterings of subgraphs
+that coincide across combinations are computed once as well. Every combination gets its
+own subdirectory of the working directory for its checkpoints, so an interrupted sweep
+resumes where it stopped.
+"""
+from __future__ import annotations
+import os
+import sys
+from typing import List, Optional
+
+import typer
+
+from .clusterers.ikc_wrapper import IkcEngine
+from .cm import (
+    PROFILE_SUFFIX,
+    ClusterIgnoreFilter,
+    ClustererSpec,
+    first_round,
+    make_clusterer,
+    run_and_write,
+)
+from .context import context
+from .graph_cache import load_graph
+from .lazy import lazy_import
+from .mincut import MincutEngine, ViecutIo
+from .mincut_requirement import MincutRequirement
+from .profiling import profiler
+from .scheduler import SchedulerPolicy
+
+structlog = lazy_import("structlog")
+
+
+def combination_name(
+    clusterer_spec: ClustererSpec, parameter: float, threshold: str
+) -> str:
+    """The suffix of the outputs of one combination, such as `_g0.1_t1log10`"""
+    if clusterer_spec == ClustererSpec.leiden:
+        return f"_g{parameter:g}_t{threshold}"
+    if clusterer_spec == ClustererSpec.ikc:
+        return f"_k{parameter:g}_t{threshold}"
+    return f"_t{threshold}"
+
+
+def main(
+    input: str = typer.Option(..., "--input", "-i"),
+    working_dir: Optional[str] = typer.Option("", "--working-dir", "-d"),
+    clusterer_spec: ClustererSpec = typer.Option(..., "--clusterer", "-c"),
+    existing_clustering: Optional[str] = typer.Option(
+        "", "--existing-clustering", "-e"
+    ),
+    ks: List[int] = typer.Option([], "--k", "-k"),
+    resolutions: List[float] = typer.Option([], "--resolution", "-g"),
+    thresholds: List[str] = typer.Option(..., "--threshold", "-t"),
+    output: str = typer.Option(..., "--output", "-o"),
+    ignore_trees: bool = typer.Option(False, "--ignore-trees", "-x"),
+    ignore_smaller_than: int = typer.Option(0, "--ignore-smaller-than", "-s"),
+    workers: int = typer.Option(1, "--workers", "-w"),
+    mincut_engine: MincutEngine = typer.Option(MincutEngine.viecut, "--mincut-engine"),
+    ikc_engine: IkcEngine = typer.Option(IkcEngine.subprocess, "--ikc-engine"),
+    graph_cache: bool = typer.Option(True, "--graph-cache/--no-graph-cache"),
+    stream_output: bool = typer.Option(False, "--stream-output"),
+    emit_universal: bool = typer.Option(False, "--emit-universal"),
+    connectivity_certificate: bool = typer.Option(
+        False, "--connectivity-certificate/--exact-connectivity"
+    ),
+    result_cache_mb: int = typer.Option(0, "--result-cache-mb"),
+    leiden_warm_start: bool = typer.Option(False, "--leiden-warm-start"),
+    viecut_io: ViecutIo = typer.Option(ViecutIo.file, "--viecut-io"),
+    max_workdir_bytes: int = typer.Option(0, "--max-workdir-bytes"),
+    profile: bool = typer.Option(False, "--profile"),
+    profile_python: bool = typer.Option(False, "--profile-python"),
+    scheduler: SchedulerPolicy = typer.Option(SchedulerPolicy.lifo, "--scheduler"),
+    memory_budget_mb: int = typer.Option(0, "--memory-budget"),
+):
+    """Run CM for every combination of the given thresholds (-t) and resolutions (-g) or k's (-k),
+    writing the outputs of each to OUTPUT_PREFIX followed by the combination, e.g., `out_g0.1_t1log10`
+    """
+    # pickling the tree into checkpoints recurses along the depth of the tree
+    sys.setrecursionlimit(1231231234)
+    log = structlog.get_logger()
+    assert workers >= 1, "Number of workers must be positive"
+    if clusterer_spec == ClustererSpec.leiden:
+        parameters: List[float] = list(resolutions)
+        assert parameters, "Leiden requires at least one resolution"
+    elif clusterer_spec == ClustererSpec.ikc:
+        parameters = [float(k) for k in ks]
+        assert parameters, "IKC requires at least one k"
+    else:
+        parameters = [-1]
+    thresholds = [t.replace(" ", "") for t in thresholds]
+    requirements = [MincutRequirement.try_from_str(t) for t in thresholds]
+    filterer = ClusterIgnoreFilter(ignore_trees, ignore_smaller_than)
+    base_working_dir = working_dir if working_dir else input + "_working_dir"
+    context.with_working_dir(base_working_dir)
+    context.with_mincut_engine(mincut_engine)
+    context.with_viecut_io(viecut_io)
+    context.with_max_workdir_bytes(max_workdir_bytes)
+    context.with_connectivity_certificate(connectivity_certificate)
+    context.with_result_cache(result_cache_mb << 20)
+    context.working_dir
+    # opened in the base working directory, and kept across the combinations
+    context.result_cache
+    log.info(
+        "starting sweep",
+        input=input,
+        working_dir=base_working_dir,
+        parameters=parameters,
+        thresholds=thresholds,
+    )
+    if profile or profile_python:
+        # one profile for the whole sweep, since its stages are shared by the combinations
+        profiler.enable(output + PROFILE_SUFFIX, profile_python)
+    try:
+        with profiler.stage("load_graph"):
+            root_graph = load_graph(input, graph_cache)
+        for parameter in dict.fromkeys(parameters):
+            clusterer = make_clusterer(
+                clusterer_spec,
+                int(parameter) if clusterer_spec == ClustererSpec.ikc else -1,
+                parameter if clusterer_spec == ClustererSpec.leiden else -1,
+                ikc_engine,
+                leiden_warm_start,
+            )
+            # the first round only depends on the clusterer, so it is shared by all thresholds
+            clusters = first_round(root_graph, clusterer, existing_clustering)
+            for threshold, requirement in dict(zip(thresholds, requirements)).items():
+                name = combination_name(clusterer_spec, parameter, threshold)
+                context.with_working_dir(
+                    os.path.join(base_working_dir, name.lstrip("_"))
+                )
+                log.info(
+                    "running combination", clusterer=clusterer, requirement=requirement
+                )
+                run_and_write(
+                    root_graph,
+                    clusters,
+                    clusterer,
+                    requirement,
+                    filterer,
+                    workers,
+                    output + name,
+                    stream_output,
+                    scheduler,
+                    memory_budget_mb << 20,
+                    emit_universal,
+                )
+    finally:
+        profiler.finish()
+
+
+def entry_point():
+    typer.run(main)
+
+
+if __name__ == "__main__":
+    entry_point()
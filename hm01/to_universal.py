@@ -1,36 +1,38 @@
 from __future__ import annotations
 from dataclasses import dataclass, asdict
+import math
 import os
-from typing import List, Optional, Sequence, Union, cast
-import typing
+from typing import List, Optional, Sequence, Tuple, Union
 import typer
-import jsonpickle
-import treeswift as ts
-import numpy as np
-import pandas as pd
 import json
-from structlog import get_logger
-import sys
 
 from hm01.graph import Graph, IntangibleSubgraph
-from hm01.cm import ClusterTreeNode
+from .history import HistoryTree
 from .clusterers.leiden_wrapper import LeidenClusterer
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+structlog = lazy_import("structlog")
 
 
 class ClusteringMetadata:
     """Metadata about a clustering as recorded in a tree."""
 
-    def __init__(self, tree: ts.Tree):
+    def __init__(self, tree: HistoryTree):
         self.tree = tree
-        self.lookup = {}
-        for n in tree.traverse_postorder():
-            self.lookup[n.label] = cast(ClusterTreeNode, n)
+        self.leaves = np.flatnonzero(tree.is_leaf)
+
+    def find_info(self, graph: Union[Graph, IntangibleSubgraph]) -> Optional[int]:
+        """Find the index of the tree node of the graph"""
+        return self.tree.index_of.get(graph.index)
 
-    def find_info(
-        self, graph: Union[Graph, IntangibleSubgraph]
-    ) -> Optional[ClusterTreeNode]:
-        """Find the info for the graph"""
-        return self.lookup.get(graph.index)
+    def descendant_leaves(self, i: int) -> List[str]:
+        """Labels of the leaves below tree node `i`, excluding itself"""
+        lo, hi = np.searchsorted(self.leaves, [i, self.tree.subtree_end[i]])
+        # listed last leaf first, like the traversal of treeswift
+        return [
+            self.tree.labels[j] for j in self.leaves[lo:hi][::-1].tolist() if j != i
+        ]
 
 
 def summary_list(list: Sequence[Union[int, float]]) -> str:
@@ -43,6 +45,14 @@ def read_clusters_from_leiden(filepath: str) -> List[IntangibleSubgraph]:
     return clusterer.from_existing_clustering(filepath)
 
 
+def read_labels(filepath: str) -> Tuple[np.ndarray, List[str]]:
+    """The node ids and the cluster labels of the lines of a labels file, in file order
+    """
+    with open(filepath, "r") as f:
+        tokens = f.read().split()
+    return np.array(tokens[0::2], dtype=np.int64), tokens[1::2]
+
+
 @dataclass
 class ClusteringSkeleton:
     label: str
@@ -52,31 +62,27 @@ class ClusteringSkeleton:
     extant: bool
 
     @staticmethod
-    def from_graphs(
-        global_graph: Graph,
-        graphs: List[IntangibleSubgraph],
-        metadata: ClusteringMetadata,
-    ) -> List[ClusteringSkeleton]:
-        ans = []
-        for g in graphs:
-            info = metadata.find_info(g)
-            assert info
-            info = cast(ClusterTreeNode, info)
-            descendants = []
-            for n in info.traverse_leaves():
-                if n.label != g.index:
-                    descendants.append(n.label)
-            ans.append(
-                ClusteringSkeleton(
-                    g.index,
-                    list(g.subset),
-                    (info.cut_size or 1) if info else 1,
-                    descendants,
-                    info.extant,
-                )
-            )
-        ans.sort(key=lambda x: (len(x.descendants), len(x.nodes)), reverse=True)
-        return ans
+    def from_tree_node(
+        metadata: ClusteringMetadata, i: int, nodes: List[int]
+    ) -> ClusteringSkeleton:
+        tree = metadata.tree
+        cut_size = int(tree.cut_size[i])
+        if cut_size < 0 and tree.certified[i]:
+            # a certificate only proves the connectivity exceeds the threshold
+            cut_size = math.floor(tree.validity_threshold[i]) + 1
+        return ClusteringSkeleton(
+            tree.labels[i],
+            nodes,
+            cut_size if cut_size > 0 else 1,
+            metadata.descendant_leaves(i),
+            bool(tree.extant[i]),
+        )
+
+    @staticmethod
+    def sorted(skeletons: List[ClusteringSkeleton]) -> List[ClusteringSkeleton]:
+        return sorted(
+            skeletons, key=lambda x: (len(x.descendants), len(x.nodes)), reverse=True
+        )
 
     @staticmethod
     def write_ndjson(graphs: List[ClusteringSkeleton], filepath: str):
@@ -91,47 +97,72 @@ class ClusteringSkeleton:
                 f.write(json.dumps(d) + "\n")
 
 
+def universal_clusterings(
+    tree: HistoryTree, nodes: Sequence[int], labels: Sequence[str]
+) -> Tuple[List[ClusteringSkeleton], List[ClusteringSkeleton]]:
+    """The clusters before and after CM, from the final `labels` of `nodes`
+
+    The clusters before CM are the first-round clusters, i.e., the children of the root,
+    and the clusters after CM the extant leaves. As in the labels, a node listed more than
+    once is in every cluster after CM it is listed under, as often as it is listed; the
+    clusters before CM are sets.
+    """
+    metadata = ClusteringMetadata(tree)
+    index_of = tree.index_of
+    owners = np.fromiter(
+        (index_of[label] for label in labels), dtype=np.int64, count=len(labels)
+    )
+    nodes = np.asarray(nodes, dtype=np.int64)
+    # grouping the nodes by their tree node in one sort; since subtrees are contiguous in
+    # the tree, the nodes of every subtree are then a contiguous range too
+    order = np.argsort(owners, kind="stable")
+    nodes, owners = nodes[order], owners[order]
+    bounds = np.searchsorted(owners, np.arange(len(tree) + 1))
+    before = [
+        ClusteringSkeleton.from_tree_node(
+            metadata,
+            i,
+            np.unique(nodes[bounds[i] : bounds[tree.subtree_end[i]]]).tolist(),
+        )
+        for i in tree.children(0).tolist()
+    ]
+    after = [
+        ClusteringSkeleton.from_tree_node(
+            metadata, i, nodes[bounds[i] : bounds[i + 1]].tolist()
+        )
+        for i in np.flatnonzero(tree.is_leaf & tree.extant)[::-1].tolist()
+    ]
+    return ClusteringSkeleton.sorted(before), ClusteringSkeleton.sorted(after)
+
+
+def write_universal(
+    tree: HistoryTree, nodes: Sequence[int], labels: Sequence[str], output: str
+):
+    """Write the clusters before and after CM to `output.before.json` and `output.after.json`
+    """
+    before, after = universal_clusterings(tree, nodes, labels)
+    ClusteringSkeleton.write_ndjson(before, output + ".before.json")
+    ClusteringSkeleton.write_ndjson(after, output + ".after.json")
+
+
 # TODO: arguments below should eventually be converted to Path types
 def main(
     input: str = typer.Option(..., "--input", "-i"),
-    graph_path: str = typer.Option(..., "--graph", "-g"),
+    graph_path: str = typer.Option("", "--graph", "-g"),
     output: str = typer.Option(..., "--output_prefix", "-o"),
+    graph_cache: bool = typer.Option(True, "--graph-cache/--no-graph-cache"),
 ):
-    """Compute two sets of statistics for a hiearchical clustering"""
-    sys.setrecursionlimit(1231231234)
-    log = get_logger()
+    """Compute two sets of statistics for a hiearchical clustering
+
+    Everything is read from the labels and the tree of INPUT; the graph is not needed, and
+    `--graph` and `--graph-cache` are only kept so that existing invocations still work.
+    """
+    log = structlog.get_logger()
     assert os.path.exists(input)
-    treepath = input + ".tree.json"
-    assert os.path.exists(treepath)
-    assert os.path.exists(graph_path)
-    graph = Graph.from_edgelist(graph_path)
-    log.info("loaded graph", graph_n=graph.n(), graph_m=graph.m())
-    with open(treepath, "r") as f:
-        tree: ts.Tree = typing.cast(ts.Tree, jsonpickle.decode(f.read()))
-    for n in tree.traverse_postorder():
-        n.nodes = []
-    metadata = ClusteringMetadata(tree)
-    node2cid = {}
-    with open(input, "r") as f:
-        for l in f:
-            node, cid = l.strip().split()
-            node2cid[int(node)] = cid
-            metadata.lookup[cid].nodes.append(int(node))
-    log.info("loaded clustering")
-    for c in tree.root.children:
-        c.nodes = list(set.union(*[set(n.nodes) for n in c.traverse_postorder()]))
-    original_clusters = [
-        IntangibleSubgraph(n.nodes, n.label) for n in tree.root.children
-    ]
-    extant_clusters = [
-        IntangibleSubgraph(n.nodes, n.label) for n in tree.traverse_leaves() if n.extant
-    ]
-    original_skeletons = ClusteringSkeleton.from_graphs(
-        graph, original_clusters, metadata
-    )
-    extant_skeletons = ClusteringSkeleton.from_graphs(graph, extant_clusters, metadata)
-    ClusteringSkeleton.write_ndjson(original_skeletons, output + ".before.json")
-    ClusteringSkeleton.write_ndjson(extant_skeletons, output + ".after.json")
+    tree = HistoryTree.load_for_output(input)
+    nodes, labels = read_labels(input)
+    log.info("loaded clustering", num_nodes=len(nodes))
+    write_universal(tree, nodes, labels, output)
 
 
 def entry_point():
@@ -2,4 +2,16 @@ import pytest
 from hm01.context import context as _context
 @pytest.fixture
 def context():
-    return _context.with_working_dir("tests/hm01_working_dir").as_transient()
\ No newline at end of file
+    context = _context.with_working_dir("tests/hm01_working_dir").as_transient()
+    # created once per session, so that the state restored below still has it
+    context.working_dir
+    saved = dict(context.__dict__)
+    saved["_artifact_scopes"] = list(context._artifact_scopes)
+    yield context
+    # tests reconfigure the singleton freely; put its state back exactly
+    context.__dict__.clear()
+    context.__dict__.update(saved)
+
+@pytest.fixture
+def native_mincut(context):
+    yield context.with_mincut_engine("native")
@@ -0,0 +1,23 @@
+import numpy as np
+
+from benchmarks.generators import Generator, GraphSpec
+from benchmarks.suite import compare, measure
+
+
+def test_planted_partition_is_simple():
+    edges, membership = GraphSpec(Generator.sbm, 2000, degree=10, seed=1).generate()
+    assert len(membership) == 2000
+    assert (edges[:, 0] < edges[:, 1]).all()
+    assert len(np.unique(edges, axis=0)) == len(edges)
+    # most edges stay within their planted community
+    internal = membership[edges[:, 0]] == membership[edges[:, 1]]
+    assert 0.7 < internal.mean() < 0.9
+
+
+def test_measure_and_compare():
+    measurement = measure(lambda: np.ones(1 << 23).sum())
+    assert measurement.seconds > 0
+    assert measurement.peak_mb > 32
+    results = {"ones": {"seconds": 2.0, "peak_mb": 100.0}}
+    assert compare(results, {"ones": {"seconds": 1.9, "peak_mb": 100.0}}, 1.25, 16) == []
+    assert len(compare(results, {"ones": {"seconds": 1.0, "peak_mb": 10.0}}, 1.25, 16)) == 2
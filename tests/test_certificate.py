@@ -0,0 +1,38 @@
+import networkit as nk
+from hm01.certificate import certify_connectivity
+from hm01.cm import MincutRequirement, algorithm_g
+from hm01.graph import Graph
+from hm01.clusterers.leiden_wrapper import LeidenClusterer
+from hm01.mincut import native
+
+def test_certificate_sound():
+    num_certified = 0
+    for i in range(200):
+        graph = Graph.from_erdos_renyi(5 + i % 30, 0.1 + (i % 9) / 10)
+        connectivity = native(graph).cut_size
+        for threshold in [0, connectivity - 1.5, connectivity - 1, connectivity, connectivity + 0.5]:
+            certificate = certify_connectivity(graph.to_realized_subgraph(), threshold)
+            if certificate is None:
+                continue
+            num_certified += 1
+            assert connectivity > threshold
+            assert threshold < certificate.connectivity <= connectivity
+            if certificate.exact:
+                assert certificate.connectivity == connectivity
+    assert num_certified > 0
+
+def test_certificate_keeps_same_clusters(native_mincut):
+    nk.setSeed(42, False)
+    graph = Graph(nk.generators.ClusteredRandomGraphGenerator(200, 8, 0.3, 0.01).generate(), "")
+    clusterer = LeidenClusterer(0.1, seed=42)
+    requirement = MincutRequirement.try_from_str("1log10")
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    exact_ans, exact_labels, _ = algorithm_g(graph, list(clusters), clusterer, requirement)
+    native_mincut.with_connectivity_certificate(True)
+    try:
+        ans, labels, tree = algorithm_g(graph, list(clusters), clusterer, requirement)
+    finally:
+        native_mincut.with_connectivity_certificate(False)
+    assert [c.index for c in ans] == [c.index for c in exact_ans]
+    assert labels == exact_labels
+    assert any(n.certified for n in tree.traverse_preorder())
@@ -1,7 +1,11 @@
+import networkit as nk
+import pytest
+from hm01 import cm
 from hm01.graph import Graph
-from hm01.cm import MincutRequirement, algorithm_g
+from hm01.cm import Checkpoint, ClusterIgnoreFilter, MincutRequirement, algorithm_g, run_and_write
 from hm01.clusterers.ikc_wrapper import IkcClusterer
 from hm01.clusterers.leiden_wrapper import LeidenClusterer
+from hm01.streaming import StreamingOutput, read_tree_ndjson
 
 def test_mincut_requirement_parsing():
     assert MincutRequirement(1,0,0,0) == MincutRequirement.try_from_str("1log10")
@@ -38,4 +42,153 @@ def test_concrete_graph_same(context):
             concrete_sg.remove_node(i)
         assert sg.m() == concrete_sg.m()
         assert sg.n() == concrete_sg.n()
-        assert sg.find_mincut().cut_size == concrete_sg.find_mincut().cut_size
\ No newline at end of file
+        assert sg.find_mincut().cut_size == concrete_sg.find_mincut().cut_size
+
+def test_parallel_algorithm_g_same_as_serial(native_mincut):
+    graph = Graph.from_erdos_renyi(100, 0.3)
+    clusterer = LeidenClusterer(0.1, seed=42)
+    requirement = MincutRequirement.try_from_str("1log10+1")
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    results = [
+        algorithm_g(graph, list(clusters), clusterer, requirement, None, workers=workers)
+        for workers in [1, 3]
+    ]
+    (serial_ans, serial_labels, serial_tree), (ans, labels, tree) = results
+    assert [c.index for c in ans] == [c.index for c in serial_ans]
+    assert list(labels.items()) == list(serial_labels.items())
+    assert [
+        (n.label, n.num_nodes, getattr(n, "cut_size", None), n.extant)
+        for n in tree.traverse_preorder()
+    ] == [
+        (n.label, n.num_nodes, getattr(n, "cut_size", None), n.extant)
+        for n in serial_tree.traverse_preorder()
+    ]
+
+
+class InterruptingFilter(ClusterIgnoreFilter):
+    """Lets `budget` clusters through, then interrupts the run like a crash would"""
+
+    def __init__(self, budget):
+        super().__init__(False, 0)
+        self.budget = budget
+
+    def __call__(self, cluster, global_graph):
+        if self.budget == 0:
+            raise KeyboardInterrupt
+        self.budget -= 1
+        return super().__call__(cluster, global_graph)
+
+
+def test_resume_from_journal(native_mincut, monkeypatch):
+    nk.setSeed(42, False)
+    graph = Graph(nk.generators.ClusteredRandomGraphGenerator(200, 8, 0.3, 0.01).generate(), "")
+    clusterer = LeidenClusterer(0.1, seed=42)
+    requirement = MincutRequirement.try_from_str("5log10")
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    ans, labels, tree = algorithm_g(graph, list(clusters), clusterer, requirement)
+    assert Checkpoint.load() is None
+    monkeypatch.setattr(cm, "COMPACTION_MIN_BYTES", 0)
+    # resume from journals, and with a ratio of 0 from snapshots compacted after every record
+    for budget, ratio in [(0, 1.0), (3, 1.0), (7, 1.0), (7, 0)]:
+        monkeypatch.setattr(cm, "COMPACTION_RATIO", ratio)
+        with pytest.raises(KeyboardInterrupt):
+            algorithm_g(
+                graph, list(clusters), clusterer, requirement, None, InterruptingFilter(budget)
+            )
+        checkpoint = Checkpoint.load()
+        assert checkpoint is not None
+        resumed_ans, resumed_labels, resumed_tree = algorithm_g(
+            graph, list(clusters), clusterer, requirement, checkpoint
+        )
+        assert Checkpoint.load() is None
+        assert [c.index for c in resumed_ans] == [c.index for c in ans]
+        assert list(resumed_labels.items()) == list(labels.items())
+        assert [
+            (n.label, n.num_nodes, getattr(n, "cut_size", None), n.extant)
+            for n in resumed_tree.traverse_preorder()
+        ] == [
+            (n.label, n.num_nodes, getattr(n, "cut_size", None), n.extant)
+            for n in tree.traverse_preorder()
+        ]
+
+
+def tree_summary(tree):
+    return [
+        (
+            n.label,
+            n.parent.label if n.parent is not None else None,
+            n.num_nodes,
+            getattr(n, "cut_size", None),
+            getattr(n, "validity_threshold", None),
+            n.extant,
+        )
+        for n in tree.traverse_preorder()
+    ]
+
+
+def read_labels(path):
+    with open(path) as f:
+        return dict(line.split() for line in f)
+
+
+def test_streaming_output_same_as_in_memory(native_mincut, monkeypatch, tmp_path):
+    nk.setSeed(42, False)
+    graph = Graph(nk.generators.ClusteredRandomGraphGenerator(200, 8, 0.3, 0.01).generate(), "")
+    clusterer = LeidenClusterer(0.1, seed=42)
+    requirement = MincutRequirement.try_from_str("5log10")
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    _, labels, tree = algorithm_g(graph, list(clusters), clusterer, requirement)
+    labels = {str(n): cid for n, cid in labels.items()}
+    monkeypatch.setattr(cm, "COMPACTION_MIN_BYTES", 0)
+    for budget in [None, 0, 5]:
+        prefix = str(tmp_path / f"output{budget}")
+        output = StreamingOutput(prefix, prefix + ".tree.ndjson")
+        if budget is None:
+            _, pending, _ = algorithm_g(
+                graph, list(clusters), clusterer, requirement, None, workers=1, output=output
+            )
+            assert not pending
+        else:
+            with pytest.raises(KeyboardInterrupt):
+                algorithm_g(
+                    graph, list(clusters), clusterer, requirement, None,
+                    InterruptingFilter(budget), output=output,
+                )
+            algorithm_g(graph, list(clusters), clusterer, requirement, Checkpoint.load())
+        assert read_labels(prefix) == labels
+        assert tree_summary(read_tree_ndjson(prefix + ".tree.ndjson")) == tree_summary(tree)
+
+def test_checkpoint_kept_until_output_written(native_mincut, monkeypatch, tmp_path):
+    nk.setSeed(42, False)
+    graph = Graph(nk.generators.ClusteredRandomGraphGenerator(200, 8, 0.3, 0.01).generate(), "")
+    clusterer = LeidenClusterer(0.1, seed=42)
+    requirement = MincutRequirement.try_from_str("5log10")
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    _, labels, _ = algorithm_g(graph, list(clusters), clusterer, requirement)
+    output = str(tmp_path / "output")
+    args = (graph, clusters, clusterer, requirement, ClusterIgnoreFilter.default(), 1, output, False)
+
+    def full_disk(self, path):
+        raise OSError("No space left on device")
+
+    with monkeypatch.context() as m:
+        m.setattr(cm.HistoryTree, "save", full_disk)
+        with pytest.raises(OSError):
+            run_and_write(*args)
+    assert Checkpoint.load() is not None
+    # the rerun resumes from the finished checkpoint instead of starting over
+    monkeypatch.setattr(cm, "process_cluster", None)
+    run_and_write(*args)
+    assert Checkpoint.load() is None
+    assert read_labels(output) == {str(n): cid for n, cid in labels.items()}
+
+def test_disconnected_cluster_is_split(context):
+    graph = Graph(nk.graphio.readGraph("data/two_k5s.edge_list", nk.Format.EdgeListTabZero), "")
+    cluster = graph.intangible_subgraph(list(range(10)), "0")
+    result = cm.process_cluster(
+        cluster, graph, LeidenClusterer(0.1), MincutRequirement.most_stringent(), ClusterIgnoreFilter.default()
+    )
+    assert result.cut_size == 0
+    assert result.sides is not None
+    assert {frozenset(side.subset) for side in result.sides} == {frozenset(range(5)), frozenset(range(5, 10))}
+    assert not result.extant
@@ -0,0 +1,80 @@
+import json
+
+import networkit as nk
+import pytest
+
+from hm01.compare import changed_clusters, main
+from hm01.graph import Graph
+
+
+def naive_metrics(graph, members):
+    """The metrics as computed by the former analysis script, neighbor by neighbor"""
+    g = graph._data
+    total_edges = g.numberOfEdges()
+    internal = [sum(v in members for v in g.iterNeighbors(u)) for u in members]
+    volume = sum(g.degree(u) for u in members)
+    num_edges = sum(internal) // 2
+    denominator = min(volume, 2 * total_edges - volume)
+    return {
+        "num_edges": num_edges,
+        "modularity": num_edges / total_edges - (volume / (2 * total_edges)) ** 2,
+        "mcd": min(internal),
+        "conductance": (volume - 2 * num_edges) / denominator if denominator else None,
+    }
+
+
+def test_changed_clusters():
+    initial = {"1": [0, 1, 2, 3], "2": [4, 5], "12": [6, 7]}
+    final = {"1a": [0, 1], "1b": [2, 3], "2": [4, 5], "12a": [6, 7]}
+    assert changed_clusters(initial, final) == {"1a": "1", "1b": "1", "12a": "12"}
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_compare_same_as_naive(tmp_path, workers):
+    nk.setSeed(42, False)
+    generator = nk.generators.ClusteredRandomGraphGenerator(400, 8, 0.3, 0.01)
+    graph = Graph(generator.generate(), "")
+    network = str(tmp_path / "graph.tsv")
+    with open(network, "w") as f:
+        for u, v in graph._data.iterEdges():
+            f.write(f"{u}\t{v}\n")
+    communities = generator.getCommunities().getVector()
+    initial, final = str(tmp_path / "initial.txt"), str(tmp_path / "final.txt")
+    # every other community is split in halves by parity
+    with open(initial, "w") as f, open(final, "w") as g:
+        for u, c in enumerate(communities):
+            f.write(f"{c} {u}\n")
+            g.write(f"{u} {c}{'ab'[u % 2] if c % 2 else ''}\n")
+    markers = str(tmp_path / "markers.csv")
+    with open(markers, "w") as f:
+        f.write("doi,integer_id,pub_id\n")
+        for u in range(0, 400, 7):
+            f.write(f"10.1/{u},{u},{u}\n")
+    output = str(tmp_path / "compare.json")
+    main(
+        initial_clustering=initial, final_clustering=final, input_network=network,
+        output_file=output, marker_nodes_file=markers, initial_order="cluster_node",
+        final_order="node_cluster", workers=workers, graph_cache=False,
+    )
+    with open(output) as f:
+        rows = [json.loads(line) for line in f]
+    originals = [r for r in rows if r["original"] is None]
+    assert sorted(r["label"] for r in originals) == [str(c) for c in range(1, 8, 2)]
+    assert len(rows) == len(originals) * 3
+    for row in rows:
+        if row["original"] is None:
+            members = {u for u, c in enumerate(communities) if str(c) == row["label"]}
+        else:
+            assert row["label"][:-1] == row["original"]
+            parity = "ab".index(row["label"][-1])
+            members = {
+                u for u, c in enumerate(communities)
+                if str(c) == row["original"] and u % 2 == parity
+            }
+        assert row["num_nodes"] == len(members)
+        assert row["marker_nodes"] == sum(u % 7 == 0 for u in members)
+        expected = naive_metrics(graph, members)
+        assert row["num_edges"] == expected["num_edges"]
+        assert row["mcd"] == expected["mcd"]
+        assert row["modularity"] == pytest.approx(expected["modularity"])
+        assert row["conductance"] == pytest.approx(expected["conductance"])
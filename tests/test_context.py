@@ -1,6 +1,45 @@
-from hm01.context import context
+import os
+
+import pytest
+
+from hm01.context import WorkdirBudgetExceeded, context
+from hm01.graph import Graph
 
 def test_context_usable():
     assert context.config is not None
     assert context.ikc_path is not None
-    assert context.leiden_path is not None
\ No newline at end of file
+    assert context.leiden_path is not None
+
+def test_scoped_artifacts_removed(context):
+    graph = Graph.from_edges([(0, 1), (1, 2)], "a")
+    with context.scoped_artifacts():
+        path = context.request_graph_related_path(graph, "metis")
+        with open(path, "w") as f:
+            f.write("x")
+    assert not os.path.exists(path)
+    # the full digest keeps indices with a common prefix apart
+    other = Graph.from_edges([(0, 1)], "a0")
+    assert context.request_graph_related_path(other, "metis") != path
+
+
+def test_workdir_budget_exceeded(context):
+    context.with_max_workdir_bytes(1)
+    with pytest.raises(WorkdirBudgetExceeded):
+        context.enforce_workdir_budget(16)
+    # not measured again until the interval has passed
+    context.enforce_workdir_budget(16)
+    context.with_max_workdir_bytes(1 << 20)
+    context.enforce_workdir_budget(16)
+
+
+def test_workdir_budget_shrinks_cache(context, tmp_path):
+    context.with_working_dir(str(tmp_path / "working_dir"))
+    context.with_result_cache(1 << 20).with_max_workdir_bytes(1 << 20)
+    cache = context.result_cache
+    for key in range(8):
+        cache.put(str(key), os.urandom(1 << 16))
+    used = cache.file_bytes()
+    context.with_max_workdir_bytes(used // 2)
+    context.enforce_workdir_budget(0)
+    assert cache.file_bytes() <= used // 2
+    assert 0 < len(cache) < 8
@@ -0,0 +1,30 @@
+import os
+import shutil
+import numpy as np
+from hm01.graph_cache import load_graph, load_sidecar, sidecar_path
+
+def test_sidecar_roundtrip(tmp_path):
+    path = str(tmp_path / "graph.tsv")
+    shutil.copy("data/two_k5s_non_continuous.edge_list", path)
+    assert load_sidecar(path) is None
+    parsed = load_graph(path)
+    assert os.path.isdir(sidecar_path(path))
+    cached = load_sidecar(path)
+    assert cached is not None
+    assert (cached.n(), cached.m()) == (parsed.n(), parsed.m())
+    assert list(cached.hydrator) == list(parsed.hydrator)
+    for u in parsed.nodes():
+        assert list(cached.neighbors(u)) == list(parsed.neighbors(u))
+    for a, b in zip(cached.csr, parsed.csr):
+        assert np.array_equal(a, b)
+    assert load_graph(path, use_cache=False).m() == parsed.m()
+
+def test_stale_sidecar_rebuilt(tmp_path):
+    path = str(tmp_path / "graph.tsv")
+    shutil.copy("data/two_k5s.edge_list", path)
+    assert load_graph(path).m() == 20
+    with open(path, "a") as f:
+        f.write("0\t9\n")
+    assert load_sidecar(path) is None
+    assert load_graph(path).m() == 21
+    assert load_sidecar(path).m() == 21
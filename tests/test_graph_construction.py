@@ -43,4 +43,11 @@ def test_graph_not_tree_like(context):
     g = Graph.from_clique(10)
     clus = g.intangible_subgraph([0, 1, 2, 3, 4], "test")
     assert not clus.is_tree_like(g)
-    assert g.intangible_subgraph([0,1], "test").is_tree_like(g)
\ No newline at end of file
+    assert g.intangible_subgraph([0,1], "test").is_tree_like(g)
+def test_compact_edges_same_as_edgelist(context):
+    graph = Graph.from_erdos_renyi(50, 0.2)
+    for g in [graph, graph.intangible_subgraph(list(range(10, 40)), "a").realize(graph)]:
+        src, dst = g.compact_edge_arrays()
+        with open(g.as_compact_edgelist_filepath()) as f:
+            edges = [tuple(map(int, l.split())) for l in f]
+        assert edges == list(zip(src.tolist(), dst.tolist()))
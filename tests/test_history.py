@@ -0,0 +1,66 @@
+import jsonpickle
+import networkit as nk
+import numpy as np
+import treeswift as ts
+from hm01.cm import MincutRequirement, algorithm_g
+from hm01.graph import Graph
+from hm01.clusterers.leiden_wrapper import LeidenClusterer
+from hm01.history import HistoryTree
+from hm01.streaming import StreamingOutput
+
+def assert_same_tree(a, b):
+    assert a.labels == b.labels
+    for column in ["parent", "num_nodes", "cut_size", "validity_threshold", "extant", "certified"]:
+        assert np.array_equal(getattr(a, column), getattr(b, column), equal_nan=True)
+
+def test_formats_agree(native_mincut, tmp_path):
+    nk.setSeed(42, False)
+    graph = Graph(nk.generators.ClusteredRandomGraphGenerator(200, 8, 0.3, 0.01).generate(), "")
+    clusterer = LeidenClusterer(0.1, seed=42)
+    requirement = MincutRequirement.try_from_str("5log10")
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    _, _, tree = algorithm_g(graph, list(clusters), clusterer, requirement)
+    history = HistoryTree.from_tree(tree)
+    assert len(history) == sum(1 for _ in tree.traverse_preorder())
+    assert history.labels[0] == "" and history.parent[0] == -1
+    assert (history.parent[1:] < np.arange(1, len(history))).all()
+    history.save(str(tmp_path / "out.tree.npz"))
+    assert_same_tree(HistoryTree.load_for_output(str(tmp_path / "out")), history)
+    with open(tmp_path / "legacy.tree.json", "w") as f:
+        f.write(jsonpickle.encode(tree))
+    assert_same_tree(HistoryTree.load_for_output(str(tmp_path / "legacy")), history)
+    prefix = str(tmp_path / "streamed")
+    algorithm_g(
+        graph, list(clusters), clusterer, requirement,
+        output=StreamingOutput(prefix, prefix + ".tree.ndjson"),
+    )
+    assert_same_tree(HistoryTree.load_for_output(prefix), history)
+
+def test_deep_tree():
+    tree = ts.Tree()
+    node = tree.root
+    node.label, node.num_nodes = "", 100000
+    for depth in range(100000):
+        child = ts.Node(label=str(depth))
+        child.num_nodes = 100000 - depth
+        child.extant = depth == 99999
+        node.add_child(child)
+        node = child
+    history = HistoryTree.from_tree(tree)
+    assert history.subtree_end[0] == len(history) == 100001
+    assert history.count_in_subtrees(history.is_leaf & history.extant)[0] == 1
+    assert history.children(0).tolist() == [1]
+
+
+def test_join_shards():
+    def tree(records):
+        labels, parents = zip(*records)
+        n = len(labels)
+        return HistoryTree.from_records(
+            list(labels), list(parents), [1] * n, [None] * n, [None] * n, [True] * n, [False] * n
+        )
+
+    whole = tree([("", -1), ("a", 0), ("aa", 1), ("aaa", 2), ("b", 0), ("c", 0), ("ca", 5)])
+    first = tree([("", -1), ("c", 0), ("ca", 1), ("a", 0), ("aa", 3), ("aaa", 4)])
+    second = tree([("", -1), ("b", 0)])
+    assert_same_tree(HistoryTree.join([first, second], ["a", "b", "c"]), whole)
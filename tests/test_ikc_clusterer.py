@@ -1,7 +1,7 @@
 import networkit as nk
 
 from hm01.graph import *
-from hm01.clusterers.ikc_wrapper import IkcClusterer
+from hm01.clusterers.ikc_wrapper import IkcClusterer, IkcEngine
 
 def test_basic_ikc_clustering_0(context):
     data = nk.readGraph("./data/two_k5s.edge_list", nk.Format.EdgeListTabZero)
@@ -25,3 +25,21 @@ def test_basic_ikc_clustering_1(context):
     assert len(cluster_id_arr) == 0
     assert graph_arr[0].n() == 5
     assert graph_arr[1].n() == 5
+
+def test_native_ikc_clustering(context):
+    data = nk.readGraph("./data/two_k5s.edge_list", nk.Format.EdgeListTabZero)
+    graph = Graph(data, "1b")
+    clusters = list(graph.find_clusters(IkcClusterer(4, IkcEngine.native)))
+    assert sorted(c.index for c in clusters) == ["1b1", "1b2"]
+    assert [c.n() for c in clusters] == [5, 5]
+    clusters = list(graph.find_clusters(IkcClusterer(5, IkcEngine.native)))
+    assert len(clusters) == 10
+    assert all(c.n() == 1 for c in clusters)
+
+def test_native_ikc_same_as_subprocess(context):
+    graph = Graph(nk.readGraph("./data/ring_four_k10s.edge_list", nk.Format.EdgeListSpaceZero), "r")
+    for g in [graph, graph.intangible_subgraph(list(range(5, 35)), "a").realize(graph)]:
+        for k in [1, 2, 3]:
+            expected = [(c.index, c.subset) for c in IkcClusterer(k).cluster(g)]
+            actual = [(c.index, c.subset) for c in IkcClusterer(k, IkcEngine.native).cluster(g)]
+            assert actual == expected
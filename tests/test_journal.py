@@ -0,0 +1,21 @@
+from hm01.journal import Journal
+
+def test_torn_record_is_cut_off(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = Journal(path)
+    for i in range(5):
+        journal.append(("cluster", i, list(range(i))))
+    journal.close()
+    size = (tmp_path / "journal").stat().st_size
+    with open(path, "ab") as f:
+        f.write(b"\x10\x00\x00\x00partial")
+    assert Journal.scan(path)[1] == size
+    assert Journal.recover(path) == [("cluster", i, list(range(i))) for i in range(5)]
+    assert (tmp_path / "journal").stat().st_size == size
+    journal = Journal(path)
+    journal.append("after recovery")
+    journal.close()
+    assert Journal.recover(path)[-1] == "after recovery"
+
+def test_missing_journal_is_empty(tmp_path):
+    assert Journal.recover(str(tmp_path / "missing")) == []
@@ -0,0 +1,23 @@
+import sys
+import types
+
+import pytest
+
+from benchmarks.startup import COMMANDS, eagerly_imported
+from hm01.lazy import lazy_import
+
+
+def test_lazy_import_executes_on_first_use():
+    sys.modules.pop("colorsys", None)
+    colorsys = lazy_import("colorsys")
+    assert type(colorsys) is not types.ModuleType
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert type(colorsys) is types.ModuleType
+    assert lazy_import("colorsys") is colorsys
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import("no_such_module")
+
+
+@pytest.mark.parametrize("module", list(COMMANDS.values()))
+def test_cli_startup_imports_no_heavy_modules(module):
+    assert eagerly_imported(module) == []
@@ -2,6 +2,7 @@ import networkit as nk
 
 from hm01.graph import *
 from hm01.clusterers.leiden_wrapper import LeidenClusterer
+import leidenalg as la
 
 # TODO: too much duplicate code
 def test_two_k5_two_clusters(context):
@@ -32,4 +33,32 @@ def test_two_k5_two_clusters_non_continuous(context):
 #     clusters = list(graph.find_clusters(clusterer))
 #     assert len(clusters) == 2
 #     assert [c.n() for c in clusters] == [5, 5]
-#     assert sorted([c.index for c in clusters]) == ["root1", "root2"]
\ No newline at end of file
+#     assert sorted([c.index for c in clusters]) == ["root1", "root2"]
+def test_igraph_conversion_same_edges():
+    graph = Graph.from_erdos_renyi(200, 0.05)
+    for u in range(0, 200, 7):
+        graph.remove_node(u)
+    compact_graph = nk.graphtools.getCompactedGraph(graph._data, nk.graphtools.getContinuousNodeIds(graph._data))
+    expected = sorted(tuple(sorted(e)) for e in compact_graph.iterEdges())
+    sg = graph.intangible_subgraph(list(range(50, 150)), "a").realize(graph)
+    sg.remove_node(60)
+    inv = sg.inv
+    sg_expected = sorted(tuple(sorted((inv[u], inv[v]))) for u in sg.nodes() for v in sg.neighbors(u) if u < v)
+    for g, edges in [(graph, expected), (sg, sg_expected)]:
+        converted = g.to_igraph()
+        assert converted.vcount() == g.n()
+        assert sorted(tuple(sorted(e)) for e in converted.get_edgelist()) == edges
+
+def test_warm_start_recluster(context, monkeypatch):
+    graph = Graph(nk.readGraph("./data/ring_two_k5s.edge_list", nk.Format.EdgeListTabZero), "root")
+    side = graph.intangible_subgraph(list(range(10)), "a").realize(graph)
+    initial_memberships = []
+    find_partition = la.find_partition
+    def recording_find_partition(*args, **kwargs):
+        initial_memberships.append(kwargs.get("initial_membership"))
+        return find_partition(*args, **kwargs)
+    monkeypatch.setattr(la, "find_partition", recording_find_partition)
+    cold = list(LeidenClusterer(0.5, seed=1).recluster(side))
+    warm = list(LeidenClusterer(0.5, seed=1, warm_start=True).recluster(side))
+    assert initial_memberships == [None, [0] * 10]
+    assert sorted(sorted(c.subset) for c in warm) == sorted(sorted(c.subset) for c in cold)
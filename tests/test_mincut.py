@@ -1,6 +1,9 @@
-from hm01.mincut import run_viecut_command
+import os
+import subprocess
+from hm01.mincut import component_labels, native, run_viecut_command, viecut
 from hm01.graph import Graph
 import networkit as nk
+import numpy as np
 GRAPH_RESULTS = [
     ("data/ring_four_k10s.edge_list", nk.Format.EdgeListSpaceZero, (20, 20, 2)),
     ("data/two_k5s.edge_list", nk.Format.EdgeListTabZero, (0, 0, 0)),
@@ -28,4 +31,90 @@ def test_cut_correctness(context):
     res = graph.find_mincut()
     assert res.cut_size == 2
     assert set(res.light_partition) == set([0,1,2,3,4])
-    assert set(res.heavy_partition) == set([5,6,7,8,9])
\ No newline at end of file
+    assert set(res.heavy_partition) == set([5,6,7,8,9])
+
+def test_native_engine(context):
+    for i, (graph_path, fmt, (light_size, heavy_size, cut_size)) in enumerate(GRAPH_RESULTS):
+        graph = Graph(nk.graphio.readGraph(graph_path, fmt), str(i))
+        res = native(graph)
+        assert res.cut_size == cut_size
+        assert len(res.light_partition) + len(res.heavy_partition) == light_size + heavy_size
+
+def test_native_cut_correctness(context):
+    graph = Graph(nk.graphio.readGraph("data/ring_two_k5s.edge_list", nk.Format.EdgeListTabZero), "test")
+    res = graph.intangible_subgraph(list(range(10)), "a").realize(graph)
+    res = native(res)
+    assert res.cut_size == 2
+    assert set(res.light_partition) | set(res.heavy_partition) == set(range(10))
+    assert {frozenset(res.light_partition), frozenset(res.heavy_partition)} == {frozenset(range(5)), frozenset(range(5, 10))}
+
+def test_native_cut_brute_force():
+    for _ in range(30):
+        graph = Graph.from_erdos_renyi(10, 0.5)
+        res = native(graph)
+        if res.cut_size == 0:
+            continue
+        edges = list(graph._data.iterEdges())
+        cut_sizes = [
+            sum(1 for u, v in edges if (mask >> u & 1) != (mask >> v & 1))
+            for mask in range(1, 2 ** 9)
+        ]
+        assert res.cut_size == min(cut_sizes)
+        light = set(res.light_partition)
+        assert sum(1 for u, v in edges if (u in light) != (v in light)) == res.cut_size
+
+def test_native_same_as_viecut(context):
+    for i in range(10):
+        graph = Graph.from_erdos_renyi(60, 0.1, str(i))
+        assert native(graph).cut_size == graph.find_mincut().cut_size
+
+def test_disconnected_cut_between_components(context, monkeypatch):
+    def no_viecut(*args, **kwargs):
+        raise AssertionError("viecut should not run on a disconnected graph")
+
+    monkeypatch.setattr("hm01.mincut.run_viecut_command", no_viecut)
+    graph = Graph(nk.graphio.readGraph("data/two_k5s.edge_list", nk.Format.EdgeListTabZero), "test")
+    edges = list(graph._data.iterEdges())
+    sg = graph.intangible_subgraph(list(range(10)), "a").realize(graph)
+    sg.remove_node(9)
+    res = sg.find_mincut()
+    assert res.cut_size == 0
+    assert set(res.light_partition) | set(res.heavy_partition) == set(range(9))
+    assert len(res.light_partition) == 4
+    light = set(res.light_partition)
+    assert not any((u in light) != (v in light) for u, v in edges if 9 not in (u, v))
+
+def test_component_labels_on_long_path():
+    # a path with shuffled ids, on which label propagation would take one round per node
+    order = np.random.RandomState(42).permutation(100000)
+    src, dst = order[:-1], order[1:]
+    labels = component_labels(100003, src, dst)
+    assert (labels[order] == 0).all()
+    assert labels[100000:].tolist() == [100000, 100001, 100002]
+
+def fake_viecut_run(cmd, capture_output, pass_fds):
+    """Stands in for the viecut binary, cutting the METIS graph at `cmd` with the native engine"""
+    output_path, metis_path = cmd[4], cmd[5]
+    graph = Graph.from_metis(metis_path)
+    res = native(graph)
+    light = set(res.light_partition)
+    with open(output_path, "w") as f:
+        for u in range(graph.n()):
+            f.write(f"{0 if u in light else 1}\n")
+    return subprocess.CompletedProcess(cmd, 0, f"cut={res.cut_size}\n".encode(), b"")
+
+def test_viecut_memfd_io(context, monkeypatch):
+    monkeypatch.setattr(subprocess, "run", fake_viecut_run)
+    graph = Graph(nk.graphio.readGraph("data/ring_two_k5s.edge_list", nk.Format.EdgeListTabZero), "test")
+    sg = graph.intangible_subgraph(list(range(10)), "a").realize(graph)
+    expected = viecut(sg)
+    context.with_viecut_io("memfd")
+    try:
+        files = set(os.listdir(context.working_dir))
+        res = viecut(sg)
+        assert set(os.listdir(context.working_dir)) == files
+    finally:
+        context.with_viecut_io("file")
+    assert res == expected
+    assert res.cut_size == 2
+    assert {frozenset(res.light_partition), frozenset(res.heavy_partition)} == {frozenset(range(5)), frozenset(range(5, 10))}
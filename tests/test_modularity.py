@@ -1,3 +1,6 @@
+import random
+
+import networkit as nk
 from hm01.graph import *
 
 def test_basic_modularity():
@@ -11,4 +14,26 @@ def test_basic_modularity():
     assert subset.internal_degree(0, graph) == 1
     assert subset.internal_degree(1, graph) == 2
     assert subset.count_mcd(graph) == 1
-    assert graph.modularity_of(subset) == m
\ No newline at end of file
+    assert graph.modularity_of(subset) == m
+
+def test_batched_metrics_same_as_naive():
+    nk.setSeed(42, False)
+    rng = random.Random(42)
+    graph = Graph.from_erdos_renyi(300, 0.05)
+    clusters = [rng.sample(range(300), rng.randint(1, 40)) for _ in range(30)]
+    clusters.append([])
+    for batch in [clusters, clusters[:10], [c for i, c in enumerate(clusters) if i % 7 == 0]]:
+        metrics = graph.cluster_metrics(batch)
+        for i, c in enumerate(batch):
+            members = set(c)
+            internal = [sum(1 for v in graph._data.iterNeighbors(u) if v in members) for u in c]
+            ls = sum(internal) // 2
+            ds = sum(graph._data.degree(u) for u in c)
+            assert metrics.num_nodes[i] == len(c)
+            assert metrics.num_edges[i] == ls
+            assert metrics.total_degree[i] == ds
+            assert metrics.mcd[i] == (min(internal) if c else 0)
+            assert metrics.modularity(graph.m())[i] == (ls / graph.m()) - (ds / (2 * graph.m())) ** 2
+            assert metrics.is_tree_like()[i] == (ls == len(c) - 1)
+            if c:
+                assert graph.internal_degrees(c, c).tolist() == internal
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from hm01.cm import MincutRequirement, algorithm_g
+from hm01.clusterers.leiden_wrapper import LeidenClusterer
+from hm01.graph import Graph
+from hm01.profiling import profiler, size_bucket
+
+
+@pytest.fixture
+def enabled_profiler(tmp_path):
+    profiler.enable(str(tmp_path / "run.profile.json"))
+    yield profiler
+    profiler.take()
+    profiler.enabled = False
+
+
+def test_size_bucket():
+    assert size_bucket(0) == "0"
+    assert size_bucket(1) == "1-1"
+    assert size_bucket(3) == "2-3"
+    assert size_bucket(1500) == "1024-2047"
+
+
+def test_profile_counts_workers(native_mincut, enabled_profiler):
+    graph = Graph.from_erdos_renyi(100, 0.3)
+    clusterer = LeidenClusterer(0.1, seed=42)
+    requirement = MincutRequirement.try_from_str("1log10+1")
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    summaries = []
+    for workers in [1, 3]:
+        algorithm_g(graph, list(clusters), clusterer, requirement, None, workers=workers)
+        enabled_profiler.write()
+        with open(enabled_profiler.path) as f:
+            summaries.append(json.load(f))
+        enabled_profiler.take()
+    serial, parallel = summaries
+    # the stages run in the workers are merged into the profile of the main process
+    assert serial["counters"] == parallel["counters"]
+    assert serial["counters"]["clusters"] > 0
+    for summary in summaries:
+        for stage in ["realize", "prune", "mincut", "checkpoint"]:
+            stats = summary["stages"][stage]
+            assert stats["count"] == sum(b["count"] for b in stats["by_size"].values())
+    assert (
+        serial["stages"]["mincut"]["count"] == parallel["stages"]["mincut"]["count"]
+    )
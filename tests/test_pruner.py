@@ -1,3 +1,4 @@
+import networkit as nk
 from hm01.graph import *
 from hm01.mincut_requirement import MincutRequirement
 from hm01.pruner import prune_graph
@@ -32,4 +33,31 @@ def test_pruning_more_complex():
         num_pruned = prune_graph(graph, requirement, clusterer)
         n_after = graph.n()
         assert num_pruned == n - 9
-        assert n_after == n_before - num_pruned
\ No newline at end of file
+        assert n_after == n_before - num_pruned
+
+def test_pruned_subgraph_is_valid():
+    graph = Graph(nk.generators.BarabasiAlbertGenerator(1, 200).generate(), "")
+    clusterer = IkcClusterer(2)
+    for requirement in ["1log10", "0.5mcd+1log10", "1k+1"]:
+        requirement = MincutRequirement.try_from_str(requirement)
+        subgraph = IntangibleSubgraph(list(graph.nodes()), "").realize(graph)
+        num_pruned = prune_graph(subgraph, requirement, clusterer)
+        assert num_pruned > 0
+        assert subgraph.n() == graph.n() - num_pruned
+        assert subgraph.m() == sum(subgraph.degree(u) for u in subgraph.nodes()) // 2
+        if subgraph.n() > 0:
+            assert subgraph.mcd() > requirement.validity_threshold(clusterer, subgraph)
+
+
+def test_remove_nodes_same_as_one_by_one():
+    graph = Graph(nk.generators.ErdosRenyiGenerator(60, 0.1).generate(), "")
+    nodes = list(graph.nodes())
+    at_once = IntangibleSubgraph(nodes, "").realize(graph)
+    one_by_one = IntangibleSubgraph(nodes, "").realize(graph)
+    at_once.remove_nodes(nodes[::3])
+    for u in nodes[::3]:
+        one_by_one.remove_node(u)
+    assert (at_once.n(), at_once.m()) == (one_by_one.n(), one_by_one.m())
+    for u in at_once.nodes():
+        assert at_once.degree(u) == one_by_one.degree(u)
+        assert list(at_once.neighbors(u)) == list(one_by_one.neighbors(u))
@@ -8,4 +8,21 @@ def test_conversion_works():
     sg.recompact()
     for k, v in sg.inv.items():
         assert sg.hydrator[v] == k
-    assert len(sg.hydrator) == len(sg.inv)
\ No newline at end of file
+    assert len(sg.hydrator) == len(sg.inv)
+
+def test_removal_consistent_with_induced_subgraph():
+    graph = Graph.from_erdos_renyi(60, 0.3)
+    sg = graph.intangible_subgraph(list(range(10, 50)), "a").realize(graph)
+    for u in range(20, 30):
+        sg.remove_node(u)
+    expected = graph.induced_subgraph([u for u in range(10, 50) if not 20 <= u < 30], "b")
+    assert sg.n() == expected.n()
+    assert sg.m() == expected.m()
+    assert sg.mcd() == expected.mcd()
+    assert sorted(sg.nodes()) == sorted(expected.nodes())
+    for u in sg.nodes():
+        assert sorted(sg.neighbors(u)) == sorted(expected.neighbors(u))
+    sg.recompact()
+    src, dst = sg.compact_edge_arrays()
+    assert len(src) == expected.m()
+    assert all(sg.hydrator[sg.inv[u]] == u for u in sg.nodes())
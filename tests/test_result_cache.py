@@ -0,0 +1,46 @@
+from hm01 import mincut
+from hm01.graph import Graph
+from hm01.clusterers.leiden_wrapper import LeidenClusterer
+from hm01.result_cache import ResultCache
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), 3000, last_used_interval_ns=0)
+    for key in "abc":
+        cache.put(key, bytes(900))
+    assert cache.get("a") == bytes(900)
+    cache.put("d", bytes(900))
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    cache.put("e", bytes(5000))
+    assert cache.get("e") is None and len(cache) == 3
+
+def test_recent_hits_not_recorded(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), 1 << 20)
+    cache.put("a", bytes(10))
+    last_used = lambda: cache.connection.execute("SELECT last_used FROM results").fetchone()[0]
+    stored = last_used()
+    assert cache.get("a") == bytes(10)
+    assert last_used() == stored
+    cache.last_used_interval_ns = 0
+    assert cache.get("a") == bytes(10)
+    assert last_used() > stored
+
+def test_results_reused_across_indices(context, monkeypatch):
+    context.with_result_cache(1 << 20)
+    try:
+        calls = []
+        find_mincut = mincut.find_mincut
+        monkeypatch.setattr(mincut, "find_mincut", lambda g: calls.append(g.index) or find_mincut(g))
+        context.with_mincut_engine("native")
+        graph = Graph.from_erdos_renyi(60, 0.3)
+        first = graph.intangible_subgraph(list(range(10, 50)), "a").realize(graph)
+        second = graph.intangible_subgraph(list(range(10, 50)), "b").realize(graph)
+        assert first.find_mincut() == second.find_mincut()
+        assert calls == ["a"]
+        clusterer = LeidenClusterer(0.1, seed=42)
+        clusters = [(c.index, c.subset) for c in clusterer.cluster(first)]
+        cached = [(c.index, c.subset) for c in clusterer.cluster(second)]
+        assert cached == [("b" + index[1:], subset) for index, subset in clusters]
+        assert len(context.result_cache) == 2
+    finally:
+        context.with_mincut_engine("viecut").with_result_cache(0)
@@ -0,0 +1,96 @@
+import pickle
+import random
+
+import networkit as nk
+from hm01.cm import MincutRequirement, algorithm_g
+from hm01.clusterers.leiden_wrapper import LeidenClusterer
+from hm01.graph import Graph, IntangibleSubgraph
+from hm01.scheduler import ClusterScheduler, MemoryBudget, SchedulerPolicy
+
+
+def pop_all(scheduler):
+    order = []
+    while scheduler:
+        order.append(scheduler.pop().index)
+    return order
+
+
+def test_scheduler_orders():
+    clusters = [
+        IntangibleSubgraph(list(range(n)), str(i)) for i, n in enumerate([3, 5, 3, 1])
+    ]
+    lifo = ClusterScheduler(SchedulerPolicy.lifo, clusters)
+    assert pop_all(lifo) == ["3", "2", "1", "0"]
+    # the cluster pushed last goes first among equal sizes
+    largest = ClusterScheduler(SchedulerPolicy.largest_first, clusters)
+    assert pop_all(largest) == ["1", "2", "0", "3"]
+    smallest = ClusterScheduler(SchedulerPolicy.smallest_first, clusters)
+    assert [c.index for c in smallest.upcoming()] == ["3", "2", "0", "1"]
+    assert pop_all(smallest) == ["3", "2", "0", "1"]
+
+
+def test_upcoming_in_pop_order():
+    sizes = random.Random(42).choices(range(1, 20), k=200)
+    clusters = [IntangibleSubgraph(list(range(n)), str(i)) for i, n in enumerate(sizes)]
+    for policy in [SchedulerPolicy.largest_first, SchedulerPolicy.smallest_first]:
+        scheduler = ClusterScheduler(policy, clusters)
+        upcoming = [c.index for c in scheduler.upcoming()]
+        resumed = pickle.loads(pickle.dumps(scheduler))
+        assert upcoming == pop_all(scheduler) == pop_all(resumed)
+
+
+def test_memory_budget_admits_one_at_least():
+    graph = Graph.from_clique(10)
+    small, large = IntangibleSubgraph([0, 1], "s"), IntangibleSubgraph(list(range(10)), "l")
+    budget = MemoryBudget(graph, MemoryBudget(graph).estimate(small) + 1)
+    assert budget.admit(large)
+    assert not budget.admit(small)
+    budget.release(large)
+    assert budget.admit(small)
+
+
+def test_memory_budget_never_exceeded(native_mincut, monkeypatch):
+    nk.setSeed(42, False)
+    graph = Graph(nk.generators.ClusteredRandomGraphGenerator(200, 8, 0.3, 0.01).generate(), "")
+    clusterer = LeidenClusterer(0.1, seed=42)
+    requirement = MincutRequirement.try_from_str("1log10+1")
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    most_in_flight = []
+    release = MemoryBudget.release
+
+    def recording_release(self, cluster):
+        most_in_flight.append(len(self.in_flight))
+        release(self, cluster)
+
+    monkeypatch.setattr(MemoryBudget, "release", recording_release)
+    # a budget of one byte processes a single cluster at a time
+    algorithm_g(
+        graph, list(clusters), clusterer, requirement, workers=3, memory_budget=1
+    )
+    assert max(most_in_flight) == 1
+
+
+def test_schedulers_agree_on_clusters(native_mincut):
+    graph = Graph.from_erdos_renyi(100, 0.3)
+    clusterer = LeidenClusterer(0.1, seed=42)
+    requirement = MincutRequirement.try_from_str("1log10+1")
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    lifo_ans, lifo_labels, _ = algorithm_g(graph, list(clusters), clusterer, requirement)
+    for scheduler in [SchedulerPolicy.largest_first, SchedulerPolicy.smallest_first]:
+        serial_ans, serial_labels, _ = algorithm_g(
+            graph, list(clusters), clusterer, requirement, scheduler=scheduler
+        )
+        # a budget of one byte processes a single cluster at a time
+        ans, labels, _ = algorithm_g(
+            graph,
+            list(clusters),
+            clusterer,
+            requirement,
+            workers=3,
+            scheduler=scheduler,
+            memory_budget=1,
+        )
+        assert [c.index for c in ans] == [c.index for c in serial_ans]
+        assert list(labels.items()) == list(serial_labels.items())
+        assert sorted(c.index for c in ans) == sorted(c.index for c in lifo_ans)
+        assert sorted(labels.items()) == sorted(lifo_labels.items())
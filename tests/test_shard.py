@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import time
+
+import networkit as nk
+import pytest
+
+from hm01 import shard
+from hm01.cm import ClusterIgnoreFilter, ClustererSpec, make_clusterer, run_and_write
+from hm01.clusterers.ikc_wrapper import IkcEngine
+from hm01.context import WorkingDirLockLost
+from hm01.graph_cache import load_graph
+from hm01.history import HistoryTree
+from hm01.mincut import MincutEngine, ViecutIo
+from hm01.mincut_requirement import MincutRequirement
+from hm01.scheduler import SchedulerPolicy
+
+
+def tree_records(tree):
+    labels = tree.labels
+    return [
+        (labels[i], labels[p] if p >= 0 else None, n, c, e)
+        for i, (p, n, c, e) in enumerate(
+            zip(tree.parent.tolist(), tree.num_nodes.tolist(), tree.cut_size.tolist(), tree.extant.tolist())
+        )
+    ]
+
+
+def work(shared_dir):
+    shard.work(
+        shared_dir=shared_dir, workers=1, graph_cache=True, result_cache_mb=0,
+        viecut_io=ViecutIo.file, memory_budget_mb=0, stale_seconds=600,
+    )
+
+
+def test_sharded_run_same_as_single_run(context, tmp_path):
+    nk.setSeed(42, False)
+    # dense planted communities that stay valid, so that no (randomized) reclustering happens
+    generator = nk.generators.ClusteredRandomGraphGenerator(300, 15, 0.6, 0.005)
+    graph = generator.generate()
+    input = str(tmp_path / "graph.tsv")
+    with open(input, "w") as f:
+        for u, v in graph.iterEdges():
+            f.write(f"{u}\t{v}\n")
+    clustering = str(tmp_path / "clustering.txt")
+    with open(clustering, "w") as f:
+        for u, community in enumerate(generator.getCommunities().getVector()):
+            f.write(f"{u} {community}\n")
+    shared_dir = str(tmp_path / "shared")
+    shard.plan(
+        input=input, shared_dir=shared_dir, clusterer_spec=ClustererSpec.leiden,
+        existing_clustering=clustering, k=-1, resolution=0.1, threshold="1log10", shards=4,
+        ignore_trees=False, ignore_smaller_than=0, mincut_engine=MincutEngine.native,
+        ikc_engine=IkcEngine.subprocess, graph_cache=True, connectivity_certificate=False,
+        leiden_warm_start=False, scheduler=SchedulerPolicy.lifo,
+    )
+    processes = [
+        multiprocessing.get_context("fork").Process(target=work, args=(shared_dir,))
+        for _ in range(3)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+    output = str(tmp_path / "sharded")
+    shard.merge(shared_dir=shared_dir, output=output)
+    # the same run in one process
+    clusterer = make_clusterer(ClustererSpec.leiden, -1, 0.1, IkcEngine.subprocess)
+    context.with_working_dir(str(tmp_path / "single_working_dir"))
+    single = str(tmp_path / "single")
+    run_and_write(
+        load_graph(input), clusterer.from_existing_clustering(clustering), clusterer,
+        MincutRequirement.try_from_str("1log10"), ClusterIgnoreFilter.default(), 1, single, False,
+    )
+    with open(output) as f, open(single) as g:
+        assert sorted(f.readlines()) == sorted(g.readlines())
+    merged_tree = HistoryTree.load_for_output(output)
+    single_tree = HistoryTree.load_for_output(single)
+    # the clusters of the first round hang from the root in the order of a single run
+    assert [merged_tree.labels[i] for i in merged_tree.children(0)] == [
+        single_tree.labels[i] for i in single_tree.children(0)
+    ]
+    assert sorted(tree_records(merged_tree)) == sorted(tree_records(single_tree))
+
+
+def test_stale_lock_taken_over(tmp_path):
+    path = str(tmp_path / "shard.lock")
+    held = shard.ShardLock(path, stale_seconds=600)
+    assert held.acquire()
+    assert not shard.ShardLock(path, stale_seconds=600).acquire()
+    # a lock not refreshed for longer than the staleness is taken over
+    os.utime(path, (time.time() - 1000, time.time() - 1000))
+    taker = shard.ShardLock(path, stale_seconds=600)
+    assert taker.acquire()
+    assert taker.owned() and not held.owned()
+    # the holder that only stalled leaves the new lock alone
+    held.release()
+    assert taker.owned()
+    taker.release()
+    assert not os.path.exists(path)
+    with pytest.raises(AssertionError):
+        shard.ShardLock(path, stale_seconds=0)
+
+
+def test_stale_lock_taken_over_once(tmp_path):
+    path = str(tmp_path / "shard.lock")
+    dead = shard.ShardLock(path, stale_seconds=600)
+    assert dead.acquire()
+    os.utime(path, (time.time() - 1000, time.time() - 1000))
+    # a worker sees the stale lock, but another takes it over before its rename
+    seen = shard.read_lock(path)
+    first = shard.ShardLock(path, stale_seconds=600)
+    assert first.acquire()
+    late = shard.ShardLock(path, stale_seconds=600)
+    assert not late._take_over(seen)
+    assert first.owned()
+    assert sorted(os.listdir(tmp_path)) == ["shard.lock"]
+    first.release()
+    dead.release()
+    assert not os.path.exists(path)
+
+
+def test_run_stops_once_lock_lost(native_mincut, tmp_path):
+    graph = load_graph("data/ring_four_k10s.edge_list", False)
+    clusterer = make_clusterer(ClustererSpec.leiden, -1, 0.1, IkcEngine.subprocess)
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    lock = shard.ShardLock(str(tmp_path / "shard.lock"), stale_seconds=600)
+    assert lock.acquire()
+    native_mincut.with_working_dir(str(tmp_path / "work")).with_working_dir_lock(lock)
+    output = str(tmp_path / "labels")
+    args = (
+        graph, clusters, clusterer, MincutRequirement.try_from_str("1log10"),
+        ClusterIgnoreFilter.default(), 1, output, False,
+    )
+    # noticed by the heartbeat
+    lock.lost.set()
+    with pytest.raises(WorkingDirLockLost):
+        run_and_write(*args)
+    # not noticed yet, but checked before the shared files are overwritten
+    lock.lost.clear()
+    with open(lock.path, "w") as f:
+        f.write("another worker\n")
+    with pytest.raises(WorkingDirLockLost):
+        run_and_write(*args)
+    assert not os.path.exists(output)
+    lock.release()
+    assert os.path.exists(lock.path)
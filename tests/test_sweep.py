@@ -0,0 +1,37 @@
+import networkit as nk
+import typer
+from typer.testing import CliRunner
+from hm01 import sweep
+from hm01.history import HistoryTree
+
+def run_sweep(*args):
+    """Run `cmsweep` with only the given options, the others left to their defaults"""
+    app = typer.Typer()
+    app.command()(sweep.main)
+    result = CliRunner().invoke(app, list(args))
+    if result.exception is not None:
+        raise result.exception
+    assert result.exit_code == 0, result.output
+
+def test_sweep_writes_every_combination(context, monkeypatch, tmp_path):
+    nk.setSeed(42, False)
+    graph = nk.generators.ClusteredRandomGraphGenerator(200, 8, 0.3, 0.01).generate()
+    input = str(tmp_path / "graph.tsv")
+    with open(input, "w") as f:
+        for u, v in graph.iterEdges():
+            f.write(f"{u}\t{v}\n")
+    first_rounds = []
+    first_round = sweep.first_round
+    monkeypatch.setattr(sweep, "first_round", lambda *args: first_rounds.append(args[1]) or first_round(*args))
+    output = str(tmp_path / "out")
+    run_sweep(
+        "-i", input, "-d", str(tmp_path / "working_dir"), "-c", "leiden", "-g", "0.1", "-g", "0.2",
+        "-t", "1log10", "-t", "0.1mcd+2", "-t", "1log10", "-o", output,
+        "--mincut-engine", "native", "--no-graph-cache", "--result-cache-mb", "16",
+    )
+    assert [c.resolution for c in first_rounds] == [0.1, 0.2]
+    for name in ["_g0.1_t1log10", "_g0.1_t0.1mcd+2", "_g0.2_t1log10", "_g0.2_t0.1mcd+2"]:
+        with open(output + name) as f:
+            assert 0 < len(f.readlines()) <= 200
+        assert len(HistoryTree.load_for_output(output + name)) > 1
+    assert (tmp_path / "working_dir" / "results.sqlite").exists()
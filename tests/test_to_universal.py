@@ -0,0 +1,61 @@
+import json
+
+import networkit as nk
+
+from hm01.cm import ClusterIgnoreFilter, MincutRequirement, run_and_write
+from hm01.clusterers.leiden_wrapper import LeidenClusterer
+from hm01.graph import Graph
+from hm01.history import HistoryTree
+from hm01.to_universal import main
+
+
+def read_ndjson(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_repeated_nodes_kept(tmp_path):
+    tree = HistoryTree.from_records(
+        ["", "1", "1a", "1b", "2"], [-1, 0, 1, 1, 0], [4, 3, 2, 2, 2],
+        [None, 1, 3, 3, 2], [None, 1.0, 1.0, 1.0, 1.0],
+        [False, False, True, True, True], [False] * 5,
+    )
+    lines = [(3, "1a"), (5, "1a"), (4, "1b"), (5, "1b"), (5, "1a"), (6, "2"), (5, "2")]
+    labels = tmp_path / "labels"
+    labels.write_text("".join(f"{node} {label}\n" for node, label in lines))
+    tree.save(str(labels) + ".tree.npz")
+    output = str(tmp_path / "converted")
+    main(str(labels), "", output, True)
+    before = {c["label"]: c["nodes"] for c in read_ndjson(output + ".before.json")}
+    after = {c["label"]: c["nodes"] for c in read_ndjson(output + ".after.json")}
+    assert before == {"1": [3, 4, 5], "2": [5, 6]}
+    assert after == {"1a": [3, 5, 5], "1b": [4, 5], "2": [6, 5]}
+
+
+def test_emitted_same_as_converted(native_mincut, context, tmp_path):
+    nk.setSeed(42, False)
+    graph = Graph(nk.generators.ClusteredRandomGraphGenerator(300, 10, 0.3, 0.01).generate(), "")
+    clusterer = LeidenClusterer(0.1, seed=42)
+    clusters = list(clusterer.cluster_without_singletons(graph))
+    output = str(tmp_path / "out")
+    context.with_working_dir(str(tmp_path / "working_dir"))
+    run_and_write(
+        graph, clusters, clusterer, MincutRequirement.try_from_str("5log10"),
+        ClusterIgnoreFilter.default(), 1, output, False, emit_universal=True,
+    )
+    converted = str(tmp_path / "converted")
+    main(output, "", converted, True)
+    for suffix in [".before.json", ".after.json"]:
+        assert read_ndjson(output + suffix) == read_ndjson(converted + suffix)
+    before = read_ndjson(output + ".before.json")
+    after = read_ndjson(output + ".after.json")
+    assert sorted(c["label"] for c in before) == sorted(c.index for c in clusters)
+    # every cluster after lies within the cluster before it descends from
+    # (the pruned nodes of a cluster are recorded as an extant leaf without nodes)
+    owner = {n: c["label"] for c in before for n in c["nodes"]}
+    for c in after:
+        assert c["extant"]
+        if c["nodes"]:
+            (label,) = {owner[n] for n in c["nodes"]}
+            b = next(b for b in before if b["label"] == label)
+            assert c["label"] == label or c["label"] in b["descendants"]